@@ -14,12 +14,18 @@ from channels.routing import get_default_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TaskForge.settings')
 
 from django.core.asgi import get_asgi_application
+django_asgi_app = get_asgi_application()
+
+from django.urls import re_path
 from channels.routing import ProtocolTypeRouter, URLRouter
 import main.routing
 from channels.auth import AuthMiddlewareStack
 
 application = ProtocolTypeRouter({
-	"http": get_asgi_application(),
+	# Webhook Telegram-бота (якщо увімкнений) обробляється до Django middleware
+	"http": URLRouter(
+		main.routing.http_urlpatterns + [re_path(r'', django_asgi_app)]
+	),
 	"websocket": AuthMiddlewareStack(
 		URLRouter(
 			main.routing.websocket_urlpatterns
@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TaskForge.settings')
@@ -14,40 +15,28 @@ app.conf.timezone = 'Europe/Kyiv'
 app.conf.enable_utc = False
 
 app.conf.beat_schedule = {
-    # Нагадування за 2 години до кінця дня (22:00)
-    'check-streak-2h': {
+    # Нагадування за 2 години, 1 годину, 30, 15 та 5 хвилин до локальної півночі
+    # користувачів: кожну хвилину обробляються лише пояси з поточною позначкою
+    'generate-habit-reminders': {
         'task': 'main.tasks.generate_habit_notifications',
-        'schedule': crontab(hour=22, minute=0),
+        'schedule': crontab(),  # Кожну хвилину
     },
-    # Нагадування за 1 годину до кінця дня (23:00)
-    'check-streak-1h': {
-        'task': 'main.tasks.generate_habit_notifications',
-        'schedule': crontab(hour=23, minute=0),
-    },
-    # Нагадування за 30 хвилин до кінця дня (23:30)
-    'check-streak-30m': {
-        'task': 'main.tasks.generate_habit_notifications',
-        'schedule': crontab(hour=23, minute=30),
-    },
-    # Нагадування за 15 хвилин до кінця дня (23:45)
-    'check-streak-15m': {
-        'task': 'main.tasks.generate_habit_notifications',
-        'schedule': crontab(hour=23, minute=45),
-    },
-    # Нагадування за 5 хвилин до кінця дня (23:55)
-    'check-streak-5m': {
-        'task': 'main.tasks.generate_habit_notifications',
-        'schedule': crontab(hour=23, minute=55),
-    },
-    # Перевірка загублених streak на початку дня (00:05)
+    # Перевірка загублених streak на початку дня (00:05 локального часу
+    # користувачів): кожну хвилину обробляються лише пояси, де щойно настав новий день
     'check-broken-streaks-daily': {
         'task': 'main.tasks.check_and_notify_broken_streaks',
-        'schedule': crontab(hour=0, minute=5),  # В 00:05 кожен день
+        'schedule': crontab(),  # Кожну хвилину
+    },
+    # Зсув 30-денного вікна лічильників звичок на новий локальний день (00:10
+    # локального часу користувачів)
+    'refresh-habit-completion-counts': {
+        'task': 'main.tasks.refresh_habit_completion_counts',
+        'schedule': crontab(),  # Кожну хвилину
     },
-    # Сброс тижневої активності кожен понеділок
-    'reset-weekly-activity': {
-        'task': 'main.tasks.reset_daily_activity',
-        'schedule': crontab(hour=0, minute=0, day_of_week=1),  # Понеділок в 00:00
+    # Запис буферизованої активності користувачів кожну хвилину
+    'flush-activity-buffer': {
+        'task': 'main.tasks.flush_activity_buffer',
+        'schedule': crontab(),  # Кожну хвилину
     },
     # Відчистка прошедших запросів на сброс паролю кожну годину
     'cleanup-expired-password-resets': {
@@ -55,3 +44,10 @@ app.conf.beat_schedule = {
         'schedule': crontab(minute=0),  # Кожну годину
     },
 }
+
+
+@worker_process_shutdown.connect
+def close_telegram_client(**kwargs):
+    """Закриває спільний Telegram-клієнт процесу воркера"""
+    from main.telegram_client import close_telegram_client
+    close_telegram_client()
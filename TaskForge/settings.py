@@ -77,10 +77,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.user_timezone.UserTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -211,6 +213,52 @@ CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000  # Перезапуск worker післ
 CELERY_TASK_ACKS_LATE = True  # Підтверджувати task тільки після успішного виконання
 CELERY_TASK_REJECT_ON_WORKER_LOST = True  # Повертати task в чергу при падінні worker
 
+# Доставка в Telegram йде окремою чергою з одним процесом, щоб token bucket
+# обмежувача був спільним для всіх відправлень бота
+CELERY_TASK_ROUTES = {
+    'main.tasks.send_telegram_batch': {'queue': 'telegram'},
+    'main.tasks.send_telegram_notification_task': {'queue': 'telegram'},
+}
+
+# Кеш: спільний Redis між усіма процесами Daphne/Celery, якщо задано REDIS_URL;
+# інакше (локальна розробка, тести) - локальний кеш у пам'яті процесу
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'taskforge',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'taskforge',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Буферизований трекінг активності: інкременти накопичуються в Redis і
+# записуються в DailyActivity пакетами задачею flush_activity_buffer.
+# Без Redis буфер був би локальним для процесу, тому за замовчуванням вимкнено
+ACTIVITY_TRACKING_BUFFERED = config('ACTIVITY_TRACKING_BUFFERED', default=bool(REDIS_URL), cast=bool)
+
+# Бітова історія чекінів (main.checkin_bitmap): HabitYearBitmap оновлюється
+# разом з HabitCheckin, історія звички читається з неї. За замовчуванням вимкнено:
+# перед увімкненням маски треба заповнити, як і після роботи з вимкненим
+# прапорцем: manage.py check_checkin_bitmaps --fix
+HABIT_CHECKIN_BITMAPS = config('HABIT_CHECKIN_BITMAPS', default=False, cast=bool)
+
+# Метрики запитів (main.instrumentation): кількість запитів рахується завжди,
+# SQL та час - для частки REQUEST_METRICS_SAMPLE_RATE. /metrics віддає їх у
+# форматі Prometheus за заголовком "Authorization: Bearer <METRICS_TOKEN>"
+# (без токена - лише staff-користувачам)
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=0.1, cast=float)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # Django Channels configuration
 # For WebSocket support
 REDIS_URL = config('REDIS_URL', default=None)
@@ -234,4 +282,24 @@ else:
     }
 
 # Telegram bot token
-TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN')
\ No newline at end of file
+TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN')
+# Базовий URL Bot API (для локальної заглушки у бенчмарках) та розмір пулу з'єднань
+TELEGRAM_API_BASE_URL = config('TELEGRAM_API_BASE_URL', default=None)
+TELEGRAM_CONNECTION_POOL_SIZE = config('TELEGRAM_CONNECTION_POOL_SIZE', default=32, cast=int)
+
+# Ліміти Telegram Bot API: ~30 повідомлень/с на бота та ~1 повідомлення/с на чат
+TELEGRAM_GLOBAL_RATE = config('TELEGRAM_GLOBAL_RATE', default=25, cast=float)
+TELEGRAM_PER_CHAT_RATE = config('TELEGRAM_PER_CHAT_RATE', default=1, cast=float)
+
+# Паралельна обробка оновлень (різні чати одночасно, один чат - по черзі)
+# та розмір окремого пулу потоків для запитів бота до БД
+TELEGRAM_BOT_CONCURRENCY = config('TELEGRAM_BOT_CONCURRENCY', default=16, cast=int)
+TELEGRAM_BOT_DB_THREADS = config('TELEGRAM_BOT_DB_THREADS', default=8, cast=int)
+
+# Webhook-режим бота: оновлення приходять у Daphne (POST /telegram/webhook/)
+# замість окремого процесу з run_polling(). Реєстрація: manage.py telegram_webhook set.
+# Секрет обов'язковий: без нього webhook відхиляє всі запити (перевірка main.E001)
+TELEGRAM_WEBHOOK_ENABLED = config('TELEGRAM_WEBHOOK_ENABLED', default=False, cast=bool)
+TELEGRAM_WEBHOOK_URL = config('TELEGRAM_WEBHOOK_URL', default='')
+TELEGRAM_WEBHOOK_SECRET = config('TELEGRAM_WEBHOOK_SECRET', default='')
+TELEGRAM_WEBHOOK_MAX_CONCURRENCY = config('TELEGRAM_WEBHOOK_MAX_CONCURRENCY', default=16, cast=int)
@@ -1,19 +1,35 @@
 """
-Утиліта для трекінгу активності користувачів за тиждень.
+Утиліта для трекінгу активності користувачів.
+
+Активність зберігається часовим рядом DailyActivity (користувач, день,
+лічильник), тож історія не втрачається і тиждень не потрібно скидати:
+будь-який діапазон читається одним запитом за індексом (user, date).
+Інкремент - один атомарний UPDATE з F()-виразом; рядок дня створюється
+першою активністю за цей день. У буферизованому режимі
+(ACTIVITY_TRACKING_BUFFERED) запит лише додає інкремент у буфер (Redis
+або пам'ять процесу), а задача flush_activity_buffer записує накопичене
+в DailyActivity пакетами.
 """
-from django.utils import timezone
-from .models import UserActivity
 import datetime
+import threading
+from collections import defaultdict, namedtuple
+from time import monotonic
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import DailyActivity
+
+
+WEEK_LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
 
+ACTIVITY_BUFFER_KEY = 'taskforge:activity_buffer'
+ACTIVITY_FLUSHING_KEY = 'taskforge:activity_buffer:flushing'
+ACTIVITY_FLUSH_CHUNK_SIZE = 1000
 
-def get_current_weekday_name():
-    """Отримати назву поточного дня тижня"""
-    weekdays = [
-        'monday', 'tuesday', 'wednesday', 'thursday',
-        'friday', 'saturday', 'sunday'
-    ]
-    today = timezone.now().weekday()  # 0 = понеділок, 6 = неділя
-    return weekdays[today]
+# Підсумок зливу буфера: пари (користувач, день), оновлені та створені рядки, секунди
+FlushResult = namedtuple('FlushResult', ['pairs', 'updated', 'created', 'duration'])
 
 
 def track_user_activity(user, activity_type="general", amount=1):
@@ -25,62 +41,197 @@ def track_user_activity(user, activity_type="general", amount=1):
         activity_type: тип активності (goal_completed, subgoal_completed, habit_checkin, login)
         amount: кількість активності (за замовчуванням 1)
     """
-    # Отримуємо або створюємо запис активності користувача
-    activity, created = UserActivity.objects.get_or_create(
-        user=user,
-        defaults={
-            'week_start': get_monday_of_current_week()
-        }
-    )
+    day = timezone.localdate()
+    if settings.ACTIVITY_TRACKING_BUFFERED:
+        get_activity_buffer().add(user.id, day, amount)
+    else:
+        record_activity(user.id, day, amount)
 
-    # Перевіряємо, чи потрібно скинути тиждень
-    if should_reset_week(activity.week_start):
-        activity.reset_week()
 
-    # Додаємо активність за сьогоднішній день
-    current_day = get_current_weekday_name()
-    activity.add_activity(current_day, amount)
-    
-    print(f"📊 Activity tracked: {user.username} - {activity_type} on {current_day} (+{amount})")
+def record_activity(user_id, day, amount=1):
+    """Атомарно додає активність за день, створюючи рядок дня за потреби"""
+    if apply_activity(user_id, day, amount):
+        return
+    try:
+        with transaction.atomic():
+            DailyActivity.objects.create(user_id=user_id, date=day, count=amount)
+    except IntegrityError:
+        # Рядок дня щойно створив паралельний запит
+        apply_activity(user_id, day, amount)
+
+
+def apply_activity(user_id, day, amount):
+    """Один UPDATE лічильника дня; повертає кількість оновлених рядків"""
+    return DailyActivity.objects.filter(user_id=user_id, date=day).update(count=F('count') + amount)
+
+
+class MemoryActivityBuffer:
+    """Буфер інкрементів у пам'яті процесу (тести та розробка без Redis)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._flushing = {}
+
+    def add(self, user_id, day, amount):
+        with self._lock:
+            self._pending[(user_id, day)] += amount
+
+    def drain(self):
+        """Забирає накопичене; незавершений попередній злив повертається повторно"""
+        with self._lock:
+            if not self._flushing:
+                self._flushing, self._pending = dict(self._pending), defaultdict(int)
+            return dict(self._flushing)
+
+    def ack(self):
+        with self._lock:
+            self._flushing = {}
+
+
+class RedisActivityBuffer:
+    """Буфер інкрементів у хеші Redis, спільний для всіх процесів"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, user_id, day, amount):
+        self.client.hincrby(ACTIVITY_BUFFER_KEY, f'{user_id}:{day.isoformat()}', amount)
+
+    def drain(self):
+        """
+        Атомарно перейменовує буфер: нові інкременти йдуть у свіжий хеш.
+        Хеш, що зливається, видаляється лише після ack(), тому збій
+        під час запису в БД не губить активність.
+        """
+        import redis
+
+        if not self.client.exists(ACTIVITY_FLUSHING_KEY):
+            try:
+                self.client.rename(ACTIVITY_BUFFER_KEY, ACTIVITY_FLUSHING_KEY)
+            except redis.ResponseError:
+                return {}  # буфер порожній
+
+        pending = {}
+        for field, value in self.client.hgetall(ACTIVITY_FLUSHING_KEY).items():
+            user_id, day = field.decode().split(':')
+            pending[(int(user_id), datetime.date.fromisoformat(day))] = int(value)
+        return pending
+
+    def ack(self):
+        self.client.delete(ACTIVITY_FLUSHING_KEY)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_buffer():
+    """Буфер активності процесу: Redis при REDIS_URL, інакше пам'ять"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                if settings.REDIS_URL:
+                    import redis
+                    _buffer = RedisActivityBuffer(redis.Redis.from_url(settings.REDIS_URL))
+                else:
+                    _buffer = MemoryActivityBuffer()
+    return _buffer
+
+
+def flush_pending_activity(buffer=None, chunk_size=ACTIVITY_FLUSH_CHUNK_SIZE):
+    """
+    Записує накопичені інкременти в DailyActivity однією транзакцією.
+    Пари (користувач, день) обробляються частинами по chunk_size: на
+    частину - один SELECT існуючих рядків, один UPDATE з CASE для всіх
+    них та один bulk_create нових, тож кількість запитів не залежить від
+    кількості користувачів. Повертає FlushResult з лічильниками та часом.
+    """
+    started = monotonic()
+    buffer = buffer or get_activity_buffer()
+    pending = buffer.drain()
+    if not pending:
+        return FlushResult(0, 0, 0, monotonic() - started)
+
+    items = sorted(pending.items())
+    updated = created = 0
+    with transaction.atomic():
+        for start in range(0, len(items), chunk_size):
+            chunk_updated, chunk_created = _flush_chunk(dict(items[start:start + chunk_size]))
+            updated += chunk_updated
+            created += chunk_created
+
+    buffer.ack()
+    return FlushResult(len(pending), updated, created, monotonic() - started)
+
+
+def _flush_chunk(chunk):
+    """Записує одну частину буфера; повертає (оновлено, створено)"""
+    from django.contrib.auth.models import User
+
+    days = [day for _, day in chunk]
+    existing = {
+        (user_id, day): pk
+        for pk, user_id, day in DailyActivity.objects.filter(
+            user_id__in={user_id for user_id, _ in chunk}, date__range=(min(days), max(days))
+        ).values_list('id', 'user_id', 'date')
+    }
+
+    # Рядки з однаковим інкрементом ідуть в одну гілку CASE
+    pks_by_amount = defaultdict(list)
+    new_rows = []
+    for (user_id, day), amount in chunk.items():
+        if (user_id, day) in existing:
+            pks_by_amount[amount].append(existing[(user_id, day)])
+        else:
+            new_rows.append(DailyActivity(user_id=user_id, date=day, count=amount))
+
+    updated = sum(len(pks) for pks in pks_by_amount.values())
+    if updated:
+        DailyActivity.objects.filter(
+            pk__in=[pk for pks in pks_by_amount.values() for pk in pks]
+        ).update(count=F('count') + Case(
+            *[When(pk__in=pks, then=Value(amount)) for amount, pks in pks_by_amount.items()],
+            output_field=models.PositiveIntegerField()
+        ))
+
+    # Інкременти видалених користувачів відкидаються
+    if new_rows:
+        known_users = set(
+            User.objects.filter(id__in={row.user_id for row in new_rows}).values_list('id', flat=True)
+        )
+        new_rows = [row for row in new_rows if row.user_id in known_users]
+        DailyActivity.objects.bulk_create(new_rows)
+
+    return updated, len(new_rows)
+
+
+def get_monday(day):
+    """Понеділок тижня, до якого належить day"""
+    return day - datetime.timedelta(days=day.weekday())
 
 
 def get_monday_of_current_week():
     """Отримати понеділок поточного тижня"""
-    today = timezone.now().date()
-    monday = today - datetime.timedelta(days=today.weekday())
-    return monday
+    return get_monday(timezone.localdate())
 
 
-def should_reset_week(week_start):
-    """Перевірити, чи потрібно скинути тиждень"""
-    current_monday = get_monday_of_current_week()
-    return week_start < current_monday
+def get_user_activity_range(user, start, end):
+    """Активність за кожен день діапазону [start, end] одним запитом за індексом"""
+    counts = dict(
+        DailyActivity.objects.filter(user=user, date__range=(start, end)).values_list('date', 'count')
+    )
+    return [counts.get(start + datetime.timedelta(days=i), 0) for i in range((end - start).days + 1)]
 
 
-def get_user_weekly_activity(user):
-    """Отримати дані активності користувача за тиждень"""
-    try:
-        activity = UserActivity.objects.get(user=user)
-
-        # Перевіряємо, чи потрібно скинути тиждень
-        if should_reset_week(activity.week_start):
-            activity.reset_week()
-            
-        return {
-            'weekly_data': activity.get_weekly_data(),
-            'total_activities': activity.total_activities,
-            'week_start': activity.week_start.strftime('%Y-%m-%d'),
-            'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        }
-    except UserActivity.DoesNotExist:
-        # Створюємо порожню активність якщо не існує
-        activity = UserActivity.objects.create(
-            user=user,
-            week_start=get_monday_of_current_week()
-        )
-        return {
-            'weekly_data': [0, 0, 0, 0, 0, 0, 0],
-            'total_activities': 0,
-            'week_start': activity.week_start.strftime('%Y-%m-%d'),
-            'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        }
\ No newline at end of file
+def get_user_weekly_activity(user, week_start=None):
+    """Отримати дані активності користувача за тиждень (за замовчуванням - поточний)"""
+    monday = get_monday(week_start) if week_start else get_monday_of_current_week()
+    weekly_data = get_user_activity_range(user, monday, monday + datetime.timedelta(days=6))
+    return {
+        'weekly_data': weekly_data,
+        'total_activities': sum(weekly_data),
+        'week_start': monday.strftime('%Y-%m-%d'),
+        'labels': WEEK_LABELS
+    }
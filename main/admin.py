@@ -301,7 +301,7 @@ class SupportMessageAdmin(admin.ModelAdmin):
 
 # Обмежений адмін для Telegram Profile (для техадмінів)
 class TechAdminTelegramProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'telegram_id', 'connected', 'notifications_enabled', 'two_factor_enabled')
+    list_display = ('user', 'telegram_id', 'connected', 'notifications_enabled', 'two_factor_enabled', 'timezone')
     list_filter = ('connected', 'notifications_enabled', 'two_factor_enabled')
     search_fields = ('user__username', 'telegram_id')
     
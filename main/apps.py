@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+        from .instrumentation import install_query_hook
+        from .telegram_webhook import check_webhook_secret
+        from .user_timezone import remember_user_timezone
+
+        connection_created.connect(install_query_hook, dispatch_uid='request_metrics_query_hook')
+        user_logged_in.connect(remember_user_timezone, dispatch_uid='remember_user_timezone')
+        checks.register(check_webhook_secret, checks.Tags.security)
@@ -0,0 +1,211 @@
+"""
+Бенчмарк запитів до БД та часу виконання основних сторінок і задач.
+
+Створює реалістичного користувача (за замовчуванням 50 звичок з історією
+за 2 роки, 30 цілей по 10 підцілей) та кількох "фонових" користувачів для
+задач сповіщень, проганяє сценарії та вимірює кількість запитів, час у БД
+і загальний час. Результати порівнюються з бюджетами з
+benchmark_budgets.json, тож N+1 регресія ламає тест або команду
+benchmark_views ще до релізу.
+
+Бюджети записані для двох масштабів: "small" перевіряється в тестах
+(лише кількість запитів), "full" - командою benchmark_views.
+"""
+import json
+import math
+from collections import OrderedDict, namedtuple
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from time import perf_counter
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .caching import invalidate_user_cache
+from .completion_rollup import rebuild_daily_completion
+from .instrumentation import QueryRecorder
+from .models import DailyActivity, Goal, Habit, HabitCheckin, Notification, SubGoal, TelegramProfile
+from .streaks import rebuild_habit_streak
+
+
+BUDGET_FILE = Path(__file__).with_name('benchmark_budgets.json')
+
+SCALES = {
+    'small': {'habits': 5, 'days': 60, 'goals': 3, 'subgoals': 3, 'users': 3},
+    'full': {'habits': 50, 'days': 730, 'goals': 30, 'subgoals': 10, 'users': 20},
+}
+
+METRICS = ('queries', 'db_ms', 'wall_ms')
+
+# Запас для часових бюджетів при --update-budgets (час залежить від машини)
+TIME_BUDGET_HEADROOM = 3
+
+BENCHMARK_PASSWORD = 'benchmark-pass-123'
+
+Measurement = namedtuple('Measurement', METRICS)
+
+
+def seed_benchmark_data(habits, days, goals, subgoals, users, prefix='bench_'):
+    """
+    Створює основного користувача з повною історією та фонових користувачів
+
+    Returns:
+        основний користувач (пароль BENCHMARK_PASSWORD)
+    """
+    today = timezone.localdate()
+    main_user = User.objects.create_user(username=f'{prefix}main', password=BENCHMARK_PASSWORD)
+    TelegramProfile.objects.create(user=main_user, telegram_id=f'{prefix}1', connected=True)
+    others = User.objects.bulk_create([User(username=f'{prefix}{i}', password='!') for i in range(users)])
+
+    for user, habit_count in [(main_user, habits)] + [(user, 3) for user in others]:
+        created = Habit.objects.bulk_create([
+            Habit(user=user, name=f'Habit {i}', frequency='daily') for i in range(habit_count)
+        ])
+        # Близько 80% виконаних днів з детермінованими перервами; сьогодні ще не все відмічено
+        HabitCheckin.objects.bulk_create([
+            HabitCheckin(habit=habit, date=today - timedelta(days=offset), completed=True)
+            for index, habit in enumerate(created)
+            for offset in range(days)
+            if (offset * 7 + index) % 10 < 8 and not (offset == 0 and index % 2)
+        ], batch_size=5000)
+        for habit in created:
+            rebuild_habit_streak(habit)
+
+    Habit.objects.filter(user=main_user).update(created_at=timezone.now() - timedelta(days=days))
+
+    created_goals = Goal.objects.bulk_create([
+        Goal(user=main_user, name=f'Goal {i}', completed=i % 5 == 0) for i in range(goals)
+    ])
+    SubGoal.objects.bulk_create([
+        SubGoal(goal=goal, name=f'Step {j}', completed=j % 3 == 0)
+        for goal in created_goals for j in range(subgoals)
+    ])
+
+    Notification.objects.bulk_create([
+        Notification(user=main_user, message=f'Notification {i}', read=i % 2 == 0) for i in range(30)
+    ])
+    DailyActivity.objects.bulk_create([
+        DailyActivity(user=main_user, date=today - timedelta(days=offset), count=offset % 7 + 1)
+        for offset in range(days)
+    ], batch_size=5000)
+    rebuild_daily_completion([main_user.id] + [user.id for user in others])
+
+    return main_user
+
+
+def measure(func):
+    """Виконує func та повертає Measurement"""
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        started = perf_counter()
+        func()
+        wall = perf_counter() - started
+
+    return Measurement(recorder.count, round(recorder.duration * 1000, 1), round(wall * 1000, 1))
+
+
+def build_scenarios(user):
+    """Сценарії бенчмарку: назва -> функція без аргументів"""
+    # localhost є в ALLOWED_HOSTS і поза тестовим оточенням
+    client = Client(HTTP_HOST='localhost')
+    client.login(username=user.username, password=BENCHMARK_PASSWORD)
+    habit = Habit.objects.filter(user=user).order_by('id').first()
+    user_ids = list(User.objects.filter(habits__streak_days__gt=0).distinct().values_list('id', flat=True))
+
+    def expect_ok(response):
+        if response.status_code != 200:
+            raise RuntimeError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+
+    def get(name):
+        return lambda: expect_ok(client.get(reverse(name)))
+
+    def checkin():
+        expect_ok(client.post(
+            reverse('habit_checkin'),
+            data=json.dumps({'habit_id': habit.id, 'checked': True}),
+            content_type='application/json'
+        ))
+
+    def reminders():
+        from .tasks import generate_habit_notifications
+
+        reminder_time = timezone.make_aware(datetime.combine(timezone.localdate(), time(22, 0)))
+        with patch('main.tasks.timezone.now', return_value=reminder_time), \
+                patch('main.tasks.dispatch_notification_delivery'):
+            generate_habit_notifications()
+
+    def broken_streaks():
+        from .tasks import check_broken_streaks_chunk
+
+        with patch('main.tasks.dispatch_notification_delivery'):
+            check_broken_streaks_chunk(user_ids, timezone.localdate().isoformat())
+
+    return OrderedDict([
+        ('home', get('home')),
+        ('goals_page', get('goals')),
+        ('habits_page', get('habits')),
+        ('statistics_page', get('statistics')),
+        ('habit_checkin', checkin),
+        ('habits_completion_history', get('habits_completion_history')),
+        ('habit_history', lambda: expect_ok(client.get(reverse('habit_history', args=[habit.id])))),
+        ('generate_habit_notifications', reminders),
+        ('check_broken_streaks_chunk', broken_streaks),
+    ])
+
+
+def run_benchmarks(scale='full', **overrides):
+    """
+    Створює дані для масштабу та вимірює всі сценарії (викликати в транзакції,
+    яку потім відкотити)
+
+    Returns:
+        OrderedDict {назва сценарію: Measurement}
+    """
+    user = seed_benchmark_data(**dict(SCALES[scale], **overrides))
+    results = OrderedDict()
+    for name, scenario in build_scenarios(user).items():
+        # Кожен сценарій міряється "холодним": без закешованих даних користувача
+        invalidate_user_cache(user.id)
+        results[name] = measure(scenario)
+    return results
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path, encoding='utf-8') as budget_file:
+        return json.load(budget_file)
+
+
+def check_budgets(results, budgets, metrics=METRICS):
+    """
+    Порівнює результати з бюджетами одного масштабу
+
+    Returns:
+        список описів перевищень (порожній, якщо все в межах)
+    """
+    violations = []
+    for name, measurement in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            violations.append(f'{name}: no budget recorded')
+            continue
+        for metric in metrics:
+            value = getattr(measurement, metric)
+            if metric in budget and value > budget[metric]:
+                violations.append(f'{name}: {metric} {value} > budget {budget[metric]}')
+    return violations
+
+
+def budgets_from_results(results):
+    """Бюджети з виміряних результатів: запити точно, час із запасом"""
+    return OrderedDict(
+        (name, {
+            'queries': measurement.queries,
+            'db_ms': math.ceil(measurement.db_ms * TIME_BUDGET_HEADROOM) + 50,
+            'wall_ms': math.ceil(measurement.wall_ms * TIME_BUDGET_HEADROOM) + 100,
+        })
+        for name, measurement in results.items()
+    )
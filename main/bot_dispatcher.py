@@ -0,0 +1,129 @@
+"""
+Паралельна обробка оновлень Telegram-бота.
+
+ChatOrderedUpdateProcessor підключається до Application через
+ApplicationBuilder.concurrent_updates() і працює однаково в polling та
+webhook-режимах: оновлення різних чатів обробляються паралельно (не
+більше max_workers одночасно), а оновлення одного чату - строго по черзі
+в порядку надходження, щоб, наприклад, /reset_password і наступне
+повідомлення з новим паролем не помінялися місцями.
+
+Метрики (кількість оновлень в обробці та в черзі, час очікування в черзі)
+публікуються в кеш не частіше ніж раз на секунду і доступні з будь-якого
+процесу через get_bot_metrics().
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from time import monotonic
+
+from django.core.cache import cache
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+METRICS_CACHE_KEY = 'telegram_bot:metrics'
+METRICS_PUBLISH_INTERVAL = 1.0
+
+# Загальна межа оновлень (в обробці + в черзі чатів); вище неї Application
+# перестає забирати нові оновлення
+MAX_PENDING_UPDATES = 1024
+
+
+def chat_key(update):
+    """Ключ впорядкування: чат, інакше користувач; None - без впорядкування"""
+    if isinstance(update, Update):
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+    return None
+
+
+class BotMetrics:
+    """Лічильники диспетчера оновлень"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.queued = 0
+        self.processed = 0
+        self.total_queue_latency = 0.0
+        self.max_queue_latency = 0.0
+        self._published_at = 0.0
+
+    def started(self, queue_latency):
+        self.queued -= 1
+        self.in_flight += 1
+        self.total_queue_latency += queue_latency
+        self.max_queue_latency = max(self.max_queue_latency, queue_latency)
+
+    def finished(self):
+        self.in_flight -= 1
+        self.processed += 1
+
+    def snapshot(self):
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'processed': self.processed,
+            'avg_queue_latency_ms': round(self.total_queue_latency / self.processed * 1000, 1) if self.processed else None,
+            'max_queue_latency_ms': round(self.max_queue_latency * 1000, 1),
+        }
+
+    def publish(self, force=False):
+        now = monotonic()
+        if force or now - self._published_at >= METRICS_PUBLISH_INTERVAL:
+            self._published_at = now
+            cache.set(METRICS_CACHE_KEY, self.snapshot(), timeout=None)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Паралельно між чатами, послідовно всередині чату"""
+
+    def __init__(self, max_workers=16, max_pending_updates=MAX_PENDING_UPDATES):
+        super().__init__(max_pending_updates)
+        self.max_workers = max_workers
+        self.metrics = BotMetrics()
+        self._workers = asyncio.Semaphore(max_workers)
+        self._chats = {}
+
+    @asynccontextmanager
+    async def _chat_turn(self, key):
+        """Чекає своєї черги в чаті; asyncio.Lock пропускає очікувачів по порядку"""
+        if key is None:
+            yield
+            return
+
+        entry = self._chats.get(key)
+        if entry is None:
+            entry = self._chats[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[key]
+
+    async def do_process_update(self, update, coroutine):
+        received = monotonic()
+        self.metrics.queued += 1
+        async with self._chat_turn(chat_key(update)):
+            async with self._workers:
+                self.metrics.started(monotonic() - received)
+                try:
+                    await coroutine
+                finally:
+                    self.metrics.finished()
+                    self.metrics.publish()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        self.metrics.publish(force=True)
+
+
+def get_bot_metrics():
+    """Останній опублікований знімок метрик процесу бота (або None)"""
+    return cache.get(METRICS_CACHE_KEY)
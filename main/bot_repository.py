@@ -0,0 +1,147 @@
+"""
+Доступ до даних для Telegram-бота.
+
+Кожна функція - один async-виклик з одним переходом у потік ORM, тож
+обробники бота не роблять ланцюжків sync_to_async для профілю,
+користувача та кожної звички окремо.
+
+Уся робота бота з БД іде через bot_sync_to_async(): окремий обмежений
+пул потоків (TELEGRAM_BOT_DB_THREADS) замість спільного thread-sensitive
+потоку asgiref, тож повільний запит одного чату не блокує інші.
+
+Статус звичок кешується на чат на STATUS_CACHE_TIMEOUT секунд. Запис
+містить версію простору імен користувача (main.caching), тому чекін,
+зміна звичок чи будь-яка інша invalidate_user_cache() робить його
+недійсним без додаткових запитів до БД.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Exists, FilteredRelation, OuterRef, Q
+from django.utils import timezone
+
+from .caching import get_user_cache_version, increment_counter, STATS_PREFIX, BOT_STATUS_CACHE
+from .models import HabitCheckin, TelegramProfile
+from .user_timezone import load_zone
+
+
+STATUS_CACHE_TIMEOUT = 30
+
+_db_executor = None
+_db_executor_lock = threading.Lock()
+
+
+def get_db_executor():
+    """Пул потоків для запитів бота до БД (по з'єднанню на потік)"""
+    global _db_executor
+    if _db_executor is None:
+        with _db_executor_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(
+                    max_workers=settings.TELEGRAM_BOT_DB_THREADS,
+                    thread_name_prefix='bot-db'
+                )
+    return _db_executor
+
+
+def bot_sync_to_async(func):
+    """sync_to_async для коду бота: виконує func у пулі get_db_executor()"""
+    def run(*args, **kwargs):
+        # Як database_sync_to_async у Channels: не тримаємо розірвані з'єднання
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=get_db_executor())
+
+
+def status_cache_key(telegram_id):
+    return f'bot_status:{telegram_id}'
+
+
+def load_linked_user(telegram_id):
+    return User.objects.filter(
+        telegram_profile__telegram_id=telegram_id,
+        telegram_profile__connected=True
+    ).first()
+
+
+def query_habits_status(telegram_id):
+    """
+    Профіль, користувач, активні звички та відмітки за сьогодні одним запитом
+
+    "Сьогодні" - локальна дата в поясі профілю (як у чекінів з сайту та
+    нагадувань). Пояс стає відомим лише з рядка профілю, тому запит
+    позначає відмітки за всі можливі локальні дати (пояси від UTC-12 до
+    UTC+14 дають учора, сьогодні чи завтра за UTC), а потрібну вибираємо тут.
+    """
+    now = timezone.now()
+    utc_today = now.astimezone(dt_timezone.utc).date()
+    candidates = [utc_today + timedelta(days=offset) for offset in (-1, 0, 1)]
+    rows = (
+        TelegramProfile.objects
+        .filter(telegram_id=telegram_id, connected=True)
+        .annotate(active_habit=FilteredRelation('user__habits', condition=Q(user__habits__active=True)))
+        .annotate(**{
+            f'completed_{index}': Exists(HabitCheckin.objects.filter(
+                habit=OuterRef('active_habit__id'), date=day, completed=True
+            ))
+            for index, day in enumerate(candidates)
+        })
+        .order_by('active_habit__id')
+        .values('user_id', 'user__username', 'timezone', 'active_habit__id', 'active_habit__name',
+                *(f'completed_{index}' for index in range(len(candidates))))
+    )
+
+    snapshot = None
+    for row in rows:
+        if snapshot is None:
+            snapshot = {'user_id': row['user_id'], 'username': row['user__username'], 'habits': []}
+            zone = load_zone(row['timezone']) or timezone.get_default_timezone()
+            today = now.astimezone(zone).date()
+            completed_key = f'completed_{candidates.index(today)}'
+        if row['active_habit__id'] is not None:
+            snapshot['habits'].append({'name': row['active_habit__name'], 'completed': row[completed_key]})
+    return snapshot
+
+
+def load_habits_status(telegram_id):
+    key = status_cache_key(telegram_id)
+    cached = cache.get(key)
+    if cached and cached['version'] == get_user_cache_version(cached['user_id']):
+        increment_counter(f'{STATS_PREFIX}:{BOT_STATUS_CACHE}:hits')
+        return cached
+
+    increment_counter(f'{STATS_PREFIX}:{BOT_STATUS_CACHE}:misses')
+    snapshot = query_habits_status(telegram_id)
+    if snapshot:
+        snapshot['version'] = get_user_cache_version(snapshot['user_id'])
+        cache.set(key, snapshot, STATUS_CACHE_TIMEOUT)
+    return snapshot
+
+
+async def get_linked_user(telegram_id):
+    """Користувач, прив'язаний до Telegram ID, або None"""
+    return await bot_sync_to_async(load_linked_user)(telegram_id)
+
+
+async def get_habits_status(telegram_id):
+    """
+    Статус звичок на сьогодні для /status:
+    {'user_id', 'username', 'habits': [{'name', 'completed'}]} або None,
+    якщо акаунт не прив'язаний.
+    """
+    return await bot_sync_to_async(load_habits_status)(telegram_id)
+
+
+async def invalidate_status_cache(telegram_id):
+    """Скидає кеш статусу чату (прив'язка/відв'язка акаунта)"""
+    await bot_sync_to_async(cache.delete)(status_cache_key(telegram_id))
@@ -0,0 +1,103 @@
+"""
+Спільний кеш з простором імен для кожного користувача.
+
+Ключі користувача містять номер версії простору імен: invalidate_user_cache()
+збільшує версію одним incr, і всі старі ключі (у всіх процесах, бо кеш -
+Redis при REDIS_URL) перестають читатися та згодом видаляються за TTL.
+Лічильники попадань/промахів зберігаються в тому ж кеші.
+"""
+from django.core.cache import cache
+
+
+USER_VERSION_TIMEOUT = 60 * 60 * 24 * 30
+STATS_PREFIX = 'cache_stats'
+
+# Імена закешованих даних користувача (для лічильників cache_stats)
+HABITS_HISTORY_CACHE = 'habits_history'
+BOT_STATUS_CACHE = 'bot_status'
+CACHE_NAMES = (HABITS_HISTORY_CACHE, BOT_STATUS_CACHE)
+
+_MISSING = object()
+
+
+def increment_counter(key, delta=1):
+    """Атомарно збільшує лічильник у кеші, створюючи його за потреби"""
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Ключ зник між add та incr (витіснення)
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def _version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def get_user_cache_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), 1, timeout=USER_VERSION_TIMEOUT)
+        version = cache.get(_version_key(user_id), 1)
+    return version
+
+
+def user_cache_key(user_id, name, version=None):
+    if version is None:
+        version = get_user_cache_version(user_id)
+    return f'user:{user_id}:v{version}:{name}'
+
+
+def invalidate_user_cache(user_id):
+    """Інвалідовує всі закешовані дані користувача"""
+    cache.add(_version_key(user_id), 1, timeout=USER_VERSION_TIMEOUT)
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 2, timeout=USER_VERSION_TIMEOUT)
+
+
+def get_user_cache(user_id, name, default=None):
+    """Читає значення з простору імен користувача та рахує попадання/промахи"""
+    value = cache.get(user_cache_key(user_id, name), _MISSING)
+    if value is _MISSING:
+        increment_counter(f'{STATS_PREFIX}:{name}:misses')
+        return default
+    increment_counter(f'{STATS_PREFIX}:{name}:hits')
+    return value
+
+
+def set_user_cache(user_id, name, value, timeout):
+    cache.set(user_cache_key(user_id, name), value, timeout)
+
+
+def get_or_set_user_cache(user_id, name, compute, timeout):
+    """Повертає закешоване значення або обчислює та кешує його"""
+    value = get_user_cache(user_id, name, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        set_user_cache(user_id, name, value, timeout)
+    return value
+
+
+def get_cache_stats(names=CACHE_NAMES):
+    """Попадання, промахи та hit rate для кожного імені"""
+    keys = [f'{STATS_PREFIX}:{name}:{kind}' for name in names for kind in ('hits', 'misses')]
+    counters = cache.get_many(keys)
+
+    stats = {}
+    for name in names:
+        hits = counters.get(f'{STATS_PREFIX}:{name}:hits', 0)
+        misses = counters.get(f'{STATS_PREFIX}:{name}:misses', 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total * 100, 1) if total else 0,
+        }
+    return stats
+
+
+def reset_cache_stats(names=CACHE_NAMES):
+    cache.delete_many([f'{STATS_PREFIX}:{name}:{kind}' for name in names for kind in ('hits', 'misses')])
@@ -0,0 +1,255 @@
+"""
+Бітова історія чекінів звички (HabitYearBitmap).
+
+Для кожної звички і року зберігається маска виконаних днів: 366 біт
+(46 байт) замість до 366 рядків HabitCheckin. Маски оновлюються разом з
+HabitCheckin у streaks.record_checkin/record_checkins, а читання збирає потрібні роки в одне ціле число Python, тож
+streak, найдовша серія, виконання за вікно та календар - це зсуви,
+маски та bit_count() замість перегляду рядків.
+
+Прапорець HABIT_CHECKIN_BITMAPS (за замовчуванням вимкнений) вмикає ведення
+масок; без нього load_history будує ту саму CheckinHistory з HabitCheckin.
+Прапорець керує лише поточним веденням (apply_bitmap_changes, load_history):
+розбіжності з таблицею чекінів показує check_bitmap_consistency, а
+rebuild_habit_bitmaps записує маски завжди, тож перед увімкненням їх
+заповнює manage.py check_checkin_bitmaps --fix.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Habit, HabitCheckin, HabitYearBitmap
+
+
+YEAR_BYTES = 46  # 366 біт
+
+
+def day_index(day):
+    """Номер біта дня в масці його року"""
+    return day.timetuple().tm_yday - 1
+
+
+def encode(mask):
+    return mask.to_bytes(YEAR_BYTES, 'little')
+
+
+def decode(bits):
+    # PostgreSQL повертає memoryview, SQLite - bytes
+    return int.from_bytes(bytes(bits), 'little')
+
+
+class CheckinHistory:
+    """
+    Виконані дні звички як одне ціле число: біт i - день origin + i.
+    Дні поза завантаженим діапазоном вважаються невиконаними.
+    """
+
+    def __init__(self, origin, mask=0):
+        self.origin = origin
+        self.mask = mask
+
+    @classmethod
+    def from_dates(cls, dates, origin=None):
+        dates = list(dates)
+        if origin is None:
+            origin = min(dates, default=timezone.localdate())
+        history = cls(origin)
+        for day in dates:
+            offset = history._offset(day)
+            if offset >= 0:
+                history.mask |= 1 << offset
+        return history
+
+    def _offset(self, day):
+        return (day - self.origin).days
+
+    def _window(self, start, end):
+        """Маска днів [start, end] у координатах origin"""
+        first = max(self._offset(start), 0)
+        last = self._offset(end)
+        if last < first:
+            return 0
+        return ((1 << (last - first + 1)) - 1) << first
+
+    def __contains__(self, day):
+        offset = self._offset(day)
+        return offset >= 0 and bool(self.mask >> offset & 1)
+
+    def count(self, start, end):
+        """Кількість виконаних днів у [start, end]"""
+        return (self.mask & self._window(start, end)).bit_count()
+
+    def days(self, start, end):
+        """Виконані дні в [start, end] за зростанням"""
+        bits = self.mask & self._window(start, end)
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(self.origin + timedelta(days=low.bit_length() - 1))
+            bits ^= low
+        return result
+
+    def run_ending(self, day):
+        """Довжина серії виконаних днів, що закінчується в day"""
+        offset = self._offset(day)
+        if offset < 0:
+            return 0
+        prefix = (1 << (offset + 1)) - 1
+        gaps = ~self.mask & prefix
+        # Від day назад до найближчого невиконаного дня
+        return offset + 1 if not gaps else offset - (gaps.bit_length() - 1)
+
+    def current_streak(self, today):
+        """Поточна серія: до сьогодні або до вчора, якщо сьогодні ще не відмічено"""
+        return self.run_ending(today) or self.run_ending(today - timedelta(days=1))
+
+    def longest_run(self):
+        """Найдовша серія: кількість кроків x & (x >> 1) до нуля"""
+        bits, length = self.mask, 0
+        while bits:
+            bits &= bits >> 1
+            length += 1
+        return length
+
+
+def load_history(habit, start=None, end=None):
+    """
+    CheckinHistory звички за роки діапазону (за замовчуванням - вся історія),
+    один запит до HabitYearBitmap або HabitCheckin
+    """
+    if not settings.HABIT_CHECKIN_BITMAPS:
+        checkins = HabitCheckin.objects.filter(habit=habit, completed=True)
+        if start is not None:
+            checkins = checkins.filter(date__gte=start)
+        if end is not None:
+            checkins = checkins.filter(date__lte=end)
+        return CheckinHistory.from_dates(checkins.values_list('date', flat=True), origin=start)
+
+    rows = HabitYearBitmap.objects.filter(habit=habit)
+    if start is not None:
+        rows = rows.filter(year__gte=start.year)
+    if end is not None:
+        rows = rows.filter(year__lte=end.year)
+    rows = list(rows.values_list('year', 'bits'))
+
+    first_year = start.year if start is not None else min((year for year, _ in rows), default=timezone.localdate().year)
+    history = CheckinHistory(date(first_year, 1, 1))
+    for year, bits in rows:
+        history.mask |= decode(bits) << history._offset(date(year, 1, 1))
+    return history
+
+
+def apply_bitmap_changes(habit_id, changes):
+    """
+    Записує зміни чекінів звички в маски її років (3 запити на будь-яку
+    кількість змін): створення відсутніх років, блокування рядків, оновлення
+
+    Args:
+        changes: список (дата, новий стан)
+    """
+    if not settings.HABIT_CHECKIN_BITMAPS or not changes:
+        return
+
+    by_year = defaultdict(list)
+    for day, completed in changes:
+        by_year[day.year].append((day_index(day), completed))
+
+    with transaction.atomic():
+        HabitYearBitmap.objects.bulk_create(
+            [HabitYearBitmap(habit_id=habit_id, year=year, bits=encode(0)) for year in by_year],
+            ignore_conflicts=True,
+        )
+        rows = list(
+            HabitYearBitmap.objects.select_for_update().filter(habit_id=habit_id, year__in=by_year)
+        )
+        for row in rows:
+            mask = decode(row.bits)
+            for index, completed in by_year[row.year]:
+                if completed:
+                    mask |= 1 << index
+                else:
+                    mask &= ~(1 << index)
+            row.bits = encode(mask)
+        HabitYearBitmap.objects.bulk_update(rows, ['bits'])
+
+
+def _year_masks(dates):
+    masks = defaultdict(int)
+    for day in dates:
+        masks[day.year] |= 1 << day_index(day)
+    return masks
+
+
+def rebuild_habit_bitmaps(habit_ids):
+    """
+    Перебудовує маски звичок з HabitCheckin незалежно від HABIT_CHECKIN_BITMAPS
+    (заповнення перед увімкненням); повертає кількість записаних років
+    """
+    habit_ids = list(habit_ids)
+    dates = defaultdict(list)
+    for habit_id, day in HabitCheckin.objects.filter(
+        habit_id__in=habit_ids, completed=True
+    ).values_list('habit_id', 'date').iterator(chunk_size=5000):
+        dates[habit_id].append(day)
+
+    rows = [
+        HabitYearBitmap(habit_id=habit_id, year=year, bits=encode(mask))
+        for habit_id, habit_dates in dates.items()
+        for year, mask in _year_masks(habit_dates).items()
+    ]
+    with transaction.atomic():
+        HabitYearBitmap.objects.filter(habit_id__in=habit_ids).delete()
+        HabitYearBitmap.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+BitmapMismatch = namedtuple('BitmapMismatch', ['habit_id', 'missing', 'extra'])
+
+
+def check_bitmap_consistency(habits=None, chunk_size=500):
+    """
+    Порівнює маски з виконаними HabitCheckin (2 запити на пачку звичок);
+    виправлення - rebuild_habit_bitmaps для звичок з розбіжностями
+
+    Args:
+        habits: queryset звичок (за замовчуванням - усі)
+
+    Returns:
+        список BitmapMismatch: missing - дні з чекіном, але без біта,
+        extra - біти без виконаного чекіну
+    """
+    if habits is None:
+        habits = Habit.objects.all()
+    habit_ids = list(habits.order_by('id').values_list('id', flat=True))
+
+    mismatches = []
+    for position in range(0, len(habit_ids), chunk_size):
+        chunk = habit_ids[position:position + chunk_size]
+
+        expected = defaultdict(lambda: defaultdict(int))
+        for habit_id, day in HabitCheckin.objects.filter(
+            habit_id__in=chunk, completed=True
+        ).values_list('habit_id', 'date'):
+            expected[habit_id][day.year] |= 1 << day_index(day)
+
+        stored = defaultdict(dict)
+        for habit_id, year, bits in HabitYearBitmap.objects.filter(
+            habit_id__in=chunk
+        ).values_list('habit_id', 'year', 'bits'):
+            stored[habit_id][year] = decode(bits)
+
+        for habit_id in chunk:
+            missing, extra = [], []
+            for year in set(expected[habit_id]) | set(stored[habit_id]):
+                want = expected[habit_id].get(year, 0)
+                have = stored[habit_id].get(year, 0)
+                origin = date(year, 1, 1)
+                missing += CheckinHistory(origin, want & ~have).days(origin, date(year, 12, 31))
+                extra += CheckinHistory(origin, have & ~want).days(origin, date(year, 12, 31))
+            if missing or extra:
+                mismatches.append(BitmapMismatch(habit_id, sorted(missing), sorted(extra)))
+
+    return mismatches
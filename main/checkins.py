@@ -0,0 +1,137 @@
+"""
+Пакетні чекіни звичок.
+
+Застосовує багато змін (habit_id, date, checked) однією транзакцією:
+один запит на звички, bulk_create відсутніх чекінів, читання всіх чекінів
+пакета під блокуванням та bulk_update змінених, один перерахунок streak
+на кожну зачеплену звичку, одне оновлення денного зведення та одне
+скидання кешу користувача. Заповнення місяця в календарі - один запит до
+API замість сотень.
+"""
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import invalidate_user_cache
+from .completion_rollup import refresh_daily_completion
+from .models import Habit, HabitCheckin
+from .streaks import record_checkins
+
+
+MAX_BULK_CHECKINS = 500
+
+
+def parse_checkin_entries(entries):
+    """
+    Перевіряє записи з тіла запиту
+
+    Returns:
+        OrderedDict {(habit_id, дата): checked або None для перемикання};
+        для повторів однієї пари діє останній запис
+
+    Raises:
+        ValueError: некоректний формат
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Checkins must be a non-empty list")
+    if len(entries) > MAX_BULK_CHECKINS:
+        raise ValueError(f"At most {MAX_BULK_CHECKINS} checkins per request")
+
+    parsed = OrderedDict()
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('habit_id'):
+            raise ValueError("Each checkin needs a habit_id")
+        try:
+            habit_id = int(entry['habit_id'])
+            day = datetime.strptime(entry['date'], '%Y-%m-%d').date() if entry.get('date') else timezone.localdate()
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid checkin: {entry}")
+
+        checked = entry.get('checked')
+        if checked is not None and not isinstance(checked, bool):
+            raise ValueError(f"Invalid checked value: {checked}")
+
+        key = (habit_id, day)
+        parsed.pop(key, None)
+        parsed[key] = checked
+    return parsed
+
+
+def apply_checkins(user, entries):
+    """
+    Застосовує пакет чекінів користувача
+
+    Args:
+        user: власник звичок
+        entries: результат parse_checkin_entries()
+
+    Returns:
+        список {'habit_id', 'name', 'streak_days', 'stats', 'checkins'}
+        для кожної зачепленої звички
+
+    Raises:
+        Habit.DoesNotExist: якщо хоча б одна звичка не належить користувачу
+    """
+    habit_ids = {habit_id for habit_id, _ in entries}
+    habits = Habit.objects.filter(user=user).in_bulk(habit_ids)
+    if len(habits) != len(habit_ids):
+        raise Habit.DoesNotExist(f"Habits not found: {sorted(habit_ids - set(habits))}")
+
+    with transaction.atomic():
+        # Відсутні записи створюються заздалегідь невиконаними (як зняття позначки в
+        # одиночному API), щоб прочитати стан усіх рядків пакета під блокуванням:
+        # паралельний одиночний чекін не змінить їх між читанням та записом
+        HabitCheckin.objects.bulk_create(
+            [HabitCheckin(habit_id=habit_id, date=day, completed=False) for habit_id, day in entries],
+            ignore_conflicts=True,
+        )
+        existing = {
+            (checkin.habit_id, checkin.date): checkin
+            for checkin in HabitCheckin.objects.select_for_update().filter(
+                habit_id__in=habit_ids,
+                date__in={day for _, day in entries},
+            )
+        }
+
+        to_update = []
+        changes = {habit_id: [] for habit_id in habit_ids}
+        results = {habit_id: [] for habit_id in habit_ids}
+
+        for (habit_id, day), checked in entries.items():
+            checkin = existing[(habit_id, day)]
+            was_completed = checkin.completed
+            completed = (not was_completed) if checked is None else checked
+
+            if completed != was_completed:
+                checkin.completed = completed
+                to_update.append(checkin)
+                changes[habit_id].append((day, completed))
+            results[habit_id].append({'date': day.isoformat(), 'completed': completed})
+
+        if to_update:
+            HabitCheckin.objects.bulk_update(to_update, ['completed'])
+
+        for habit_id, habit_changes in changes.items():
+            if habit_changes:
+                record_checkins(habits[habit_id], habit_changes)
+        refresh_daily_completion(user.id, {day for habit_changes in changes.values() for day, _ in habit_changes})
+
+        transaction.on_commit(lambda: invalidate_user_cache(user.id))
+
+    response = []
+    for habit_id in sorted(habit_ids):
+        habit = habits[habit_id]
+        response.append({
+            'habit_id': habit_id,
+            'name': habit.name,
+            'streak_days': habit.streak_days,
+            'stats': {
+                'current_streak': habit.streak_days,
+                'longest_streak': habit.max_streak_days,
+                'completion_rate': habit.overall_completion_rate(),
+            },
+            'checkins': results[habit_id],
+        })
+    return response
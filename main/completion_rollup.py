@@ -0,0 +1,126 @@
+"""
+Зведення виконання звичок по днях (DailyCompletion).
+
+Для кожного користувача і дня зберігаються кількість виконаних чекінів
+активних звичок та кількість активних звичок. Рядок дня перераховується при кожному
+записі чекіну (одиночний і пакетний API) та для днів з чекінами звички,
+яку поставили на паузу, відновили чи видалили, а кількість активних звичок
+сьогоднішнього рядка - при створенні, паузі чи видаленні звички. Минулі
+дні зберігають кількість активних звичок на свій момент, тож нова звичка
+не робить раніше повністю виконані дні "невиконаними".
+
+Календар читає зведення одним запитом за діапазон замість перегляду
+HabitCheckin та is_checked_today() по звичках. Сторінка статистики рахує
+чекіни всіх звичок, зокрема на паузі, тож бере їх з HabitCheckin.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import DailyCompletion, Habit, HabitCheckin
+
+
+def count_active_habits(user_id):
+    return Habit.objects.filter(user_id=user_id, active=True).count()
+
+
+def refresh_daily_completion(user_id, days):
+    """
+    Перераховує виконані чекіни для днів користувача (3 запити на будь-яку
+    кількість днів). Нові рядки отримують поточну кількість активних звичок,
+    наявні - зберігають свою.
+    """
+    days = set(days)
+    if not days:
+        return
+
+    counts = dict(
+        HabitCheckin.objects.filter(habit__user_id=user_id, habit__active=True, date__in=days, completed=True)
+        .values_list('date')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    active_count = count_active_habits(user_id)
+
+    DailyCompletion.objects.bulk_create(
+        [
+            DailyCompletion(
+                user_id=user_id, date=day,
+                completed_count=counts.get(day, 0), active_count=active_count
+            )
+            for day in sorted(days)
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=['completed_count'],
+    )
+
+
+def refresh_active_habit_count(user_id):
+    """Оновлює кількість активних звичок у сьогоднішньому рядку (після змін звичок)"""
+    DailyCompletion.objects.filter(user_id=user_id, date=timezone.localdate()).update(
+        active_count=count_active_habits(user_id)
+    )
+
+
+def get_completion_range(user_id, start_date, end_date, active_count=None):
+    """
+    Зведення за діапазон дат включно (один запит до DailyCompletion)
+
+    Args:
+        active_count: кількість активних звичок для днів без рядка
+            (за замовчуванням рахується окремим запитом)
+
+    Returns:
+        {дата: (completed_count, active_count)} для кожного дня діапазону
+    """
+    rows = {
+        day: (completed, active)
+        for day, completed, active in DailyCompletion.objects.filter(
+            user_id=user_id, date__range=(start_date, end_date)
+        ).values_list('date', 'completed_count', 'active_count')
+    }
+    if active_count is None and len(rows) <= (end_date - start_date).days:
+        active_count = count_active_habits(user_id)
+
+    result = {}
+    day = start_date
+    while day <= end_date:
+        result[day] = rows.get(day, (0, active_count))
+        day += timedelta(days=1)
+    return result
+
+
+def rebuild_daily_completion(user_ids=None):
+    """
+    Повністю перебудовує зведення з HabitCheckin (для користувачів або всіх).
+    Кількість активних звичок для всіх днів - поточна.
+
+    Returns:
+        кількість записаних рядків
+    """
+    checkins = HabitCheckin.objects.filter(completed=True, habit__active=True)
+    habits = Habit.objects.filter(active=True)
+    existing = DailyCompletion.objects.all()
+    if user_ids is not None:
+        checkins = checkins.filter(habit__user_id__in=user_ids)
+        habits = habits.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    active_counts = dict(habits.values_list('user_id').annotate(total=Count('id')).order_by())
+    rows = [
+        DailyCompletion(
+            user_id=user_id, date=day, completed_count=total,
+            active_count=active_counts.get(user_id, 0)
+        )
+        for user_id, day, total in (
+            checkins.values_list('habit__user_id', 'date').annotate(total=Count('id')).order_by()
+        )
+    ]
+
+    with transaction.atomic():
+        existing.delete()
+        DailyCompletion.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
@@ -1,8 +1,10 @@
-
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+from .instrumentation import InstrumentedConsumerMixin
+
+class NotificationConsumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
 	async def connect(self):
 		if self.scope["user"].is_authenticated:
 			self.group_name = f"user_{self.scope['user'].id}"
@@ -11,6 +13,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 				self.channel_name
 			)
 			await self.accept()
+			# Початкова кількість непрочитаних, далі клієнт отримує лише зміни
+			await self.send_unread_count()
 		else:
 			await self.close()
 
@@ -22,7 +26,27 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 			)
 
 	async def receive(self, text_data):
-		pass
+		try:
+			data = json.loads(text_data)
+		except (TypeError, ValueError):
+			return
+
+		if data.get('type') == 'ping':
+			await self.send(text_data=json.dumps({'type': 'pong'}))
+		elif data.get('type') == 'get_unread_count':
+			# Повна синхронізація (наприклад, після пропущених змін)
+			await self.send_unread_count()
+
+	@database_sync_to_async
+	def get_unread_count(self):
+		from .models import Notification
+		return Notification.objects.filter(user_id=self.scope['user'].id, read=False).count()
+
+	async def send_unread_count(self):
+		await self.send(text_data=json.dumps({
+			'type': 'unread_count',
+			'count': await self.get_unread_count()
+		}))
 
 	async def send_notification(self, event):
 		await self.send(text_data=json.dumps(event["notification"]))
@@ -34,5 +58,56 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 			'message': event['message'],
 			'notification_id': event.get('notification_id'),
 			'created_at': event.get('created_at'),
-			'notification_type': event.get('notification_type', 'general')
+			'notification_type': event.get('notification_type', 'general'),
+			'unread_delta': event.get('unread_delta', 1)
 		}))
+
+	async def unread_count_changed(self, event):
+		"""Обробник зміни кількості непрочитаних (наприклад, після прочитання)"""
+		await self.send(text_data=json.dumps({
+			'type': 'unread_count',
+			'delta': event['delta']
+		}))
+
+
+class TwoFactorConsumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
+	"""Результат 2FA для вікна входу: запит визначається сесією браузера"""
+
+	async def connect(self):
+		session = self.scope.get("session")
+		self.pending_id = await database_sync_to_async(session.get)('pending_2fa_id') if session else None
+		if not self.pending_id:
+			await self.close()
+			return
+
+		from .notification import twofa_group_name
+		self.group_name = twofa_group_name(self.pending_id)
+		await self.channel_layer.group_add(self.group_name, self.channel_name)
+		await self.accept()
+
+		# Результат міг надійти ще до підключення
+		status = await self.get_status()
+		if status != 'pending':
+			await self.send_status(status)
+
+	async def disconnect(self, close_code):
+		if hasattr(self, 'group_name'):
+			await self.channel_layer.group_discard(
+				self.group_name,
+				self.channel_name
+			)
+
+	@database_sync_to_async
+	def get_status(self):
+		from .models import Pending2FA
+		pending = Pending2FA.objects.filter(id=self.pending_id).only('confirmed', 'declined').first()
+		return pending.status if pending else 'expired'
+
+	async def send_status(self, status):
+		await self.send(text_data=json.dumps({
+			'type': '2fa_status',
+			'status': status
+		}))
+
+	async def twofa_status(self, event):
+		await self.send_status(event['status'])
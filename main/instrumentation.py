@@ -0,0 +1,250 @@
+"""
+Метрики запитів: SQL та час на кожен endpoint.
+
+RequestMetricsMiddleware (HTTP) та InstrumentedConsumerMixin (Channels)
+записують для кожного endpoint кількість запитів, а для вибірки з них
+(REQUEST_METRICS_SAMPLE_RATE) - кількість SQL-запитів, повторів того
+самого SQL (ознака N+1), час у БД та загальний час.
+
+SQL рахується через execute_wrapper, який ставиться на кожне з'єднання
+при створенні і читає активний записувач з contextvar, тож запити з
+потоків database_sync_to_async у consumer теж потрапляють у метрики.
+
+Значення накопичуються в пам'яті процесу і додаються до лічильників у
+кеші (Redis при REDIS_URL) не частіше ніж раз на FLUSH_INTERVAL секунд,
+тож накладні витрати на запит - кілька операцій зі словником.
+Читання: get_request_metrics(), /metrics (формат Prometheus) та
+manage.py request_metrics.
+"""
+import random
+import threading
+from contextvars import ContextVar
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import increment_counter
+
+
+METRICS_PREFIX = 'request_metrics'
+ENDPOINTS_KEY = f'{METRICS_PREFIX}:endpoints'
+FLUSH_INTERVAL = 5.0
+
+# requests рахується завжди, решта - лише для вибірки; час у мікросекундах
+COUNTERS = ('requests', 'sampled', 'queries', 'duplicate_queries', 'db_time_us', 'wall_time_us')
+
+UNMATCHED_ENDPOINT = 'unmatched'
+
+_active_recorder = ContextVar('request_metrics_recorder', default=None)
+
+
+class QueryRecorder:
+    """execute_wrapper: кількість запитів, повтори однакового SQL та час у БД"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._statements = set()
+        self.duplicates = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+            if sql in self._statements:
+                self.duplicates += 1
+            else:
+                self._statements.add(sql)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """Обробник connection_created: підключає _record_query до з'єднання"""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class MetricsAggregator:
+    """Лічильники процесу, що періодично додаються до кешу"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed_at = monotonic()
+        self._registered = set()
+
+    def add(self, endpoint, recorder=None, wall=0.0):
+        with self._lock:
+            values = self._pending.setdefault(endpoint, dict.fromkeys(COUNTERS, 0))
+            values['requests'] += 1
+            if recorder is not None:
+                values['sampled'] += 1
+                values['queries'] += recorder.count
+                values['duplicate_queries'] += recorder.duplicates
+                values['db_time_us'] += int(recorder.duration * 1_000_000)
+                values['wall_time_us'] += int(wall * 1_000_000)
+            due = monotonic() - self._flushed_at >= FLUSH_INTERVAL
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = monotonic()
+
+        if not pending:
+            return
+
+        if not self._registered.issuperset(pending):
+            # Реєстр endpoint-ів спільний для процесів; дописуємо відсутні
+            endpoints = set(cache.get(ENDPOINTS_KEY) or ()) | set(pending) | self._registered
+            cache.set(ENDPOINTS_KEY, sorted(endpoints), timeout=None)
+            self._registered = endpoints
+
+        for endpoint, values in pending.items():
+            for name, value in values.items():
+                if value:
+                    increment_counter(_metric_key(endpoint, name), value)
+
+
+_aggregator = MetricsAggregator()
+
+
+def _metric_key(endpoint, name):
+    return f'{METRICS_PREFIX}:{endpoint}:{name}'
+
+
+def should_sample():
+    rate = settings.REQUEST_METRICS_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
+def start_recording():
+    """Починає запис SQL для поточного контексту; None, якщо запит не у вибірці"""
+    if not should_sample():
+        return None, None
+    recorder = QueryRecorder()
+    return recorder, _active_recorder.set(recorder)
+
+
+def finish_recording(endpoint, recorder, token, started):
+    if token is not None:
+        _active_recorder.reset(token)
+    _aggregator.add(endpoint, recorder, perf_counter() - started)
+
+
+class RequestMetricsMiddleware:
+    """Метрики HTTP-запитів за іменем view (url name)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        started = perf_counter()
+        recorder, token = start_recording()
+        try:
+            return self.get_response(request)
+        finally:
+            match = request.resolver_match
+            finish_recording(match.view_name if match else UNMATCHED_ENDPOINT, recorder, token, started)
+
+
+class InstrumentedConsumerMixin:
+    """
+    Метрики для Channels consumer: кожна подія (connect, receive,
+    повідомлення групи) записується як endpoint "ws:<Consumer>:<тип події>"
+    """
+
+    async def dispatch(self, message):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return await super().dispatch(message)
+
+        started = perf_counter()
+        recorder, token = start_recording()
+        try:
+            return await super().dispatch(message)
+        finally:
+            endpoint = f'ws:{type(self).__name__}:{message["type"]}'
+            finish_recording(endpoint, recorder, token, started)
+
+
+def flush_request_metrics():
+    """Примусово записує накопичені в процесі значення в кеш"""
+    _aggregator.flush()
+
+
+def get_request_metrics():
+    """
+    Сумарні метрики всіх процесів за endpoint
+
+    Returns:
+        {endpoint: {лічильники COUNTERS}}, відсортовано за іменем
+    """
+    endpoints = cache.get(ENDPOINTS_KEY) or []
+    keys = [_metric_key(endpoint, name) for endpoint in endpoints for name in COUNTERS]
+    values = cache.get_many(keys)
+    return {
+        endpoint: {name: values.get(_metric_key(endpoint, name), 0) for name in COUNTERS}
+        for endpoint in endpoints
+    }
+
+
+def summarize(counters):
+    """Середні значення на запит у вибірці (для звіту)"""
+    sampled = counters['sampled']
+
+    def average(name, scale=1):
+        return round(counters[name] / sampled / scale, 2) if sampled else 0
+
+    return {
+        'requests': counters['requests'],
+        'sampled': sampled,
+        'avg_queries': average('queries'),
+        'avg_duplicate_queries': average('duplicate_queries'),
+        'avg_db_ms': average('db_time_us', 1000),
+        'avg_wall_ms': average('wall_time_us', 1000),
+    }
+
+
+def reset_request_metrics():
+    endpoints = cache.get(ENDPOINTS_KEY) or []
+    cache.delete_many([_metric_key(endpoint, name) for endpoint in endpoints for name in COUNTERS])
+    cache.delete(ENDPOINTS_KEY)
+    _aggregator._registered = set()
+
+
+PROMETHEUS_METRICS = (
+    ('requests', 'taskforge_requests_total', 'Requests handled', 1),
+    ('sampled', 'taskforge_sampled_requests_total', 'Requests with SQL and timing recorded', 1),
+    ('queries', 'taskforge_sql_queries_total', 'SQL queries in sampled requests', 1),
+    ('duplicate_queries', 'taskforge_duplicate_sql_queries_total', 'Repeated identical SQL in sampled requests', 1),
+    ('db_time_us', 'taskforge_db_seconds_total', 'Time spent in SQL in sampled requests', 1_000_000),
+    ('wall_time_us', 'taskforge_wall_seconds_total', 'Wall time of sampled requests', 1_000_000),
+)
+
+
+def render_prometheus(metrics):
+    """Текстовий формат Prometheus (exposition format 0.0.4)"""
+    lines = []
+    for counter, metric, help_text, scale in PROMETHEUS_METRICS:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for endpoint, counters in metrics.items():
+            label = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+            value = counters[counter] / scale if scale != 1 else counters[counter]
+            lines.append(f'{metric}{{endpoint="{label}"}} {value}')
+    return '\n'.join(lines) + '\n'
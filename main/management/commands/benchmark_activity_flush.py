@@ -0,0 +1,72 @@
+"""
+Бенчмарк зливу буфера активності в DailyActivity
+Використання: python manage.py benchmark_activity_flush [--users 100000] [--existing 0.5]
+
+Усі дані створюються в транзакції, яка відкочується після вимірювання.
+"""
+
+import datetime
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main.activity_tracker import MemoryActivityBuffer, flush_pending_activity, record_activity
+from main.models import DailyActivity
+
+
+class Command(BaseCommand):
+    help = 'Measures flushing buffered activity for many users: per-row UPDATE vs chunked bulk flush'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Users with buffered activity')
+        parser.add_argument('--existing', type=float, default=0.5, help='Share of users that already have a row for the day')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Pairs per chunk for the bulk flush')
+
+    def handle(self, *args, **options):
+        count = options['users']
+        scenarios = [
+            ('per-row UPDATE (record_activity loop)', self.run_per_row),
+            ('chunked bulk flush', lambda buffer: flush_pending_activity(buffer, options['chunk_size'])),
+        ]
+
+        for label, scenario in scenarios:
+            with transaction.atomic():
+                buffer = self.prepare(count, options['existing'])
+                started = perf_counter()
+                scenario(buffer)
+                duration = perf_counter() - started
+                rows = DailyActivity.objects.filter(user__username__startswith='bench_flush_').count()
+                transaction.set_rollback(True)
+
+            self.stdout.write(f'{label}: {count} users in {duration:.2f}s ({count / duration:.0f}/s, {rows} rows)')
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark completed'))
+
+    def prepare(self, count, existing):
+        """Створює користувачів, частину рядків дня та заповнює буфер"""
+        today = timezone.localdate()
+        User.objects.bulk_create(
+            [User(username=f'bench_flush_{i}', password='!') for i in range(count)], batch_size=5000
+        )
+        user_ids = list(
+            User.objects.filter(username__startswith='bench_flush_').order_by('id').values_list('id', flat=True)
+        )
+        DailyActivity.objects.bulk_create(
+            [DailyActivity(user_id=user_id, date=today, count=1) for user_id in user_ids[:int(count * existing)]],
+            batch_size=5000
+        )
+
+        buffer = MemoryActivityBuffer()
+        for i, user_id in enumerate(user_ids):
+            buffer.add(user_id, today, i % 5 + 1)
+            if i % 10 == 0:
+                buffer.add(user_id, today - datetime.timedelta(days=1), 1)
+        return buffer
+
+    def run_per_row(self, buffer):
+        for (user_id, day), amount in buffer.drain().items():
+            record_activity(user_id, day, amount)
+        buffer.ack()
@@ -0,0 +1,67 @@
+"""
+Бенчмарк доставки Telegram-повідомлень на локальній заглушці Bot API
+Використання: python manage.py benchmark_telegram [--messages 200] [--latency 0.02]
+"""
+
+import asyncio
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from telegram import Bot
+
+from main.telegram_client import TelegramClient
+from main.telegram_stub import StubTelegramServer
+
+
+BENCHMARK_TOKEN = '123456:benchmark'
+
+
+class Command(BaseCommand):
+    help = 'Compares per-message Bot + asyncio.run against the pooled TelegramClient on a local stub API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Messages per scenario')
+        parser.add_argument('--latency', type=float, default=0.0, help='Stub response latency in seconds')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        latency = options['latency']
+
+        scenarios = [
+            ('legacy: new Bot + asyncio.run per message', self.run_legacy),
+            ('pooled client: sequential send_message', self.run_pooled_sequential),
+            ('pooled client: send_batch', self.run_pooled_batch),
+        ]
+
+        for label, scenario in scenarios:
+            with StubTelegramServer(latency=latency) as stub:
+                started = perf_counter()
+                scenario(stub, count)
+                duration = perf_counter() - started
+
+            self.stdout.write(
+                f'{label}: {count} messages in {duration:.2f}s '
+                f'({count / duration:.0f}/s, {len(stub.connections)} connections)'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark completed'))
+
+    def run_legacy(self, stub, count):
+        for i in range(count):
+            bot = Bot(token=BENCHMARK_TOKEN, base_url=stub.base_url)
+            asyncio.run(bot.send_message(chat_id=i, text='benchmark'))
+
+    def run_pooled_sequential(self, stub, count):
+        client = TelegramClient(BENCHMARK_TOKEN, base_url=stub.base_url)
+        try:
+            for i in range(count):
+                client.send_message(chat_id=i, text='benchmark')
+        finally:
+            client.close()
+
+    def run_pooled_batch(self, stub, count):
+        client = TelegramClient(BENCHMARK_TOKEN, base_url=stub.base_url)
+        try:
+            client.send_batch([{'chat_id': i, 'text': 'benchmark'} for i in range(count)])
+        finally:
+            client.close()
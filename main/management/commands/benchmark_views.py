@@ -0,0 +1,68 @@
+"""
+Бенчмарк сторінок та задач сповіщень з перевіркою бюджетів
+Використання: python manage.py benchmark_views [--scale full|small] [--budget PATH] [--update-budgets]
+
+Усі дані створюються в транзакції, яка відкочується після вимірювання.
+Команда завершується помилкою, якщо перевищено бюджет запитів або часу.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main.benchmarks import (
+    BUDGET_FILE, METRICS, SCALES, budgets_from_results, check_budgets, load_budgets, run_benchmarks
+)
+
+
+class Command(BaseCommand):
+    help = 'Measures query count, DB time and wall time of the main views and tasks against a budget file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='full', help='Seeded data size')
+        parser.add_argument('--budget', default=str(BUDGET_FILE), help='Budget JSON file')
+        parser.add_argument(
+            '--queries-only',
+            action='store_true',
+            help='Check only query counts (timings depend on the machine)',
+        )
+        parser.add_argument(
+            '--update-budgets',
+            action='store_true',
+            help='Write the measured values as the new budgets for this scale',
+        )
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+
+        with transaction.atomic():
+            results = run_benchmarks(scale)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{"scenario":<30} {"queries":>8} {"db ms":>10} {"wall ms":>10}')
+        for name, measurement in results.items():
+            self.stdout.write(
+                f'{name:<30} {measurement.queries:>8} {measurement.db_ms:>10.1f} {measurement.wall_ms:>10.1f}'
+            )
+
+        if options['update_budgets']:
+            try:
+                budgets = load_budgets(options['budget'])
+            except FileNotFoundError:
+                budgets = {}
+            budgets[scale] = budgets_from_results(results)
+            with open(options['budget'], 'w', encoding='utf-8') as budget_file:
+                json.dump(budgets, budget_file, indent=2)
+                budget_file.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'✓ Budgets for "{scale}" written to {options["budget"]}'))
+            return
+
+        metrics = ('queries',) if options['queries_only'] else METRICS
+        violations = check_budgets(results, load_budgets(options['budget']).get(scale, {}), metrics)
+        if violations:
+            for violation in violations:
+                self.stderr.write(f'❌ {violation}')
+            raise CommandError(f'{len(violations)} budget violations')
+
+        self.stdout.write(self.style.SUCCESS('✓ All scenarios within budget'))
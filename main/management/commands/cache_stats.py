@@ -0,0 +1,28 @@
+"""
+Команда для перегляду лічильників попадань/промахів кешу
+Використання: python manage.py cache_stats [--reset]
+"""
+
+from django.core.management.base import BaseCommand
+from main.caching import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counters of the per-user cache namespaces'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        for name, stats in get_cache_stats().items():
+            self.stdout.write(
+                f'{name}: {stats["hits"]} hits, {stats["misses"]} misses ({stats["hit_rate"]}% hit rate)'
+            )
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('✓ Cache counters reset'))
@@ -0,0 +1,64 @@
+"""
+Команда для перевірки бітових масок чекінів проти таблиці HabitCheckin
+Використання: python manage.py check_checkin_bitmaps [--user <username>] [--fix]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from main.models import Habit
+from main.checkin_bitmap import check_bitmap_consistency, rebuild_habit_bitmaps
+
+
+class Command(BaseCommand):
+    help = 'Compares per-habit check-in bitmaps (HabitYearBitmap) with HabitCheckin rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Check only the habits of this username',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild the bitmaps of mismatching habits from HabitCheckin',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Mismatching habits to list (default 20)',
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.all()
+
+        username = options.get('user')
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" not found')
+            habits = habits.filter(user=user)
+
+        mismatches = check_bitmap_consistency(habits)
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✓ Bitmaps match HabitCheckin'))
+            return
+
+        for mismatch in mismatches[:options['limit']]:
+            self.stdout.write(
+                f'habit {mismatch.habit_id}: '
+                f'missing {[day.isoformat() for day in mismatch.missing[:5]]} ({len(mismatch.missing)}), '
+                f'extra {[day.isoformat() for day in mismatch.extra[:5]]} ({len(mismatch.extra)})'
+            )
+
+        if options['fix']:
+            # Маски записуються і з вимкненим HABIT_CHECKIN_BITMAPS - так їх заповнюють перед увімкненням
+            written = rebuild_habit_bitmaps(mismatch.habit_id for mismatch in mismatches)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Rebuilt bitmaps for {len(mismatches)} habits ({written} year rows written)'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(mismatches)} habits out of sync (run with --fix)'))
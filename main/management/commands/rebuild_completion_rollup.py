@@ -0,0 +1,35 @@
+"""
+Команда для перебудови денного зведення виконання звичок з історії чекінів
+Використання: python manage.py rebuild_completion_rollup [--user <username>]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from main.completion_rollup import rebuild_daily_completion
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-user daily completion rollup (DailyCompletion) from HabitCheckin history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Rebuild only the rollup of this username',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+
+        username = options.get('user')
+        if username:
+            try:
+                user_ids = [User.objects.get(username=username).id]
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" not found')
+
+        rows = rebuild_daily_completion(user_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Rebuilt {rows} daily completion rows')
+        )
@@ -0,0 +1,37 @@
+"""
+Команда для одноразової перебудови серій (streak) звичок з історії чекінів
+Використання: python manage.py rebuild_streaks [--user <username>]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from main.models import Habit
+from main.streaks import rebuild_all_streaks
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds habit streak runs and streak fields from HabitCheckin history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Rebuild only the habits of this username',
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.all()
+
+        username = options.get('user')
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" not found')
+            habits = habits.filter(user=user)
+
+        rebuilt = rebuild_all_streaks(habits)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Rebuilt streaks for {rebuilt} habits')
+        )
@@ -0,0 +1,52 @@
+"""
+Команда для перегляду метрик запитів за endpoint
+Використання: python manage.py request_metrics [--sort db] [--limit 20] [--reset]
+"""
+
+from django.core.management.base import BaseCommand
+from main.instrumentation import get_request_metrics, reset_request_metrics, summarize
+
+
+SORT_FIELDS = {
+    'requests': 'requests',
+    'queries': 'avg_queries',
+    'duplicates': 'avg_duplicate_queries',
+    'db': 'avg_db_ms',
+    'wall': 'avg_wall_ms',
+}
+
+
+class Command(BaseCommand):
+    help = 'Shows request count, SQL queries, duplicate queries, DB time and wall time per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=sorted(SORT_FIELDS), default='db', help='Column to sort by')
+        parser.add_argument('--limit', type=int, default=None, help='Show only the top N endpoints')
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        rows = [(endpoint, summarize(counters)) for endpoint, counters in get_request_metrics().items()]
+        rows.sort(key=lambda row: row[1][SORT_FIELDS[options['sort']]], reverse=True)
+        if options['limit']:
+            rows = rows[:options['limit']]
+
+        if not rows:
+            self.stdout.write('No request metrics recorded yet')
+        else:
+            self.stdout.write(
+                f'{"endpoint":<40} {"requests":>9} {"sampled":>8} {"queries":>8} '
+                f'{"dupes":>6} {"db ms":>8} {"wall ms":>8}'
+            )
+            for endpoint, stats in rows:
+                self.stdout.write(
+                    f'{endpoint:<40} {stats["requests"]:>9} {stats["sampled"]:>8} {stats["avg_queries"]:>8} '
+                    f'{stats["avg_duplicate_queries"]:>6} {stats["avg_db_ms"]:>8} {stats["avg_wall_ms"]:>8}'
+                )
+
+        if options['reset']:
+            reset_request_metrics()
+            self.stdout.write(self.style.SUCCESS('✓ Request metrics reset'))
@@ -0,0 +1,20 @@
+"""
+Команда для перегляду метрик обробки оновлень Telegram-бота
+Використання: python manage.py telegram_bot_stats
+"""
+
+from django.core.management.base import BaseCommand
+from main.bot_dispatcher import get_bot_metrics
+
+
+class Command(BaseCommand):
+    help = 'Shows in-flight and queued bot updates and their queue latency'
+
+    def handle(self, *args, **options):
+        metrics = get_bot_metrics()
+        if metrics is None:
+            self.stdout.write('No metrics published yet (is the bot running?)')
+            return
+
+        for name, value in metrics.items():
+            self.stdout.write(f'{name}: {"n/a" if value is None else value}')
@@ -0,0 +1,26 @@
+"""
+Команда для перегляду метрик доставки Telegram-повідомлень
+Використання: python manage.py telegram_delivery_stats [--reset]
+"""
+
+from django.core.management.base import BaseCommand
+from main.telegram_delivery import get_delivery_metrics, reset_delivery_metrics
+
+
+class Command(BaseCommand):
+    help = 'Shows Telegram delivery queue depth, counters and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset delivery counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        for name, value in get_delivery_metrics().items():
+            self.stdout.write(f'{name}: {"n/a" if value is None else value}')
+
+        if options['reset']:
+            reset_delivery_metrics()
+            self.stdout.write(self.style.SUCCESS('✓ Delivery counters reset'))
@@ -0,0 +1,52 @@
+"""
+Команда для керування webhook Telegram-бота
+Використання: python manage.py telegram_webhook set|delete|info [--url URL]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from telegram import Update
+
+from main.telegram_client import get_telegram_client
+
+
+class Command(BaseCommand):
+    help = 'Registers, removes or shows the Telegram webhook pointing at /telegram/webhook/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['set', 'delete', 'info'])
+        parser.add_argument('--url', default=None, help='Public webhook URL (defaults to TELEGRAM_WEBHOOK_URL)')
+
+    def handle(self, *args, **options):
+        client = get_telegram_client()
+        action = options['action']
+
+        if action == 'set':
+            url = options['url'] or settings.TELEGRAM_WEBHOOK_URL
+            if not url:
+                raise CommandError('Webhook URL is required (--url or TELEGRAM_WEBHOOK_URL)')
+            if not settings.TELEGRAM_WEBHOOK_SECRET:
+                # Без секрету webhook відхиляє всі оновлення (і приймати їх без нього небезпечно)
+                raise CommandError('TELEGRAM_WEBHOOK_SECRET is required to register the webhook')
+            client.run(client.bot.set_webhook(
+                url=url,
+                secret_token=settings.TELEGRAM_WEBHOOK_SECRET,
+                max_connections=settings.TELEGRAM_WEBHOOK_MAX_CONCURRENCY,
+                allowed_updates=Update.ALL_TYPES,
+            ))
+
+            from main.telegram_bot import setup_bot_commands
+            client.run(setup_bot_commands(client))  # потрібен лише атрибут .bot
+            self.stdout.write(self.style.SUCCESS(f'✓ Webhook set to {url}'))
+
+        elif action == 'delete':
+            client.run(client.bot.delete_webhook())
+            self.stdout.write(self.style.SUCCESS('✓ Webhook deleted, polling mode can be used again'))
+
+        else:
+            info = client.run(client.bot.get_webhook_info())
+            self.stdout.write(f'url: {info.url or "-"}')
+            self.stdout.write(f'pending updates: {info.pending_update_count}')
+            self.stdout.write(f'max connections: {info.max_connections or "-"}')
+            if info.last_error_message:
+                self.stdout.write(f'last error: {info.last_error_message}')
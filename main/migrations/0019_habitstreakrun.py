@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:14
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_streak_runs(apps, schema_editor):
+    """Будує серії з наявних виконаних чекінів і переносить їх у streak-поля звичок"""
+    Habit = apps.get_model('main', 'Habit')
+    HabitCheckin = apps.get_model('main', 'HabitCheckin')
+    HabitStreakRun = apps.get_model('main', 'HabitStreakRun')
+
+    runs = {}
+    for habit_id, day in HabitCheckin.objects.filter(completed=True).order_by(
+        'habit_id', 'date'
+    ).values_list('habit_id', 'date').iterator(chunk_size=5000):
+        habit_runs = runs.setdefault(habit_id, [])
+        if habit_runs and day - habit_runs[-1][1] <= timedelta(days=1):
+            habit_runs[-1][1] = day
+        else:
+            habit_runs.append([day, day])
+
+    rows = []
+    for habit_id, habit_runs in runs.items():
+        lengths = [(end - start).days + 1 for start, end in habit_runs]
+        rows += [
+            HabitStreakRun(habit_id=habit_id, start_date=start, end_date=end, length=length)
+            for (start, end), length in zip(habit_runs, lengths)
+        ]
+        Habit.objects.filter(pk=habit_id).update(
+            streak_days=lengths[-1],
+            last_checkin=habit_runs[-1][1],
+            max_streak_days=max(lengths),
+        )
+
+    HabitStreakRun.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_alter_goal_name_alter_goaltemplate_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitStreakRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('length', models.IntegerField(default=1)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='streak_runs', to='main.habit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['habit', 'end_date'], name='main_habits_habit_i_bc9185_idx'), models.Index(fields=['habit', 'start_date'], name='main_habits_habit_i_5cae1e_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_streak_runs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_habitstreakrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='telegram_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='telegram_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:52
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def backfill_daily_activity(apps, schema_editor):
+    """Переносить тиждень з кожного UserActivity у рядки DailyActivity"""
+    UserActivity = apps.get_model('main', 'UserActivity')
+    DailyActivity = apps.get_model('main', 'DailyActivity')
+
+    rows = []
+    for activity in UserActivity.objects.iterator(chunk_size=2000):
+        # reset_week() зберігав дату скидання, а не понеділок
+        monday = activity.week_start - datetime.timedelta(days=activity.week_start.weekday())
+        for offset, day in enumerate(WEEKDAYS):
+            count = getattr(activity, day)
+            if count > 0:
+                rows.append(DailyActivity(
+                    user_id=activity.user_id,
+                    date=monday + datetime.timedelta(days=offset),
+                    count=count
+                ))
+    DailyActivity.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_notification_telegram_delivery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='UserActivity',
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_daily_completion(apps, schema_editor):
+    """Заповнює зведення з наявних чекінів; кількість активних звичок - поточна"""
+    HabitCheckin = apps.get_model('main', 'HabitCheckin')
+    Habit = apps.get_model('main', 'Habit')
+    DailyCompletion = apps.get_model('main', 'DailyCompletion')
+
+    active_counts = dict(
+        Habit.objects.filter(active=True).values_list('user_id').annotate(total=Count('id')).order_by()
+    )
+    rows = (
+        HabitCheckin.objects.filter(completed=True, habit__active=True)
+        .values_list('habit__user_id', 'date')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    DailyCompletion.objects.bulk_create(
+        (
+            DailyCompletion(
+                user_id=user_id, date=day, completed_count=total,
+                active_count=active_counts.get(user_id, 0)
+            )
+            for user_id, day, total in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_dailyactivity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('active_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_completion, migrations.RunPython.noop),
+    ]
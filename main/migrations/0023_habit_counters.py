@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:39
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_habit_counters(apps, schema_editor):
+    """Заповнює лічильники звичок з наявних чекінів (один UPDATE)"""
+    Habit = apps.get_model('main', 'Habit')
+    HabitCheckin = apps.get_model('main', 'HabitCheckin')
+
+    today = timezone.localdate()
+    completed = HabitCheckin.objects.filter(habit=OuterRef('pk'), completed=True).order_by().values('habit')
+    recent = completed.filter(date__range=(today - timedelta(days=30), today))
+
+    Habit.objects.update(
+        completed_checkins=Coalesce(Subquery(completed.annotate(total=Count('id')).values('total')), Value(0)),
+        completed_30_days=Coalesce(Subquery(recent.annotate(total=Count('id')).values('total')), Value(0)),
+        first_checkin=Subquery(completed.annotate(first=Min('date')).values('first')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_dailycompletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='completed_30_days',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='completed_checkins',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='first_checkin',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_habit_counters, migrations.RunPython.noop),
+    ]
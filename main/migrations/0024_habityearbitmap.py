@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:46
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_year_bitmaps(apps, schema_editor):
+    """Заповнює маски з наявних виконаних чекінів"""
+    HabitCheckin = apps.get_model('main', 'HabitCheckin')
+    HabitYearBitmap = apps.get_model('main', 'HabitYearBitmap')
+
+    masks = defaultdict(int)
+    for habit_id, day in HabitCheckin.objects.filter(completed=True).values_list(
+        'habit_id', 'date'
+    ).iterator(chunk_size=5000):
+        masks[habit_id, day.year] |= 1 << (day.timetuple().tm_yday - 1)
+
+    HabitYearBitmap.objects.bulk_create(
+        (
+            HabitYearBitmap(habit_id=habit_id, year=year, bits=mask.to_bytes(46, 'little'))
+            for (habit_id, year), mask in masks.items()
+        ),
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_habit_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitYearBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('bits', models.BinaryField(max_length=46)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='year_bitmaps', to='main.habit')),
+            ],
+            options={
+                'unique_together': {('habit', 'year')},
+            },
+        ),
+        migrations.RunPython(backfill_year_bitmaps, migrations.RunPython.noop),
+    ]
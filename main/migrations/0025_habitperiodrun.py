@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:58
+
+import calendar
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def _period_bounds(day, frequency):
+    if frequency == 'weekly':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    return day.replace(day=1), day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _period_index(day, frequency):
+    if frequency == 'weekly':
+        return (day.toordinal() - 1) // 7
+    return day.year * 12 + day.month - 1
+
+
+def backfill_period_runs(apps, schema_editor):
+    """Будує серії періодів weekly/monthly звичок і перераховує їх streak"""
+    Habit = apps.get_model('main', 'Habit')
+    HabitCheckin = apps.get_model('main', 'HabitCheckin')
+    HabitPeriodRun = apps.get_model('main', 'HabitPeriodRun')
+
+    frequencies = dict(
+        Habit.objects.filter(frequency__in=('weekly', 'monthly')).values_list('id', 'frequency')
+    )
+    dates = defaultdict(list)
+    for habit_id, day in HabitCheckin.objects.filter(
+        habit_id__in=frequencies, completed=True
+    ).order_by('habit_id', 'date').values_list('habit_id', 'date').iterator(chunk_size=5000):
+        dates[habit_id].append(day)
+
+    rows = []
+    for habit_id, frequency in frequencies.items():
+        runs = []
+        for day in dates[habit_id]:
+            start, end = _period_bounds(day, frequency)
+            if runs and start - runs[-1][1] <= timedelta(days=1):
+                runs[-1][1] = end
+            else:
+                runs.append([start, end])
+        lengths = [_period_index(end, frequency) - _period_index(start, frequency) + 1 for start, end in runs]
+        rows += [
+            HabitPeriodRun(habit_id=habit_id, start_date=start, end_date=end, length=length)
+            for (start, end), length in zip(runs, lengths)
+        ]
+        Habit.objects.filter(pk=habit_id).update(
+            streak_days=lengths[-1] if lengths else 0,
+            max_streak_days=max(lengths, default=0),
+        )
+
+    HabitPeriodRun.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_habityearbitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitPeriodRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('length', models.IntegerField(default=1)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_runs', to='main.habit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['habit', 'end_date'], name='main_habitp_habit_i_73668b_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_period_runs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0025_habitperiodrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegramprofile',
+            name='timezone',
+            field=models.CharField(db_index=True, default='Europe/Kyiv', max_length=64),
+        ),
+    ]
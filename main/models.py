@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import (
+    Case, Count, Exists, F, FloatField, IntegerField, Min, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Cast, Coalesce, Round
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .periods import PERIOD_UNITS, period_index
+
 
 class TelegramProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='telegram_profile')
@@ -10,12 +17,47 @@ class TelegramProfile(models.Model):
     notifications_enabled = models.BooleanField(default=True) 
     two_factor_enabled = models.BooleanField(default=False)
     bind_code = models.CharField(max_length=6, null=True, blank=True)
+    # Часовий пояс користувача (IANA) для нагадувань перед локальною північчю
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE, db_index=True)
 
     def __str__(self):
         status = 'Connected' if self.connected else 'Not connected'
         return f"{self.user.username} - {status}"
 
 
+class HabitQuerySet(models.QuerySet):
+    def with_checked_on(self, day, name='checked_on'):
+        """Анотує, чи є виконаний чекін за день, підзапитом Exists (без запиту на звичку)"""
+        return self.annotate(**{
+            name: Exists(HabitCheckin.objects.filter(habit=OuterRef('pk'), date=day, completed=True))
+        })
+
+    def with_checked_today(self, today=None):
+        """Анотує checked_today, яку використовує Habit.is_checked_today()"""
+        return self.with_checked_on(today or timezone.localdate(), name='checked_today')
+
+    def with_window_completed(self, today=None):
+        """
+        Анотує window_completed, яку використовує Habit.completion_rate:
+        лічильник completed_30_days, а для звичок з незаповненими лічильниками
+        (first_checkin is null) - кількість чекінів у вікні підзапитом, що
+        виконується лише для таких рядків
+        """
+        from .streaks import completion_window
+
+        recent = (
+            HabitCheckin.objects.filter(habit=OuterRef('pk'), completed=True, date__range=completion_window(today))
+            .order_by()
+            .values('habit')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        return self.annotate(window_completed=Case(
+            When(first_checkin__isnull=True, then=Coalesce(Subquery(recent), Value(0))),
+            default=F('completed_30_days'),
+        ))
+
+
 class Habit(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='habits')
     name = models.CharField(max_length=70)
@@ -23,6 +65,10 @@ class Habit(models.Model):
     streak_days = models.IntegerField(default=0)
     max_streak_days = models.IntegerField(default=0)
     last_checkin = models.DateField(null=True, blank=True)
+    # Лічильники виконаних чекінів, які підтримує streaks.refresh_habit_streak
+    completed_checkins = models.IntegerField(default=0)
+    completed_30_days = models.IntegerField(default=0)
+    first_checkin = models.DateField(null=True, blank=True)
     frequency = models.CharField(
         max_length=20,
         choices=[('daily','Daily'), ('weekly','Weekly'), ('monthly','Monthly')]
@@ -30,33 +76,41 @@ class Habit(models.Model):
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = HabitQuerySet.as_manager()
+
+    COMPLETION_WINDOW_DAYS = 30
+
     def __str__(self):
         return self.name
     
     def is_checked_today(self):
-        from django.utils import timezone
-        today = timezone.now().date()
+        # Використовуємо анотацію з Habit.objects.with_checked_today(), якщо вона є
+        if hasattr(self, 'checked_today'):
+            return self.checked_today
+        today = timezone.localdate()
         return self.checkins.filter(date=today, completed=True).exists()
     
     @property
     def current_streak(self):
-        """Повертає актуальний streak, враховуючи пропущені дні"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
+        """Повертає актуальний streak у періодах частоти, враховуючи пропущені періоди"""
         if not self.last_checkin:
             return 0
         
-        today = timezone.now().date()
-        days_since_last = (today - self.last_checkin).days
+        today = timezone.localdate()
+        periods_since_last = period_index(today, self.frequency) - period_index(self.last_checkin, self.frequency)
         
-        # Якщо останній чекін був сьогодні чи вчора – streak актуальний
-        if days_since_last <= 1:
+        # Якщо останній чекін був у поточному чи попередньому періоді – streak актуальний
+        if periods_since_last <= 1:
             return self.streak_days
         
-        # Якщо минуло більше дня - streak перервано
+        # Якщо пропущено цілий період - streak перервано
         return 0
     
+    @property
+    def streak_unit(self):
+        """Одиниця streak для повідомлень: day, week або month"""
+        return PERIOD_UNITS.get(self.frequency, 'day')
+    
     @property
     def longest_streak(self):
         """Повертає максимальний streak за весь час"""
@@ -64,27 +118,51 @@ class Habit(models.Model):
     
     @property
     def completion_rate(self):
+        """
+        Відсоток виконання за 30 днів з лічильника completed_30_days.
+        Лічильники веде streaks.record_checkin; якщо вони ще не заповнені
+        (чекіни створені в обхід нього - адмінка, фікстури), рахуємо чекіни.
+        Списки звичок беруть обидва варіанти з Habit.objects.with_window_completed()
+        """
+        if hasattr(self, 'window_completed'):
+            completed = self.window_completed
+        elif self.first_checkin is None:
+            from .streaks import completion_window
+            completed = self.checkins.filter(completed=True, date__range=completion_window()).count()
+        else:
+            completed = self.completed_30_days
+        return self.calculate_completion_rate(self.frequency, completed)
+
+    def overall_completion_rate(self, today=None):
+        """Відсоток виконаних днів від створення звички (або першого чекіну заднім числом)"""
         from django.utils import timezone
-        from datetime import timedelta
-        
-        today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        
+
+        if today is None:
+            today = timezone.localdate()
+        completed, first_checkin = self.completed_checkins, self.first_checkin
+        if first_checkin is None:
+            # Лічильники ще не заповнені - рахуємо чекіни, як completion_rate
+            totals = self.checkins.filter(completed=True).aggregate(total=Count('id'), first=Min('date'))
+            completed, first_checkin = totals['total'], totals['first']
+
+        start = self.created_at.date()
+        if first_checkin and first_checkin < start:
+            start = first_checkin
+
+        total_days = (today - start).days + 1
+        return round((completed / total_days) * 100) if total_days > 0 else 0
+
+    @staticmethod
+    def calculate_completion_rate(frequency, completed_count):
+        """Відсоток виконання за 30 днів за кількістю виконаних чекінів"""
         # Кількість днів в періоді
-        if self.frequency == 'daily':
+        if frequency == 'daily':
             total_possible = 30
-        elif self.frequency == 'weekly':
+        elif frequency == 'weekly':
             total_possible = 4  # приблизно 4 тижні в місяці
         else:
             total_possible = 1  # для monthly
         
-        # Кількість завершених днів
-        completed_count = self.checkins.filter(
-            date__gte=thirty_days_ago,
-            date__lte=today,
-            completed=True
-        ).count()
-        
         if total_possible == 0:
             return 0
         
@@ -101,7 +179,44 @@ class HabitCheckin(models.Model):
 
     class Meta:
         unique_together = ('habit', 'date')
-        
+
+
+class HabitStreakRun(models.Model):
+    """Безперервна серія виконаних днів звички (межі серії включно)"""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='streak_runs')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    length = models.IntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['habit', 'end_date']),
+            models.Index(fields=['habit', 'start_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.habit.name}: {self.start_date} – {self.end_date} ({self.length})"
+
+
+class HabitPeriodRun(models.Model):
+    """
+    Безперервна серія тижнів чи місяців з виконаними чекінами для weekly та
+    monthly звичок (межі - перший день першого та останній день останнього
+    періоду, length - кількість періодів)
+    """
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='period_runs')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    length = models.IntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['habit', 'end_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.habit.name}: {self.start_date} – {self.end_date} ({self.length})"
+
 
 class HabitTemplate(models.Model):
     name = models.CharField(max_length=70)
@@ -115,6 +230,24 @@ class HabitTemplate(models.Model):
         return self.name
 
 
+class GoalQuerySet(models.QuerySet):
+    def with_progress(self):
+        """Анотує кількість підцілей та відсоток виконання одним запитом"""
+        return self.annotate(
+            total_subgoals=Count('subgoals', distinct=True),
+            completed_subgoals=Count('subgoals', filter=Q(subgoals__completed=True), distinct=True),
+        ).annotate(
+            progress_percent=Case(
+                When(total_subgoals=0, then=Value(0)),
+                default=Cast(
+                    Round(Cast(F('completed_subgoals'), FloatField()) * 100 / F('total_subgoals')),
+                    IntegerField(),
+                ),
+                output_field=IntegerField(),
+            )
+        )
+
+
 class Goal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals')
     name = models.CharField(max_length=70)
@@ -124,18 +257,31 @@ class Goal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     notify_before_days = models.IntegerField(default=1)
 
+    objects = GoalQuerySet.as_manager()
+
     def get_progress_percent(self):
         """Розраховує відсоток виконання цілі на основі завершених підцілей"""
-        total_subgoals = self.subgoals.count()
+        # Використовуємо анотацію з Goal.objects.with_progress(), якщо вона є
+        if hasattr(self, 'progress_percent'):
+            return self.progress_percent
+        total_subgoals = self.get_total_subgoals_count()
         if total_subgoals == 0:
             return 0
-        completed_subgoals = self.subgoals.filter(completed=True).count()
+        completed_subgoals = self.get_completed_subgoals_count()
         return round((completed_subgoals / total_subgoals) * 100)
 
     def get_completed_subgoals_count(self):
         """Повертає кількість завершених підцілей"""
+        if hasattr(self, 'completed_subgoals'):
+            return self.completed_subgoals
         return self.subgoals.filter(completed=True).count()
 
+    def get_total_subgoals_count(self):
+        """Повертає загальну кількість підцілей"""
+        if hasattr(self, 'total_subgoals'):
+            return self.total_subgoals
+        return self.subgoals.count()
+
     def __str__(self):
         return self.name
 
@@ -186,6 +332,8 @@ class Notification(models.Model):
         default='general'
     )
     telegram_sent = models.BooleanField(default=False)
+    telegram_attempts = models.PositiveSmallIntegerField(default=0)
+    telegram_error = models.CharField(max_length=255, blank=True, default='')
     web_sent = models.BooleanField(default=False)
     scheduled_time = models.DateTimeField(null=True, blank=True)
     related_habit_id = models.IntegerField(null=True, blank=True)
@@ -207,75 +355,62 @@ class Pending2FA(models.Model):
     confirmed = models.BooleanField(default=False)
     declined = models.BooleanField(default=False)  # Поле для відхилених запитів
 
+    @property
+    def status(self):
+        """Статус запиту для браузера: approved / declined / pending"""
+        if self.confirmed:
+            return 'approved'
+        if self.declined:
+            return 'declined'
+        return 'pending'
+
+
+class DailyActivity(models.Model):
+    """Лічильник активності користувача за день (часовий ряд, рядки лише додаються)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
 
-class UserActivity(models.Model):
-    """Модель для трекинга активності користувача по дням тижня"""
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='activity')
-    
-    # Активність по дням тижня (0 = Понеділок, 6 = Неділя)
-    monday = models.IntegerField(default=0)
-    tuesday = models.IntegerField(default=0)
-    wednesday = models.IntegerField(default=0)
-    thursday = models.IntegerField(default=0)
-    friday = models.IntegerField(default=0)
-    saturday = models.IntegerField(default=0)
-    sunday = models.IntegerField(default=0)
-
-    # Мета-інформація
-    week_start = models.DateField(default=timezone.now)  # Початок поточного тижня
-    total_activities = models.IntegerField(default=0)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        # Унікальний індекс (user, date) обслуговує і upsert, і запити за діапазон дат
+        unique_together = ('user', 'date')
 
     def __str__(self):
-        return f"{self.user.username} - Week {self.week_start} (Total: {self.total_activities})"
-    
-    def get_day_activity(self, day_name):
-        """Отримати активність за конкретний день"""
-        day_mapping = {
-            'monday': self.monday,
-            'tuesday': self.tuesday,
-            'wednesday': self.wednesday,
-            'thursday': self.thursday,
-            'friday': self.friday,
-            'saturday': self.saturday,
-            'sunday': self.sunday,
-        }
-        return day_mapping.get(day_name.lower(), 0)
-    
-    def add_activity(self, day_name, amount=1):
-        """Добавити активність за конкретний день"""
-        day_mapping = {
-            'monday': 'monday',
-            'tuesday': 'tuesday', 
-            'wednesday': 'wednesday',
-            'thursday': 'thursday',
-            'friday': 'friday',
-            'saturday': 'saturday',
-            'sunday': 'sunday',
-        }
-        
-        field_name = day_mapping.get(day_name.lower())
-        if field_name:
-            current_value = getattr(self, field_name)
-            setattr(self, field_name, current_value + amount)
-            self.total_activities += amount
-            self.save()
-    
-    def get_weekly_data(self):
-        """Отримати дані тижня в форматі для чарта"""
-        return [
-            self.monday, self.tuesday, self.wednesday,
-            self.thursday, self.friday, self.saturday, self.sunday
-        ]
-    
-    def reset_week(self):
-        """Скинути дані тижня"""
-        self.monday = self.tuesday = self.wednesday = 0
-        self.thursday = self.friday = self.saturday = self.sunday = 0
-        self.total_activities = 0
-        self.week_start = timezone.now().date()
-        self.save()
+        return f"{self.user.username} - {self.date}: {self.count}"
+
+
+class DailyCompletion(models.Model):
+    """
+    Зведення виконання звичок користувача за день (main.completion_rollup):
+    кількість виконаних чекінів та кількість активних звичок на момент
+    останнього оновлення рядка
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_completions')
+    date = models.DateField()
+    completed_count = models.PositiveIntegerField(default=0)
+    active_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date}: {self.completed_count}/{self.active_count}"
+
+
+class HabitYearBitmap(models.Model):
+    """
+    Виконані дні звички за рік як бітова маска (main.checkin_bitmap):
+    біт i - день року i + 1, little-endian, 366 біт у 46 байтах
+    """
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='year_bitmaps')
+    year = models.PositiveSmallIntegerField()
+    bits = models.BinaryField(max_length=46)
+
+    class Meta:
+        unique_together = ('habit', 'year')
+
+    def __str__(self):
+        return f"{self.habit.name} - {self.year}"
 
 
 class TechAdmin(models.Model):
@@ -1,5 +1,5 @@
 # myapp/notifications.py
-from datetime import date
+from django.utils import timezone
 
 from .models import Habit, HabitCheckin, Notification
 from asgiref.sync import async_to_sync
@@ -7,7 +7,7 @@ from channels.layers import get_channel_layer
 
 
 
-def send_web_notification(user, message, notification_id=None, created_at=None):
+def send_web_notification(user, message, notification_id=None, created_at=None, unread_delta=1):
     """ 
 Надсилає веб-повідомлення через WebSocket 
 
@@ -16,6 +16,7 @@ Args:
     message: Текст повідомлення 
     notification_id: ID повідомлення з БД (опціонально) 
     created_at: Дата створення (опціонально) 
+    unread_delta: На скільки змінюється кількість непрочитаних (0 для вже прочитаних)
 """
     channel_layer = get_channel_layer()
     
@@ -27,20 +28,49 @@ Args:
             "message": message,
             "notification_id": notification_id,
             "created_at": created_at.isoformat() if created_at else None,
-            "notification_type": "general"
+            "notification_type": "general",
+            "unread_delta": unread_delta
         }
     )
 
+
+def send_unread_count_delta(user_id, delta):
+    """Надсилає зміну кількості непрочитаних у всі вкладки користувача"""
+    if not delta:
+        return
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"user_{user_id}",
+        {
+            "type": "unread_count_changed",
+            "delta": delta
+        }
+    )
+
+def twofa_group_name(pending_id):
+    """Група каналу для одного запиту входу з 2FA"""
+    return f"twofa_{pending_id}"
+
+
+async def publish_2fa_status(pending_id, status):
+    """Публікує результат 2FA (approved / declined / expired) у вікно входу"""
+    channel_layer = get_channel_layer()
+    await channel_layer.group_send(
+        twofa_group_name(pending_id),
+        {
+            "type": "twofa_status",
+            "status": status
+        }
+    )
+
+
 def send_telegram_notification(user, message):
-    from main.telegram_bot import TOKEN
-    from telegram import Bot
-    import asyncio
+    from .telegram_client import get_telegram_client
     profile = getattr(user, 'telegram_profile', None)
     if profile and profile.connected and profile.telegram_id and profile.notifications_enabled:
-        bot = Bot(token=TOKEN)
         try:
-            # Використовуємо синхронне відправлення через asyncio.run
-            asyncio.run(bot.send_message(chat_id=profile.telegram_id, text=message))
+            # Спільний клієнт процесу: event loop та пул з'єднань перевикористовуються
+            get_telegram_client().send_message(chat_id=profile.telegram_id, text=message)
             print(f"✅ Telegram notification sent to user {user.username}")
         except Exception as e:
             print(f"❌ Помилка відправки Telegram: {e}")
@@ -49,7 +79,7 @@ def send_telegram_notification(user, message):
 def check_user_habits(user):
     for habit in user.habits.filter(active=True):
         last_checkin = habit.checkins.order_by('-date').first()
-        today = date.today()
+        today = timezone.localdate()
 
         if last_checkin and (today - last_checkin.date).days > 1:
             message = f"Ви втратили серію у звичці «{habit.name}»!"
@@ -57,7 +87,7 @@ def check_user_habits(user):
             send_web_notification(user, message, notification_id=notification.id, created_at=notification.created_at)
             send_telegram_notification(user, message)
         elif last_checkin and (today - last_checkin.date).days == 0:
-            streak_length = habit.checkins.filter(completed=True).count()
+            streak_length = habit.completed_checkins
             message = f"Ви не хочете втратити вашу {streak_length}-денну серію у «{habit.name}»?"
             notification = Notification.objects.create(user=user, message=message, send_web=True, send_telegram=True)
             send_web_notification(user, message, notification_id=notification.id, created_at=notification.created_at)
@@ -0,0 +1,44 @@
+"""
+Періоди звичок за частотою: день, ISO-тиждень (з понеділка) або
+календарний місяць. Streak звички - кількість послідовних періодів,
+у кожному з яких є хоча б один виконаний чекін.
+"""
+import calendar
+from datetime import timedelta
+
+
+PERIOD_UNITS = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}
+
+# Частоти, для яких streak ведеться окремими серіями періодів (HabitPeriodRun)
+PERIODIC_FREQUENCIES = ('weekly', 'monthly')
+
+
+def period_index(day, frequency):
+    """Номер періоду дня; сусідні періоди мають сусідні номери"""
+    if frequency == 'weekly':
+        # 01.01.0001 - понеділок, тож тижні збігаються з ISO
+        return (day.toordinal() - 1) // 7
+    if frequency == 'monthly':
+        return day.year * 12 + day.month - 1
+    return day.toordinal()
+
+
+def period_bounds(day, frequency):
+    """Перший та останній день періоду, що містить day"""
+    if frequency == 'weekly':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if frequency == 'monthly':
+        return day.replace(day=1), day.replace(day=calendar.monthrange(day.year, day.month)[1])
+    return day, day
+
+
+def periods_between(start, end, frequency):
+    """Кількість періодів від start до end включно"""
+    return period_index(end, frequency) - period_index(start, frequency) + 1
+
+
+def previous_period_start(today, frequency):
+    """Перший день попереднього періоду: streak живий, якщо останній чекін не раніше"""
+    start, _ = period_bounds(today, frequency)
+    return period_bounds(start - timedelta(days=1), frequency)[0]
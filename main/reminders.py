@@ -0,0 +1,109 @@
+"""
+Розклад нагадувань про streak за часовими поясами користувачів.
+
+Нагадування надсилаються за 2 години, 1 годину, 30, 15 та 5 хвилин до
+локальної півночі. Щохвилинна задача generate_habit_notifications бере
+часові пояси, що використовуються (індекс TelegramProfile.timezone), рахує
+для кожного хвилини до його півночі та обробляє лише користувачів тих
+поясів, у яких зараз одна з цих позначок. Переходи на літній час
+враховуються автоматично, бо зсув поясу рахується на поточний момент.
+
+Так само за локальним часом поясу працюють нічні задачі нового дня:
+перевірка обірваних streak (00:05) та зсув вікна лічильників (00:10)
+обробляють лише пояси, де щойно настала ця хвилина, з їхньою локальною датою.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from .user_timezone import load_zone
+
+
+MINUTES_PER_DAY = 24 * 60
+
+# Хвилини до локальної півночі -> підпис у тексті нагадування
+REMINDER_MARKS = {
+    120: "2 hours",
+    60: "1 hour",
+    30: "30 minutes",
+    15: "15 minutes",
+    5: "5 minutes",
+}
+
+# Хвилини після локальної півночі для нічних задач нового дня
+BROKEN_STREAKS_MINUTE = 5
+COMPLETION_COUNTS_MINUTE = 10
+
+ReminderGroup = namedtuple('ReminderGroup', ['minutes', 'label', 'local_date', 'timezones'])
+
+
+def minutes_to_midnight(now, zone):
+    """Цілі хвилини від поточної хвилини до локальної півночі поясу"""
+    local = now.astimezone(zone)
+    return MINUTES_PER_DAY - (local.hour * 60 + local.minute)
+
+
+def due_reminder_groups(now, timezones):
+    """
+    Групує часові пояси, для яких у поточну хвилину настає позначка
+    нагадування, за (позначка, локальна дата)
+
+    Args:
+        now: aware datetime
+        timezones: назви поясів, що використовуються
+
+    Returns:
+        список ReminderGroup (порожній, якщо жодна позначка не настала)
+    """
+    groups = {}
+    for name in set(timezones):
+        zone = load_zone(name)
+        if zone is None:
+            continue
+        minutes = minutes_to_midnight(now, zone)
+        if minutes in REMINDER_MARKS:
+            key = (minutes, now.astimezone(zone).date())
+            groups.setdefault(key, []).append(name)
+
+    return [
+        ReminderGroup(minutes, REMINDER_MARKS[minutes], local_date, sorted(names))
+        for (minutes, local_date), names in sorted(groups.items(), reverse=True)
+    ]
+
+
+def zones_at_local_minute(now, timezones, minute):
+    """
+    Групує часові пояси, у яких зараз локальна хвилина доби minute
+    (хвилини після півночі), за локальною датою
+
+    Returns:
+        {локальна дата: [пояси]} (порожній, якщо ніде не ця хвилина)
+    """
+    groups = {}
+    for name in set(timezones):
+        zone = load_zone(name)
+        if zone is None:
+            continue
+        local = now.astimezone(zone)
+        if local.hour * 60 + local.minute == minute:
+            groups.setdefault(local.date(), []).append(name)
+    return {local_date: sorted(names) for local_date, names in sorted(groups.items())}
+
+
+def in_timezones(timezones, prefix='user__'):
+    """Умова для записів користувачів з цих поясів (користувачі без профілю - пояс сервера)"""
+    condition = Q(**{f'{prefix}telegram_profile__timezone__in': timezones})
+    if settings.TIME_ZONE in timezones:
+        condition |= Q(**{f'{prefix}telegram_profile__isnull': True})
+    return condition
+
+
+def used_timezones():
+    """Часові пояси користувачів (один запит по індексу) та пояс за замовчуванням"""
+    from .models import TelegramProfile
+
+    zones = set(TelegramProfile.objects.order_by().values_list('timezone', flat=True).distinct())
+    # Користувачі без профілю отримують нагадування за часовим поясом сервера
+    zones.add(settings.TIME_ZONE)
+    return zones
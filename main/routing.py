@@ -1,6 +1,13 @@
 from django.urls import re_path
 from . import consumers
+from .telegram_webhook import TelegramWebhookConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
+    re_path(r'ws/2fa/$', consumers.TwoFactorConsumer.as_asgi()),
+]
+
+# HTTP-маршрути поза Django (монтуються в TaskForge.asgi перед Django)
+http_urlpatterns = [
+    re_path(r'^telegram/webhook/$', TelegramWebhookConsumer.as_asgi()),
 ]
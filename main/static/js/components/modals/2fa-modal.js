@@ -5,7 +5,10 @@
 console.log('2FA modal component initialized');
 
 // Глобальные переменные для 2FA
-let authPollingInterval = null;
+// Ожидание результата: WebSocket, при его недоступности - long-poll запросы
+let authSocket = null;
+let authLongPollController = null;
+let authWaitActive = false;
 let countdownInterval = null;
 let countdownTime = 300; // 5 минут в секундах
 
@@ -34,12 +37,8 @@ function hide2FAModal() {
 		modal.classList.remove('active');
 		clearCountdownTimer();
 
-		// Останавливаем polling если он активен
-		if (authPollingInterval) {
-			console.log('Stopping auth polling interval on modal hide');
-			clearInterval(authPollingInterval);
-			authPollingInterval = null;
-		}
+		// Прекращаем ожидание результата
+		stopWaitingForAuth();
 	}
 }
 
@@ -97,17 +96,9 @@ function init2FAModalHandlers() {
 async function decline2FA() {
 	console.log('🚫 decline2FA called');
 	console.log('🚫 show2faUser:', window.show2faUser);
-	console.log('🚫 authPollingInterval:', authPollingInterval);
-
-	// Останавливаем polling если он активен
-	if (authPollingInterval) {
-		console.log('🚫 Stopping auth polling interval');
-		clearInterval(authPollingInterval);
-		authPollingInterval = null;
-		console.log('🚫 Auth polling stopped');
-	} else {
-		console.log('🚫 No active polling to stop');
-	}
+
+	// Прекращаем ожидание результата
+	stopWaitingForAuth();
 
 	if (!window.show2faUser) {
 		console.log('🚫 No show2faUser, hiding modal and redirecting');
@@ -200,12 +191,8 @@ function clearCountdownTimer() {
 async function handle2FATimeout() {
 	console.log('⏰ 2FA request timed out');
 
-	// Останавливаем polling если он активен
-	if (authPollingInterval) {
-		console.log('⏰ Stopping auth polling due to timeout');
-		clearInterval(authPollingInterval);
-		authPollingInterval = null;
-	}
+	// Прекращаем ожидание результата
+	stopWaitingForAuth();
 
 	// Отправляем запрос на сервер об истечении времени
 	if (window.show2faUser) {
@@ -280,49 +267,133 @@ function showTimeoutMessage() {
 }
 
 /**
- * Опитування сервера для перевірки статусу 2FA автентифікації
+ * Ожидание результата 2FA: сервер сам присылает его после нажатия кнопки в Telegram
+ * (WebSocket /ws/2fa/, при недоступности - long-poll /api/wait_2fa_status/)
  * @param {string} username - имя пользователя для проверки
  */
 function startPollingForAuth(username) {
-	console.log('🔄 Starting polling for user:', username);
+	console.log('🔄 Waiting for 2FA result for user:', username);
+
+	stopWaitingForAuth();
+	authWaitActive = true;
 
-	// Останавливаем предыдущий polling если он есть
-	if (authPollingInterval) {
-		clearInterval(authPollingInterval);
+	if (!('WebSocket' in window)) {
+		longPollForAuth(username);
+		return;
 	}
 
-	authPollingInterval = setInterval(() => {
+	const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+	let resultReceived = false;
+
+	try {
+		authSocket = new WebSocket(`${protocol}//${window.location.host}/ws/2fa/`);
+	} catch (error) {
+		console.error('❌ 2FA WebSocket failed, falling back to long-poll:', error);
+		longPollForAuth(username);
+		return;
+	}
+
+	authSocket.onmessage = function (e) {
+		const data = JSON.parse(e.data);
+		if (data.type === '2fa_status') {
+			resultReceived = true;
+			handleAuthStatus(username, data.status);
+		}
+	};
+
+	authSocket.onclose = function () {
+		authSocket = null;
+		// Соединение закрылось без результата - продолжаем через long-poll
+		if (authWaitActive && !resultReceived) {
+			console.log('🔄 2FA WebSocket closed, falling back to long-poll');
+			longPollForAuth(username);
+		}
+	};
+}
+
+/**
+ * Long-poll: каждый запрос висит на сервере до результата или таймаута
+ */
+function longPollForAuth(username) {
+	if (!authWaitActive) return;
+
+	authLongPollController = new AbortController();
+	fetch('/api/wait_2fa_status/', { cache: 'no-cache', signal: authLongPollController.signal })
+		.then(response => response.json())
+		.then(data => {
+			console.log('🔄 Long-poll response:', data);
+			if (data.status === 'pending') {
+				longPollForAuth(username);
+			} else {
+				handleAuthStatus(username, data.status);
+			}
+		})
+		.catch(error => {
+			if (error.name === 'AbortError') return;
+			console.error('Error waiting for 2FA status:', error);
+			// Повтор с паузой, чтобы не нагружать сервер при сбоях сети
+			setTimeout(() => longPollForAuth(username), 3000);
+		});
+}
+
+/**
+ * Прекращает ожидание результата 2FA
+ */
+function stopWaitingForAuth() {
+	authWaitActive = false;
+	if (authSocket) {
+		authSocket.close();
+		authSocket = null;
+	}
+	if (authLongPollController) {
+		authLongPollController.abort();
+		authLongPollController = null;
+	}
+}
+
+/**
+ * Обрабатывает результат 2FA
+ */
+function handleAuthStatus(username, status) {
+	if (!authWaitActive) return;
+
+	if (status === 'approved') {
+		stopWaitingForAuth();
+		// Один запрос, который завершает вход в сессии браузера
 		fetch(`/api/check_2fa_status/?username=${encodeURIComponent(username)}`)
 			.then(response => response.json())
 			.then(data => {
-				console.log('🔄 Polling response:', data);
 				if (data.authenticated && data.status === 'approved') {
 					console.log('✅ Authentication approved!');
-					clearInterval(authPollingInterval);
-					authPollingInterval = null;
 					hide2FAModal();
 					showSuccessMessage();
 					// Перенаправление на главную страницу с задержкой
 					setTimeout(() => {
 						window.location.href = '/';
 					}, 1500);
-				} else if (data.status === 'declined') {
-					console.log('🚫 Authentication declined!');
-					clearInterval(authPollingInterval);
-					authPollingInterval = null;
-					hide2FAModal();
-					showDeclineMessage();
-					// Перенаправление с задержкой
-					setTimeout(() => {
-						window.location.href = '/';
-					}, 2000);
 				}
-				// Если status === 'pending', продолжаем polling
 			})
 			.catch(error => {
 				console.error('Error checking 2FA status:', error);
 			});
-	}, 3000);
+	} else if (status === 'declined') {
+		console.log('🚫 Authentication declined!');
+		stopWaitingForAuth();
+		hide2FAModal();
+		showDeclineMessage();
+		// Перенаправление с задержкой
+		setTimeout(() => {
+			window.location.href = '/';
+		}, 2000);
+	} else if (status === 'expired') {
+		console.log('⏰ 2FA request expired');
+		stopWaitingForAuth();
+		hide2FAModal();
+		showTimeoutMessage();
+		setTimeout(() => {
+			window.location.href = '/';
+		}, 3000);
+	}
 }
 
 /**
@@ -436,6 +436,33 @@ function toggleTelegramNotifications(enabled) {
 		});
 }
 
+/**
+ * Синхронизирует часовой пояс браузера с профилем (для напоминаний перед полуночью)
+ * Отправляет запрос только при смене пояса
+ */
+function syncUserTimezone() {
+	if (!document.body.classList.contains('authenticated')) return;
+
+	const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+	if (!timezone || localStorage.getItem('userTimezone') === timezone) return;
+
+	fetch('/api/user-timezone/', {
+		method: 'POST',
+		headers: {
+			'Content-Type': 'application/json',
+			'X-CSRFToken': getCSRFToken()
+		},
+		body: JSON.stringify({ timezone: timezone })
+	})
+		.then(response => response.json())
+		.then(data => {
+			if (data.status === 'success') {
+				localStorage.setItem('userTimezone', timezone);
+			}
+		})
+		.catch(error => console.error('Error syncing timezone:', error));
+}
+
 /**
  * Переключает 2FA в Telegram
  * @param {boolean} enabled - Включить или выключить
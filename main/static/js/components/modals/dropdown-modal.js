@@ -32,15 +32,22 @@ window.NotificationsDropdown = {
 	},
 
 	startPolling: function () {
-		// Проверяем новые уведомления каждые 60 секунд (только в активное время)
+		// Запасной вариант: WebSocket сам присылает новые уведомления и количество непрочитанных,
+		// поэтому опрашиваем сервер только когда сокет недоступен (и только в активное время)
 		const self = this;
 		this.pollingInterval = setInterval(function () {
-			// Проверяем только если сейчас активное время
+			if (self.isSocketOpen()) {
+				return;
+			}
 			if (self.checkActiveHours()) {
 				self.checkForNewNotifications();
 			}
 		}, 60000);
-		console.log('🔄 Polling started (every 60 seconds, active 21:00-00:01)');
+		console.log('🔄 Fallback polling started (every 60 seconds while WebSocket is down, active 21:00-00:01)');
+	},
+
+	isSocketOpen: function () {
+		return typeof window.isNotificationSocketOpen === 'function' && window.isNotificationSocketOpen();
 	},
 
 	checkForNewNotifications: function () {
@@ -160,6 +167,12 @@ window.NotificationsDropdown = {
 	},
 
 	updateBadge: function () {
+		// Индикатор ведет websocket-notifications.js (WebSocket с HTTP fallback)
+		if (typeof window.updateNotificationBadge === 'function') {
+			window.updateNotificationBadge();
+			return;
+		}
+
 		const bell = document.getElementById('bell');
 		if (!bell) return;
 
@@ -77,6 +77,9 @@ document.addEventListener('DOMContentLoaded', function () {
 	// Ініціалізація Telegram настроек
 	if (typeof initTelegramSettings === 'function') initTelegramSettings();
 
+	// Часовий пояс для нагадувань про streak
+	if (typeof syncUserTimezone === 'function') syncUserTimezone();
+
 	// Ініціалізація остальных компонентов
 	if (typeof initTemplates === 'function') initTemplates();
 	if (typeof initCalendar === 'function') initCalendar();
@@ -17,6 +17,17 @@
 	const HEARTBEAT_INTERVAL = 30000; // Проверка каждые 30 секунд
 	const MAX_MISSED_HEARTBEATS = 3; // Максимум пропущенных проверок
 
+	// Количество непрочитанных: сервер присылает полное значение при подключении,
+	// затем только изменения (delta). null - значение неизвестно, нужен HTTP fallback
+	window.unreadNotificationCount = null;
+
+	/**
+	 * Проверяет, открыт ли WebSocket (иначе используется HTTP polling)
+	 */
+	function isNotificationSocketOpen() {
+		return !!window.notificationSocket && window.notificationSocket.readyState === WebSocket.OPEN;
+	}
+
 	/**
 	 * Отправляет heartbeat ping для проверки соединения
 	 */
@@ -89,9 +100,12 @@
 				const data = JSON.parse(e.data);
 				console.log('📨 WebSocket message received:', data);
 
-				if (data.type === 'notification') {
+				if (data.type === 'unread_count') {
+					applyUnreadCount(data);
+				} else if (data.type === 'notification') {
+					applyUnreadCount({ delta: data.unread_delta === undefined ? 1 : data.unread_delta });
+
 					// Обновляем список уведомлений из API (загружаем свежие данные с сервера)
-					// refreshNotifications автоматически обновит и badge
 					if (window.NotificationsDropdown && typeof window.NotificationsDropdown.refreshNotifications === 'function') {
 						window.NotificationsDropdown.refreshNotifications();
 					} else {
@@ -107,6 +121,13 @@
 			window.notificationSocket.onclose = function (e) {
 				console.log('🔌 WebSocket disconnected:', e.code, e.reason);
 				window.notificationSocket = null;
+				// Изменения во время разрыва будут потеряны - при переподключении сервер пришлет полное значение
+				window.unreadNotificationCount = null;
+
+				// Первая неудача - показываем актуальный индикатор через HTTP
+				if (reconnectAttempts === 0) {
+					updateNotificationBadge();
+				}
 				stopHeartbeat(); // Останавливаем heartbeat при отключении
 
 				// Экспоненциальная задержка: 3s, 6s, 12s, 24s, 30s (макс)
@@ -215,22 +236,43 @@
 	}
 
 	/**
-	 * Обновляет индикатор непрочитанных уведомлений
+	 * Применяет сообщение unread_count: полное значение (count) или изменение (delta)
 	 */
-	function updateNotificationBadge() {
-		const bell = document.getElementById('bell');
-		if (!bell) {
-			console.warn('⚠️ Bell element not found');
+	function applyUnreadCount(data) {
+		if (typeof data.count === 'number') {
+			window.unreadNotificationCount = data.count;
+		} else if (typeof data.delta === 'number' && window.unreadNotificationCount !== null) {
+			window.unreadNotificationCount = Math.max(0, window.unreadNotificationCount + data.delta);
+		} else {
+			// Изменение без известного базового значения - запрашиваем полное
+			requestUnreadCount();
 			return;
 		}
 
-		const container = bell.parentElement;
-		if (!container) {
-			console.warn('⚠️ Bell container not found');
+		console.log(`📊 Unread count: ${window.unreadNotificationCount}`);
+		renderNotificationBadge(window.unreadNotificationCount);
+	}
+
+	/**
+	 * Запрашивает полное количество непрочитанных через WebSocket
+	 */
+	function requestUnreadCount() {
+		if (isNotificationSocketOpen()) {
+			window.notificationSocket.send(JSON.stringify({ type: 'get_unread_count' }));
+		}
+	}
+
+	/**
+	 * Обновляет индикатор непрочитанных уведомлений
+	 * Значение берется из WebSocket; HTTP-запрос - только если сокет недоступен
+	 */
+	function updateNotificationBadge() {
+		if (isNotificationSocketOpen() && window.unreadNotificationCount !== null) {
+			renderNotificationBadge(window.unreadNotificationCount);
 			return;
 		}
 
-		console.log('📊 Fetching unread count from server...');
+		console.log('📊 Fetching unread count from server (WebSocket unavailable)...');
 
 		// Получаем количество непрочитанных уведомлений
 		fetch('/api/notifications/unread-count/', {
@@ -243,54 +285,65 @@
 			.then(response => response.json())
 			.then(data => {
 				console.log(`📊 Server returned unread count: ${data.count}`);
-
-				// Находим текущий индикатор
-				let badge = container.querySelector('.notification-badge');
-				console.log(`🔴 Current badge exists: ${!!badge}`);
-
-				if (data.count > 0) {
-					// Создаем индикатор если его нет
-					if (!badge) {
-						badge = document.createElement('div');
-						badge.className = 'notification-badge';
-						container.appendChild(badge);
-						console.log('🔴 Badge created for count:', data.count);
-					} else {
-						console.log('🔴 Badge already exists, keeping it');
-					}
-
-					// Анимируем колокольчик только при новом уведомлении
-					if (!bell.classList.contains('has-new')) {
-						bell.classList.add('ringing', 'has-new');
-						setTimeout(() => {
-							bell.classList.remove('ringing');
-						}, 800);
-					}
-				} else {
-					// Удаляем индикатор если нет непрочитанных
-					if (badge) {
-						console.log('🗑️ Removing badge (count = 0)');
-						badge.remove();
-
-						// Проверяем что удалили
-						const checkBadge = container.querySelector('.notification-badge');
-						console.log(`✅ Badge removed successfully: ${!checkBadge}`);
-					} else {
-						console.log('ℹ️ No badge to remove');
-					}
-
-					bell.classList.remove('has-new');
-					console.log('✅ Bell classes cleared');
-				}
+				renderNotificationBadge(data.count);
 			})
 			.catch(error => console.error('❌ Error fetching unread count:', error));
 	}
 
-	// Обновляем индикатор при загрузке страницы
-	if (document.readyState === 'loading') {
-		document.addEventListener('DOMContentLoaded', updateNotificationBadge);
-	} else {
-		updateNotificationBadge();
+	/**
+	 * Показывает или убирает индикатор в зависимости от количества непрочитанных
+	 */
+	function renderNotificationBadge(count) {
+		const bell = document.getElementById('bell');
+		if (!bell) {
+			console.warn('⚠️ Bell element not found');
+			return;
+		}
+
+		const container = bell.parentElement;
+		if (!container) {
+			console.warn('⚠️ Bell container not found');
+			return;
+		}
+
+		// Находим текущий индикатор
+		let badge = container.querySelector('.notification-badge');
+		console.log(`🔴 Current badge exists: ${!!badge}`);
+
+		if (count > 0) {
+			// Создаем индикатор если его нет
+			if (!badge) {
+				badge = document.createElement('div');
+				badge.className = 'notification-badge';
+				container.appendChild(badge);
+				console.log('🔴 Badge created for count:', count);
+			} else {
+				console.log('🔴 Badge already exists, keeping it');
+			}
+
+			// Анимируем колокольчик только при новом уведомлении
+			if (!bell.classList.contains('has-new')) {
+				bell.classList.add('ringing', 'has-new');
+				setTimeout(() => {
+					bell.classList.remove('ringing');
+				}, 800);
+			}
+		} else {
+			// Удаляем индикатор если нет непрочитанных
+			if (badge) {
+				console.log('🗑️ Removing badge (count = 0)');
+				badge.remove();
+
+				// Проверяем что удалили
+				const checkBadge = container.querySelector('.notification-badge');
+				console.log(`✅ Badge removed successfully: ${!checkBadge}`);
+			} else {
+				console.log('ℹ️ No badge to remove');
+			}
+
+			bell.classList.remove('has-new');
+			console.log('✅ Bell classes cleared');
+		}
 	}
 
 	// Подключаемся при загрузке страницы
@@ -307,6 +360,7 @@
 	window.connectNotificationWebSocket = connectNotificationWebSocket;
 	window.disconnectNotificationWebSocket = disconnectNotificationWebSocket;
 	window.updateNotificationBadge = updateNotificationBadge;
+	window.isNotificationSocketOpen = isNotificationSocketOpen;
 	window.removeReadNotifications = removeReadNotifications;
 
 })();
@@ -0,0 +1,136 @@
+"""
+Сервіс статистики користувача.
+
+Збирає весь контекст сторінки статистики фіксованою кількістю
+агрегованих запитів, незалежно від кількості звичок, цілей чи днів.
+"""
+import json
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Goal, Habit, HabitCheckin
+from .activity_tracker import get_user_weekly_activity
+
+
+CHART_DAYS = 30
+
+
+def get_goal_stats(user):
+    """Статистика цілей: підсумки та прогрес активних цілей (2 запити)"""
+    totals = Goal.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(completed=True)),
+    )
+
+    active_goals = list(
+        Goal.objects.filter(user=user, completed=False).with_progress().order_by('id')
+    )
+
+    # Завершені цілі рахуються як 100%
+    total_progress = sum(goal.progress_percent for goal in active_goals) + totals['completed'] * 100
+    goal_count_for_progress = len(active_goals) + totals['completed']
+    average_goal_progress = (
+        round(total_progress / goal_count_for_progress, 1) if goal_count_for_progress else 0
+    )
+
+    return {
+        'total_goals': totals['total'],
+        'completed_goals': totals['completed'],
+        'active_goals': totals['total'] - totals['completed'],
+        'average_goal_progress': average_goal_progress,
+        'active_goals_list': active_goals,
+    }
+
+
+def get_habit_stats(user, today):
+    """Статистика звичок: сьогоднішні чекіни та лічильники звичок (1 запит)"""
+    habits = list(Habit.objects.filter(user=user).with_checked_today(today).with_window_completed(today))
+    active = [habit for habit in habits if habit.active]
+    active_count = len(active)
+
+    completed_today = sum(1 for habit in active if habit.is_checked_today())
+    completion_sum = sum(habit.completion_rate for habit in active)
+
+    return {
+        'total_habits': len(habits),
+        'active_habits': active_count,
+        'completed_today': completed_today,
+        'today_completion_percent': (
+            round((completed_today / active_count) * 100, 1) if active_count else 0
+        ),
+        'avg_habit_completion': round(completion_sum / active_count, 1) if active_count else 0,
+        'current_max_streak': max((habit.current_streak for habit in active), default=0),
+        'longest_streak_ever': max((habit.longest_streak for habit in active), default=0),
+    }
+
+
+def get_checkin_counts_by_date(user, start_date, end_date):
+    """
+    Кількість виконаних чекінів по днях (1 запит)
+
+    Рахує чекіни всіх звичок користувача, зокрема на паузі; зведення
+    DailyCompletion враховує лише активні звички і для цього не підходить.
+    """
+    rows = (
+        HabitCheckin.objects.filter(habit__user=user, date__range=(start_date, end_date), completed=True)
+        .values('date')
+        .annotate(completed=Count('id'))
+    )
+    return {row['date']: row['completed'] for row in rows}
+
+
+def build_statistics_context(user, today=None):
+    """Формує повний контекст сторінки статистики"""
+    if today is None:
+        today = timezone.localdate()
+
+    goal_stats = get_goal_stats(user)
+    habit_stats = get_habit_stats(user, today)
+
+    chart_start = today - timedelta(days=CHART_DAYS - 1)
+    week_ago = today - timedelta(days=7)
+    counts_by_date = get_checkin_counts_by_date(user, min(chart_start, week_ago), today)
+
+    # Активність протягом останніх 7 днів
+    recent_checkins = sum(count for day, count in counts_by_date.items() if day >= week_ago)
+
+    # Графік виконання звичок за останні 30 днів
+    habits_chart_data = []
+    for i in range(CHART_DAYS):
+        check_date = chart_start + timedelta(days=i)
+        habits_chart_data.append({
+            'date': check_date.strftime('%d.%m'),
+            'completed': counts_by_date.get(check_date, 0)
+        })
+
+    # Графік прогресу цілей (топ-5 активних)
+    goals_chart_data = [
+        {
+            'id': goal.id,
+            'name': goal.name[:20] + ('...' if len(goal.name) > 20 else ''),
+            'progress': goal.progress_percent
+        }
+        for goal in goal_stats.pop('active_goals_list')[:5]
+    ]
+
+    # Активність користувача
+    activity_data_raw = get_user_weekly_activity(user)
+    activity_chart_data = [
+        {'day': day_label, 'count': count}
+        for day_label, count in zip(
+            activity_data_raw.get('labels', []), activity_data_raw.get('weekly_data', [])
+        )
+    ]
+
+    return {
+        **goal_stats,
+        **habit_stats,
+        'recent_checkins': recent_checkins,
+        'total_activity_points': activity_data_raw.get('total_activities', 0),
+        # Дані для графіків передаються як JSON
+        'habits_chart_data': json.dumps(habits_chart_data),
+        'goals_chart_data': json.dumps(goals_chart_data),
+        'activity_chart_data': json.dumps(activity_chart_data),
+    }
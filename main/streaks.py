@@ -0,0 +1,300 @@
+"""
+Інкрементальний рушій streak для звичок.
+
+Зберігає серії виконаних днів як відрізки (HabitStreakRun), тому чекін,
+скасування чекіну чи чекін заднім числом змінює максимум два відрізки
+замість перегляду всієї історії HabitCheckin. Для weekly та monthly звичок
+так само ведуться серії ISO-тижнів чи місяців (HabitPeriodRun), з яких
+береться streak: період виконано, якщо в ньому є хоча б один виконаний день.
+
+Разом зі streak-полями підтримуються лічильники звички: загальна кількість
+виконаних днів і перший виконаний день (з агрегату серій) та кількість
+виконаних днів у 30-денному вікні (зміною при кожному чекіні; зсув вікна
+виконує нічна задача refresh_habit_completion_counts). Бітові маски
+чекінів (checkin_bitmap) оновлюються в тій самій транзакції.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import invalidate_user_cache
+from .checkin_bitmap import apply_bitmap_changes, rebuild_habit_bitmaps
+from .models import Habit, HabitCheckin, HabitPeriodRun, HabitStreakRun
+from .periods import PERIODIC_FREQUENCIES, period_bounds, periods_between, previous_period_start
+
+
+ONE_DAY = timedelta(days=1)
+
+# Більше змін за раз дешевше перебудувати з HabitCheckin, ніж застосовувати по одній
+BULK_REBUILD_THRESHOLD = 4
+
+
+def broken_streak_filter(today):
+    """
+    Умова для звичок з обірваним streak: останній чекін раніше за початок
+    попереднього періоду своєї частоти (вчора, минулий тиждень чи місяць)
+    """
+    broken = Q(last_checkin__isnull=True)
+    for frequency in ('daily',) + PERIODIC_FREQUENCIES:
+        broken |= Q(frequency=frequency, last_checkin__lt=previous_period_start(today, frequency))
+    return Q(streak_days__gt=0) & broken
+
+
+def completion_window(today=None):
+    """Межі 30-денного вікна completion_rate (включно)"""
+    if today is None:
+        today = timezone.localdate()
+    return today - timedelta(days=Habit.COMPLETION_WINDOW_DAYS), today
+
+
+def window_delta(changes, today=None):
+    """Зміна кількості виконаних днів у вікні від списку (дата, новий стан)"""
+    start, end = completion_window(today)
+    return sum((1 if completed else -1) for day, completed in changes if start <= day <= end)
+
+
+def record_checkin(habit, day, completed):
+    """
+    Оновлює серії та streak-поля звички після зміни чекіну
+
+    Args:
+        habit: Habit об'єкт
+        day: дата чекіну
+        completed: новий стан чекіну
+    """
+    with transaction.atomic():
+        changed = _apply_day(habit, day, completed)
+        refresh_habit_streak(habit, window_delta([(day, completed)] if changed else []))
+        if changed:
+            apply_bitmap_changes(habit.id, [(day, completed)])
+        # Закешовані дані користувача (історія виконання тощо) застаріли
+        transaction.on_commit(lambda: invalidate_user_cache(habit.user_id))
+
+
+def record_checkins(habit, changes):
+    """
+    Пакетна версія record_checkin: кілька змін чекінів однієї звички
+    з одним перерахунком streak-полів
+
+    Args:
+        habit: Habit об'єкт
+        changes: список (дата, новий стан); HabitCheckin вже збережені
+
+    Кеш користувача не скидається - це робить викликач один раз на пакет.
+    """
+    with transaction.atomic():
+        if len(changes) > BULK_REBUILD_THRESHOLD:
+            _rebuild_runs(habit)
+            refresh_habit_streak(habit)
+            _recount_window(habit)
+        else:
+            applied = [(day, completed) for day, completed in changes if _apply_day(habit, day, completed)]
+            refresh_habit_streak(habit, window_delta(applied))
+        # Маски задають стан дня, тож зайві (не фактичні) зміни їм не шкодять
+        apply_bitmap_changes(habit.id, changes)
+
+
+def _apply_day(habit, day, completed):
+    """
+    Змінює стан дня в серіях днів, а для weekly/monthly звичок - і в серіях
+    періодів; True, якщо стан дня змінився
+    """
+    if completed:
+        changed = _add_span(HabitStreakRun, habit, day, day)
+        if changed and habit.frequency in PERIODIC_FREQUENCIES:
+            _add_span(HabitPeriodRun, habit, *period_bounds(day, habit.frequency), habit.frequency)
+        return changed
+
+    changed = _remove_span(HabitStreakRun, habit, day, day)
+    if changed and habit.frequency in PERIODIC_FREQUENCIES:
+        start, end = period_bounds(day, habit.frequency)
+        # Період лишається виконаним, поки в ньому є інший виконаний день
+        if not HabitStreakRun.objects.filter(habit=habit, start_date__lte=end, end_date__gte=start).exists():
+            _remove_span(HabitPeriodRun, habit, start, end, habit.frequency)
+    return changed
+
+
+def _add_span(model, habit, start, end, frequency='daily'):
+    """Додає день чи період [start, end] до серій, зливаючи сусідні відрізки; False, якщо вже в серії"""
+    # Серії, що містять відрізок або торкаються його з будь-якого боку
+    runs = list(model.objects.filter(
+        habit=habit,
+        start_date__lte=end + ONE_DAY,
+        end_date__gte=start - ONE_DAY,
+    ).order_by('start_date'))
+
+    if any(run.start_date <= start and end <= run.end_date for run in runs):
+        return False  # Відрізок вже входить у серію
+
+    if not runs:
+        model.objects.create(habit=habit, start_date=start, end_date=end, length=1)
+        return True
+
+    merged = runs[0]
+    merged.start_date = min(runs[0].start_date, start)
+    merged.end_date = max(runs[-1].end_date, end)
+    merged.length = periods_between(merged.start_date, merged.end_date, frequency)
+    merged.save(update_fields=['start_date', 'end_date', 'length'])
+
+    if len(runs) > 1:
+        model.objects.filter(id__in=[run.id for run in runs[1:]]).delete()
+    return True
+
+
+def _remove_span(model, habit, start, end, frequency='daily'):
+    """Прибирає день чи період із серії, за потреби розбиваючи її на дві; False, якщо його не було"""
+    run = model.objects.filter(
+        habit=habit,
+        start_date__lte=start,
+        end_date__gte=end,
+    ).first()
+
+    if not run:
+        return False
+
+    if run.start_date == start and run.end_date == end:
+        run.delete()
+        return True
+
+    if start == run.start_date:
+        run.start_date = end + ONE_DAY
+    elif end == run.end_date:
+        run.end_date = start - ONE_DAY
+    else:
+        # Відрізок посередині серії - розбиваємо на дві частини
+        tail_end = run.end_date
+        run.end_date = start - ONE_DAY
+        model.objects.create(
+            habit=habit,
+            start_date=end + ONE_DAY,
+            end_date=tail_end,
+            length=periods_between(end + ONE_DAY, tail_end, frequency),
+        )
+
+    run.length = periods_between(run.start_date, run.end_date, frequency)
+    run.save(update_fields=['start_date', 'end_date', 'length'])
+    return True
+
+
+def refresh_habit_streak(habit, recent_delta=0):
+    """
+    Переносить дані серій у поля звички
+
+    Args:
+        habit: Habit об'єкт
+        recent_delta: зміна кількості виконаних днів у 30-денному вікні
+    """
+    runs = HabitStreakRun.objects.filter(habit=habit)
+    totals = runs.aggregate(
+        longest=Max('length'), completed=Sum('length'), first=Min('start_date'), last=Max('end_date')
+    )
+    if habit.frequency in PERIODIC_FREQUENCIES:
+        # Streak weekly/monthly звички рахується в періодах
+        runs = HabitPeriodRun.objects.filter(habit=habit)
+        totals['longest'] = runs.aggregate(longest=Max('length'))['longest']
+    latest = runs.order_by('-end_date').first()
+
+    habit.streak_days = latest.length if latest else 0
+    habit.last_checkin = totals['last']
+    habit.max_streak_days = totals['longest'] or 0
+    habit.completed_checkins = totals['completed'] or 0
+    habit.first_checkin = totals['first']
+    fields = {
+        'streak_days': habit.streak_days,
+        'last_checkin': habit.last_checkin,
+        'max_streak_days': habit.max_streak_days,
+        'completed_checkins': habit.completed_checkins,
+        'first_checkin': habit.first_checkin,
+    }
+    if recent_delta:
+        # Зміна через F(): паралельні чекіни тієї ж звички не перезапишуть одне одного
+        fields['completed_30_days'] = F('completed_30_days') + recent_delta
+        habit.completed_30_days += recent_delta
+    Habit.objects.filter(pk=habit.pk).update(**fields)
+
+
+def build_runs(dates, frequency='daily'):
+    """Групує відсортовані дати у відрізки (start, end) послідовних днів чи періодів"""
+    runs = []
+    for day in dates:
+        start, end = period_bounds(day, frequency)
+        if runs and start - runs[-1][1] <= ONE_DAY:
+            if end > runs[-1][1]:
+                runs[-1][1] = end
+        else:
+            runs.append([start, end])
+    return runs
+
+
+def _rebuild_runs(habit):
+    dates = list(habit.checkins.filter(completed=True).order_by('date').values_list('date', flat=True))
+    targets = [(HabitStreakRun, 'daily')]
+    if habit.frequency in PERIODIC_FREQUENCIES:
+        targets.append((HabitPeriodRun, habit.frequency))
+    else:
+        HabitPeriodRun.objects.filter(habit=habit).delete()
+
+    for model, frequency in targets:
+        model.objects.filter(habit=habit).delete()
+        model.objects.bulk_create([
+            model(
+                habit=habit,
+                start_date=start,
+                end_date=end,
+                length=periods_between(start, end, frequency),
+            )
+            for start, end in build_runs(dates, frequency)
+        ])
+
+
+def rebuild_habit_streak(habit):
+    """Повністю перебудовує серії, лічильники та бітові маски звички з таблиці HabitCheckin"""
+    with transaction.atomic():
+        _rebuild_runs(habit)
+        refresh_habit_streak(habit)
+        _recount_window(habit)
+        if settings.HABIT_CHECKIN_BITMAPS:
+            rebuild_habit_bitmaps([habit.id])
+
+
+def _recount_window(habit):
+    refresh_habit_completion_counts(Habit.objects.filter(pk=habit.pk))
+    habit.refresh_from_db(fields=['completed_30_days'])
+
+
+def rebuild_all_streaks(habits=None):
+    """Перебудовує серії для набору звичок (за замовчуванням - для всіх)"""
+    if habits is None:
+        habits = Habit.objects.all()
+
+    rebuilt = 0
+    for habit in habits.iterator():
+        rebuild_habit_streak(habit)
+        rebuilt += 1
+    return rebuilt
+
+
+def refresh_habit_completion_counts(habits=None, today=None):
+    """
+    Перераховує completed_30_days для вікна, що закінчується сьогодні
+    (один UPDATE на весь набір звичок)
+
+    Returns:
+        кількість оновлених звичок
+    """
+    if habits is None:
+        habits = Habit.objects.all()
+    start, end = completion_window(today)
+
+    recent = (
+        HabitCheckin.objects.filter(habit=OuterRef('pk'), completed=True, date__range=(start, end))
+        .order_by()
+        .values('habit')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return habits.update(completed_30_days=Coalesce(Subquery(recent), Value(0)))
@@ -1,28 +1,56 @@
-from celery import shared_task
-from django.conf import settings
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
-import asyncio
+from celery import shared_task, group, chord
+from django.utils import timezone
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from itertools import groupby
+from time import monotonic
+from .telegram_client import get_telegram_client
 
 
 @shared_task
-def reset_daily_activity():
-    """Celery-задача для щоденного скидання активності користувачів"""
-    from .models import UserActivity
-    from .activity_tracker import get_monday_of_current_week
-    
-    print("🔄 Starting weekly activity reset...")
-    
-    current_monday = get_monday_of_current_week()
-    activities_to_reset = UserActivity.objects.filter(week_start__lt=current_monday)
-    
-    reset_count = 0
-    for activity in activities_to_reset:
-        activity.reset_week()
-        reset_count += 1
-        print(f"✅ Reset activity for user: {activity.user.username}")
-    
-    print(f"🎯 Weekly activity reset completed. Reset {reset_count} user activities.")
-    return f"Reset {reset_count} activities"
+def flush_activity_buffer():
+    """Celery-задача для запису буферизованої активності в DailyActivity"""
+    from django.core.cache import cache
+    from .activity_tracker import flush_pending_activity
+
+    # Два зливи одночасно обробили б той самий хеш двічі
+    if not cache.add('activity_flush_lock', 1, timeout=300):
+        return "Activity flush already running"
+    try:
+        result = flush_pending_activity()
+    finally:
+        cache.delete('activity_flush_lock')
+
+    summary = (
+        f"Flushed {result.pairs} activity increments "
+        f"({result.updated} updated, {result.created} created) in {result.duration:.2f}s"
+    )
+    if result.pairs:
+        print(f"📊 {summary}")
+    return summary
+
+@shared_task
+def refresh_habit_completion_counts():
+    """
+    Celery-задача для зсуву 30-денного вікна completed_30_days
+
+    Запускається щохвилини; оновлює звички користувачів тих часових поясів,
+    де щойно настала 00:10, з вікном до їхньої локальної дати
+    """
+    from .models import Habit
+    from .reminders import COMPLETION_COUNTS_MINUTE, in_timezones, used_timezones, zones_at_local_minute
+    from .streaks import refresh_habit_completion_counts as refresh_counts
+
+    groups = zones_at_local_minute(timezone.now(), used_timezones(), COMPLETION_COUNTS_MINUTE)
+    if not groups:
+        return "No timezone starts a new day now"
+
+    updated = sum(
+        refresh_counts(Habit.objects.filter(in_timezones(zones)), today=local_date)
+        for local_date, zones in groups.items()
+    )
+
+    print(f"📈 Refreshed 30-day completion counts for {updated} habits")
+    return f"Refreshed {updated} habits"
 
 @shared_task
 def cleanup_expired_password_resets():
@@ -36,9 +64,8 @@ def cleanup_expired_password_resets():
     print(f"🎯 Cleanup completed. Removed {expired_count} expired password reset requests.")
     return f"Cleaned up {expired_count} expired resets"
 
-async def send_2fa_async(telegram_id, username):
+async def send_2fa_async(bot, telegram_id, username):
     """Асинхронно надсилає повідомлення з кнопками 2FA."""
-    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
     keyboard = [[
         InlineKeyboardButton("✅ Approve Login", callback_data=f"2fa_approve_{username}"),
         InlineKeyboardButton("❌ Decline", callback_data=f"2fa_decline_{username}")
@@ -51,8 +78,11 @@ async def send_2fa_async(telegram_id, username):
         parse_mode="Markdown",
         reply_markup=reply_markup
     )
-    
-   # Зберігаємо message_id у базі даних для подальшого оновлення
+    return message.message_id
+
+
+def save_2fa_message_id(telegram_id, username, message_id):
+    """Зберігає message_id у базі даних для подальшого оновлення"""
     try:
         from django.contrib.auth.models import User
         from .models import Pending2FA
@@ -66,25 +96,25 @@ async def send_2fa_async(telegram_id, username):
         ).first()
         
         if pending:
-            pending.telegram_message_id = str(message.message_id)
-            pending.save()
-            print(f"✅ Saved message_id {message.message_id} for user {username}")
+            pending.telegram_message_id = str(message_id)
+            pending.save(update_fields=['telegram_message_id'])
+            print(f"✅ Saved message_id {message_id} for user {username}")
     except Exception as e:
         print(f"⚠️ Failed to save message_id: {e}")
-    
-    return message.message_id
 
 @shared_task
 def send_2fa_request(telegram_id, username):
-    """Celery-завдання для запуску асинхронного надсилання 2FA."""
-    return asyncio.run(send_2fa_async(telegram_id, username))
+    """Celery-завдання для надсилання 2FA через спільний Telegram-клієнт."""
+    client = get_telegram_client()
+    message_id = client.run(send_2fa_async(client.bot, telegram_id, username))
+    # ORM поза event loop клієнта
+    save_2fa_message_id(telegram_id, username, message_id)
+    return message_id
 
 
-async def send_2fa_decline_notification_async(telegram_id, username):
+async def send_2fa_decline_notification_async(bot, telegram_id, username):
     """Асинхронне надсилання повідомлення про відхилення 2FA"""
     try:
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-        
         # Надсилаємо нове повідомлення про відхилення/закінчення запиту
         await bot.send_message(
             chat_id=telegram_id,
@@ -101,11 +131,9 @@ async def send_2fa_decline_notification_async(telegram_id, username):
         print(f"❌ Failed to send 2FA expire notification: {e}")
 
 
-async def update_2fa_message_async(telegram_id, username, message_id=None):
+async def update_2fa_message_async(bot, telegram_id, username, message_id=None):
     """Асинхронне оновлення повідомлення 2FA в Telegram для показу закінчення"""
     try:
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-        
         # Оновлюємо існуюче повідомлення, забираючи кнопки
         expired_text = (
             f"⏰ <b>2FA Request Expired</b>\n\n"
@@ -148,13 +176,15 @@ async def update_2fa_message_async(telegram_id, username, message_id=None):
 @shared_task
 def send_2fa_decline_notification(telegram_id, username):
     """Celery-завдання для надсилання повідомлення про відхилення 2FA"""
-    asyncio.run(send_2fa_decline_notification_async(telegram_id, username))
+    client = get_telegram_client()
+    client.run(send_2fa_decline_notification_async(client.bot, telegram_id, username))
 
 
 @shared_task
 def update_2fa_message(telegram_id, username, message_id=None):
     """Celery-завдання для оновлення повідомлення 2FA в Telegram"""
-    return asyncio.run(update_2fa_message_async(telegram_id, username, message_id))
+    client = get_telegram_client()
+    return client.run(update_2fa_message_async(client.bot, telegram_id, username, message_id))
 
 
 @shared_task  
@@ -178,192 +208,212 @@ def cleanup_declined_2fa(pending_id):
         return f"Error: {str(e)}"
 
 
+NOTIFICATION_BATCH_SIZE = 500
+
+
+def iter_users_with_incomplete_habits(today, timezones=None):
+    """
+    Повертає пари (user, [habits]) для активних звичок, не виконаних сьогодні.
+    Усі дані (звички, користувачі, Telegram профілі) беруться одним запитом.
+    
+    Args:
+        timezones: лише користувачі з цих часових поясів (за замовчуванням - усі)
+    """
+    from .models import Habit
+    from .reminders import in_timezones
+    
+    habits = Habit.objects.filter(active=True)
+    if timezones is not None:
+        habits = habits.filter(in_timezones(timezones))
+    
+    habits = (
+        habits
+        .with_checked_today(today)
+        .filter(checked_today=False)
+        .select_related('user', 'user__telegram_profile')
+        .order_by('user_id', 'id')
+    )
+    
+    for _, user_habits in groupby(habits.iterator(chunk_size=2000), key=lambda h: h.user_id):
+        user_habits = list(user_habits)
+        yield user_habits[0].user, user_habits
+
+
+def streak_units_label(habits):
+    """Одиниця сумарного streak кількох звичок: days, weeks, months або periods"""
+    units = {habit.streak_unit for habit in habits}
+    return f"{units.pop()}s" if len(units) == 1 else "periods"
+
+
+def build_reminder_message(username, incomplete_habits, reminder_label):
+    """Формує текст нагадування англійською (як у Duolingo)"""
+    if len(incomplete_habits) == 1:
+        habit = incomplete_habits[0]
+        if habit.current_streak > 0:
+            return (
+                f"Hi {username}! 👋\n\n"
+                f"⚠️ Your {habit.current_streak}-{habit.streak_unit} streak for '{habit.name}' is about to end!\n\n"
+                f"You have only {reminder_label} left to complete it today. "
+                f"Don't let all your hard work go to waste - keep your momentum going! 💪\n\n"
+                f"Complete it now to save your streak! 🔥"
+            )
+        return (
+            f"Hi {username}! 👋\n\n"
+            f"📝 Friendly reminder: You haven't completed '{habit.name}' today.\n\n"
+            f"You have {reminder_label} left! "
+            f"Starting is the hardest part, but you've got this! "
+            f"Take the first step and build your streak now! 🚀"
+        )
+    
+    total_streak_days = sum(h.current_streak for h in incomplete_habits)
+    habit_names = "', '".join([h.name for h in incomplete_habits[:3]])
+    if len(incomplete_habits) > 3:
+        habit_names += f"' and {len(incomplete_habits) - 3} more"
+    else:
+        habit_names = "'" + habit_names + "'"
+    
+    if total_streak_days > 0:
+        return (
+            f"Hi {username}! 👋\n\n"
+            f"⚠️ Hurry up! You have {len(incomplete_habits)} habits that need attention today:\n"
+            f"{habit_names}\n\n"
+            f"Together, they represent {total_streak_days} {streak_units_label(incomplete_habits)} of streaks at risk! "
+            f"You only have {reminder_label} left. Don't let your progress slip away - "
+            f"you've worked too hard to get here. 💪\n\n"
+            f"Complete them now and keep your momentum strong! 🔥"
+        )
+    return (
+        f"Hi {username}! 👋\n\n"
+        f"📝 You still have {len(incomplete_habits)} habits to complete today:\n"
+        f"{habit_names}\n\n"
+        f"Only {reminder_label} remaining! Every journey begins with a single step. "
+        f"Start now and build something amazing! 🚀\n\n"
+        f"You can do this! 💪"
+    )
+
+
+def create_notifications_in_batches(notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Записує повідомлення через bulk_create пачками, повертає їх ID"""
+    from .models import Notification
+    
+    notification_ids = []
+    for i in range(0, len(notifications), batch_size):
+        created = Notification.objects.bulk_create(notifications[i:i + batch_size])
+        notification_ids.extend(n.id for n in created)
+    return notification_ids
+
+
+def dispatch_notification_delivery(notification_ids, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Розсилає доставку повідомлень групою задач, по одній задачі на пачку"""
+    if not notification_ids:
+        return None
+    chunks = [notification_ids[i:i + batch_size] for i in range(0, len(notification_ids), batch_size)]
+    return group(deliver_notifications.s(chunk) for chunk in chunks).apply_async()
+
+
+@shared_task
+def deliver_notifications(notification_ids):
+    """
+    Доставляє пачку повідомлень у WebSocket та ставить Telegram у чергу
+    
+    telegram_sent тут не встановлюється - це робить send_telegram_batch
+    після успішної відповіді Telegram.
+    """
+    from .models import Notification
+    from .notification import send_web_notification
+    
+    web_sent_ids = []
+    telegram_queued_ids = []
+    
+    notifications = Notification.objects.filter(id__in=notification_ids).select_related('user')
+    for notification in notifications:
+        try:
+            send_web_notification(
+                notification.user,
+                notification.message,
+                notification_id=notification.id,
+                created_at=notification.created_at
+            )
+            web_sent_ids.append(notification.id)
+        except Exception as e:
+            print(f"❌ Failed to send web notification to {notification.user.username}: {e}")
+        
+        if notification.send_telegram:
+            telegram_queued_ids.append(notification.id)
+    
+    # Одна задача на пачку: повідомлення йдуть паралельно через спільний пул з'єднань
+    if telegram_queued_ids:
+        try:
+            send_telegram_batch.delay(telegram_queued_ids)
+        except Exception as e:
+            print(f"❌ Failed to queue telegram batch: {e}")
+            telegram_queued_ids = []
+    
+    Notification.objects.filter(id__in=web_sent_ids).update(web_sent=True)
+    
+    print(f"📬 Delivered {len(web_sent_ids)} web / {len(telegram_queued_ids)} telegram notifications")
+    return f"Delivered {len(web_sent_ids)} web, {len(telegram_queued_ids)} telegram"
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=30)
 def generate_habit_notifications(self):
     """
     Генерувати сповіщення про нагадування про серії для користувачів
-Надсилає нагадування о: 2 годинах, 1 годині, 30 хвилинах, 15 хвилинах, 5 хвилинах до кінця дня
+Надсилає нагадування о: 2 годинах, 1 годині, 30 хвилинах, 15 хвилинах, 5 хвилинах до локальної півночі користувача
 
-Оптимізація: Запускається лише протягом активного періоду (21:00-00:05) для зменшення кількості журналів та навантаження.
-Це зменшує кількість щоденних перевірок з ~288 до ~37 (зменшення на 87%).
+Запускається щохвилини. Кожен запуск обробляє лише користувачів тих часових поясів,
+у яких зараз одна з позначок (main.reminders), тож решту хвилин задача робить один запит.
 
 Аргументи:
 self: Екземпляр завдання (bind=True для повторної спроби)
 
 Повторні спроби: 3 рази з інтервалом 30 секунд при помилках БД
     """
-    from django.contrib.auth.models import User
-    from django.utils import timezone
-    from datetime import datetime, time, timedelta
-    from .models import Habit, Notification, TelegramProfile
+    from .models import Notification
+    from .reminders import due_reminder_groups, used_timezones
     from django.db import OperationalError
     
     try:
-        print("🔔 Generating habit reminder notifications...")
-        
         now = timezone.now()
-        local_now = timezone.localtime(now)
-        current_time = now.time()
-        today = now.date()
-        
-        print(f"🕐 Current time: {local_now} (timezone: {timezone.get_current_timezone()})")
-        
-        # ОПТИМІЗАЦІЯ: Перевіряємо чи зараз "активний період" (21:00 - 00:05)
-        current_hour = current_time.hour
-        current_minute = current_time.minute
-        
-        # Активний період: з 21:00 до 00:05 наступного дня
-        is_active_period = (
-            current_hour >= 21 or  # Від 21:00 до 23:59
-            (current_hour == 0 and current_minute <= 5)  # Від 00:00 до 00:05
-        )
-        
-        if not is_active_period:
-            if current_minute < 5:
-                print(f"😴 Outside active period (21:00-00:05). Current time: {current_time.hour:02d}:{current_time.minute:02d}. Skipping check.")
-            return "Outside active period"
+        groups = due_reminder_groups(now, used_timezones())
         
-        # Якщо вже після півночі (00:00-00:05), це вже новий день - пропускаємо нагадування
-        if current_hour == 0 and current_minute <= 5:
-            print(f"🌙 New day started (00:00-00:05). Broken streaks task will run at 00:05. Skipping habit reminders.")
-            return "New day - waiting for broken streaks check"
-        
-        # End of day is 23:59:59
-        end_of_day = time(23, 59, 59)
-        end_of_day_datetime = timezone.make_aware(datetime.combine(today, end_of_day))
-        time_until_midnight = (end_of_day_datetime - now).total_seconds() / 60  # minutes
-        
-        print(f"⏰ Time until midnight: {time_until_midnight:.1f} minutes")
-        
-        # Визначаємо часові інтервали для нагадувань (у хвилинах до кінця дня)
-        reminder_intervals = {
-            120: "2 hours",  # 2 часа
-            60: "1 hour",    # 1 час
-            30: "30 minutes", # 30 минут
-            15: "15 minutes", # 15 минут
-            5: "5 minutes"    # 5 минут
-        }
-    
-        # Визначаємо поточний інтервал нагадування (з похибкою ±3 хвилини) 
-        # Це дозволяє надсилати нагадування навіть якщо тяга запустилася з невеликою затримкою
-        current_reminder = None
-        for minutes, label in reminder_intervals.items():
-            diff = abs(time_until_midnight - minutes)
-            print(f"   Checking {label}: {diff:.1f} min difference")
-            if diff <= 3.0:  # Увеличена погрешность с 2.5 до 3 минут
-                current_reminder = (minutes, label)
-                break
-        
-        if not current_reminder:
-            print(f"⏰ No reminder scheduled for current time (next reminder at 2h, 1h, 30min, 15min, or 5min before midnight)")
-            print(f"   Current time until midnight: {time_until_midnight:.1f} minutes")
+        if not groups:
             return "No reminder scheduled for current time"
         
-        reminder_minutes, reminder_label = current_reminder
-        print(f"🎯 Sending {reminder_label} reminder ({reminder_minutes} minutes before midnight)")
-        
-        notifications_sent = 0
-        
-        # Отримуємо всіх користувачів з активними звичками
-        users_with_habits = User.objects.filter(
-            habits__active=True
-        ).distinct()
+        started = monotonic()
         
-        for user in users_with_habits:
-           # Отримуємо активні звички користувача, які НЕ виконані сьогодні
-            incomplete_habits = []
-            
-            for habit in user.habits.filter(active=True):
-                if not habit.is_checked_today():
-                    incomplete_habits.append(habit)
-            
-            if not incomplete_habits:
-                continue  # У користувача всі звички виконані
-            
-            # Перевіряєм налаштування Telegram
-            profile = getattr(user, 'telegram_profile', None)
-            send_telegram = bool(profile and profile.connected and 
-                            profile.telegram_id and profile.notifications_enabled)
-            
-            # Формуємо повідомлення англійською (як у Duolingo)
-            if len(incomplete_habits) == 1:
-                habit = incomplete_habits[0]
-                if habit.current_streak > 0:
-                    message = (
-                        f"Hi {user.username}! 👋\n\n"
-                        f"⚠️ Your {habit.current_streak}-day streak for '{habit.name}' is about to end!\n\n"
-                        f"You have only {reminder_label} left to complete it today. "
-                        f"Don't let all your hard work go to waste - keep your momentum going! 💪\n\n"
-                        f"Complete it now to save your streak! 🔥"
-                    )
-                else:
-                    message = (
-                        f"Hi {user.username}! 👋\n\n"
-                        f"📝 Friendly reminder: You haven't completed '{habit.name}' today.\n\n"
-                        f"You have {reminder_label} left! "
-                        f"Starting is the hardest part, but you've got this! "
-                        f"Take the first step and build your streak now! 🚀"
-                    )
-            else:
-                total_streak_days = sum(h.current_streak for h in incomplete_habits)
-                habit_names = "', '".join([h.name for h in incomplete_habits[:3]])
-                if len(incomplete_habits) > 3:
-                    habit_names += f"' and {len(incomplete_habits) - 3} more"
-                else:
-                    habit_names = "'" + habit_names + "'"
-                
-                if total_streak_days > 0:
-                    message = (
-                        f"Hi {user.username}! 👋\n\n"
-                        f"⚠️ Hurry up! You have {len(incomplete_habits)} habits that need attention today:\n"
-                        f"{habit_names}\n\n"
-                        f"Together, they represent {total_streak_days} days of streaks at risk! "
-                        f"You only have {reminder_label} left. Don't let your progress slip away - "
-                        f"you've worked too hard to get here. 💪\n\n"
-                        f"Complete them now and keep your momentum strong! 🔥"
-                    )
-                else:
-                    message = (
-                        f"Hi {user.username}! 👋\n\n"
-                        f"📝 You still have {len(incomplete_habits)} habits to complete today:\n"
-                        f"{habit_names}\n\n"
-                        f"Only {reminder_label} remaining! Every journey begins with a single step. "
-                        f"Start now and build something amazing! 🚀\n\n"
-                        f"You can do this! 💪"
-                        )
-            
-            # Створюємо повідомлення
-            notification = Notification.objects.create(
-                user=user,
-                message=message,
-                notification_type='streak_reminder',
-                send_web=True,
-                send_telegram=send_telegram,
-                scheduled_time=now
+        pending_notifications = []
+        for reminder in groups:
+            print(
+                f"🎯 Sending {reminder.label} reminder ({reminder.minutes} minutes before midnight) "
+                f"for {', '.join(reminder.timezones)}"
             )
-            
-            # Відправляємо web-повідомлення
-            try:
-                from .notification import send_web_notification
-                send_web_notification(user, message)
-                notification.web_sent = True
-            except Exception as e:
-                print(f"❌ Failed to send web notification to {user.username}: {e}")
-            
-            # Відправляємо в Telegram якщо увімкнено
-            if send_telegram:
-                try:
-                    send_telegram_notification_task.delay(user.id, message)
-                    notification.telegram_sent = True
-                except Exception as e:
-                    print(f"❌ Failed to send telegram notification to {user.username}: {e}")
-            
-            notification.save()
-            notifications_sent += 1
-            print(f"✅ Sent reminder to {user.username} ({len(incomplete_habits)} habits incomplete)")
-        
-        print(f"🎉 Sent {notifications_sent} streak reminder notifications")
-        return f"Sent {notifications_sent} notifications"
+            # Один запит на групу: невиконані за локальну дату звички разом з користувачем та Telegram профілем
+            for user, incomplete_habits in iter_users_with_incomplete_habits(
+                reminder.local_date, timezones=reminder.timezones
+            ):
+                profile = getattr(user, 'telegram_profile', None)
+                send_telegram = bool(profile and profile.connected and 
+                                profile.telegram_id and profile.notifications_enabled)
+                
+                pending_notifications.append(Notification(
+                    user=user,
+                    message=build_reminder_message(user.username, incomplete_habits, reminder.label),
+                    notification_type='streak_reminder',
+                    send_web=True,
+                    send_telegram=send_telegram,
+                    scheduled_time=now
+                ))
+        
+        # Записуємо повідомлення пачками та розсилаємо їх групою задач
+        notification_ids = create_notifications_in_batches(pending_notifications)
+        dispatch_notification_delivery(notification_ids)
+        
+        notifications_sent = len(notification_ids)
+        duration = monotonic() - started
+        rate = notifications_sent / duration if duration > 0 else 0
+        print(f"🎉 Created {notifications_sent} streak reminder notifications in {duration:.2f}s ({rate:.0f}/s)")
+        return f"Sent {notifications_sent} notifications in {duration:.2f}s ({rate:.0f}/s)"
     
     except OperationalError as e:
         print(f"❌ Database connection error: {e}")
@@ -409,7 +459,7 @@ user_id: ID конкретного користувача (опційно). Як
         # Отримуємо активні звички користувача, які НЕ виконані сьогодні
         incomplete_habits = []
         
-        for habit in user.habits.filter(active=True):
+        for habit in user.habits.filter(active=True).with_checked_today():
             if not habit.is_checked_today():
                 incomplete_habits.append(habit)
         
@@ -507,113 +557,246 @@ user_id: ID конкретного користувача (опційно). Як
     return f"Sent {notifications_sent} notifications"
 
 
-@shared_task
-def send_telegram_notification_task(user_id, message):
-    """Асинхронне надсилання Telegram повідомлення"""
+@shared_task(bind=True, max_retries=5)
+def send_telegram_notification_task(self, user_id, message):
+    """Асинхронне надсилання Telegram повідомлення з урахуванням лімітів"""
     from django.contrib.auth.models import User
+    from .telegram_delivery import deliver_messages, SENT, RETRY
     
     try:
-        user = User.objects.get(id=user_id)
-        from .notification import send_telegram_notification
-        send_telegram_notification(user, message)
-        print(f"✅ Telegram notification sent to user {user.username}")
-        return f"Sent to {user.username}"
+        user = User.objects.select_related('telegram_profile').get(id=user_id)
     except User.DoesNotExist:
         print(f"❌ User with id {user_id} not found")
         return "User not found"
-    except Exception as e:
-        print(f"❌ Error sending telegram notification: {e}")
-        return f"Error: {str(e)}"
+    
+    profile = getattr(user, 'telegram_profile', None)
+    if not (profile and profile.connected and profile.telegram_id and profile.notifications_enabled):
+        return "Telegram not connected"
+    
+    result, = deliver_messages([{'chat_id': profile.telegram_id, 'text': message}])
+    if result.status == SENT:
+        print(f"✅ Telegram notification sent to user {user.username}")
+        return f"Sent to {user.username}"
+    if result.status == RETRY and self.request.retries < self.max_retries:
+        raise self.retry(countdown=telegram_retry_countdown(result.retry_after, self.request.retries))
+    
+    print(f"❌ Error sending telegram notification: {result.error}")
+    return f"Error: {result.error}"
+
+
+def telegram_retry_countdown(retry_after, retries):
+    """Затримка повтору: retry_after від Telegram або експоненційний backoff"""
+    backoff = 2 ** retries * 5
+    return max(int(retry_after or 0) + 1, backoff)
+
+
+@shared_task(bind=True, max_retries=5)
+def send_telegram_batch(self, notification_ids):
+    """
+    Доставляє пачку Telegram-повідомлень через обмежувач швидкості
+    
+    telegram_sent встановлюється лише після успішної відповіді Telegram.
+    Повідомлення, що отримали 429 або мережеву помилку, повертаються
+    в чергу окремою спробою з затримкою retry_after / backoff.
+    """
+    from django.db.models import F
+    from .models import Notification
+    from .telegram_delivery import (
+        deliver_messages, record_delivery, SENT, RETRY, MAX_TELEGRAM_ATTEMPTS
+    )
+    
+    notifications = list(
+        Notification.objects.filter(id__in=notification_ids, telegram_sent=False)
+        .select_related('user__telegram_profile')
+        .order_by('id')
+    )
+    
+    deliverable = []
+    undeliverable_ids = []
+    for notification in notifications:
+        profile = getattr(notification.user, 'telegram_profile', None)
+        if profile and profile.connected and profile.telegram_id and profile.notifications_enabled:
+            deliverable.append(notification)
+        else:
+            undeliverable_ids.append(notification.id)
+    
+    if undeliverable_ids:
+        Notification.objects.filter(id__in=undeliverable_ids).update(
+            telegram_attempts=MAX_TELEGRAM_ATTEMPTS,
+            telegram_error='Telegram not connected'
+        )
+    
+    if not deliverable:
+        return "Sent 0 telegram messages"
+    
+    results = deliver_messages([
+        {'chat_id': notification.user.telegram_profile.telegram_id, 'text': notification.message}
+        for notification in deliverable
+    ])
+    record_delivery(results, [notification.created_at for notification in deliverable])
+    
+    sent_ids = []
+    retry_ids = []
+    retry_after = 0
+    failures = {}
+    for notification, result in zip(deliverable, results):
+        if result.status == SENT:
+            sent_ids.append(notification.id)
+        elif result.status == RETRY:
+            retry_ids.append(notification.id)
+            retry_after = max(retry_after, result.retry_after or 0)
+        else:
+            failures[notification.id] = result.error
+    
+    Notification.objects.filter(id__in=sent_ids).update(
+        telegram_sent=True,
+        telegram_attempts=F('telegram_attempts') + 1,
+        telegram_error=''
+    )
+    Notification.objects.filter(id__in=retry_ids).update(
+        telegram_attempts=F('telegram_attempts') + 1
+    )
+    for notification_id, error in failures.items():
+        print(f"❌ Error sending telegram notification {notification_id}: {error}")
+        Notification.objects.filter(id=notification_id).update(
+            telegram_attempts=MAX_TELEGRAM_ATTEMPTS,
+            telegram_error=error[:255]
+        )
+    
+    print(f"✅ Telegram batch: {len(sent_ids)} sent, {len(retry_ids)} to retry, {len(failures)} failed")
+    
+    if retry_ids and self.request.retries < self.max_retries:
+        raise self.retry(
+            args=[retry_ids],
+            countdown=telegram_retry_countdown(retry_after, self.request.retries)
+        )
+    
+    return f"Sent {len(sent_ids)} telegram messages ({len(failures)} failed, {len(retry_ids)} deferred)"
+
+
+BROKEN_STREAK_CHUNK_SIZE = 1000
+
+
+def build_broken_streak_message(broken_habits):
+    """Формує повідомлення про втрачені streak"""
+    if len(broken_habits) == 1:
+        habit = broken_habits[0]
+        return (
+            f"💔 You lost your {habit.streak_days}-{habit.streak_unit} streak in '{habit.name}'.\n\n"
+            f"Don't give up! Start a new streak today! 🚀"
+        )
+    
+    total_lost = sum(h.streak_days for h in broken_habits)
+    return (
+        f"💔 You lost streaks in {len(broken_habits)} habits "
+        f"(total {total_lost} {streak_units_label(broken_habits)}).\n\n"
+        f"It's okay! Every day is a new opportunity. "
+        f"Start fresh today! 💪"
+    )
 
 
 @shared_task
 def check_and_notify_broken_streaks():
     """ 
     Перевіряє та повідомляє користувачів про втрачені streak 
-    Запускається на початку нового дня (00:05) 
+    Запускається щохвилини; обробляє користувачів тих часових поясів, де щойно
+    настав новий день (00:05 локального часу), з їхньою локальною датою
+
+    Координатор: ділить ID користувачів на пачки фіксованого розміру та
+    запускає chord з обробників пачок, тож додаткові воркери celery
+    скорочують нічне вікно пропорційно до їх кількості.
     """
-    from django.contrib.auth.models import User
-    from django.utils import timezone
-    from datetime import timedelta
-    from .models import Habit, Notification
+    from .models import Habit
+    from .reminders import BROKEN_STREAKS_MINUTE, in_timezones, used_timezones, zones_at_local_minute
+    from .streaks import broken_streak_filter
     
-    print("🔍 Checking for broken streaks...")
+    now = timezone.now()
+    groups = zones_at_local_minute(now, used_timezones(), BROKEN_STREAKS_MINUTE)
+    if not groups:
+        return "No timezone starts a new day now"
     
-    yesterday = timezone.now().date() - timedelta(days=1)
-    notifications_sent = 0
+    print(f"🔍 Checking for broken streaks in {', '.join(zone for zones in groups.values() for zone in zones)}...")
     
-    users_with_habits = User.objects.filter(habits__active=True).distinct()
-    print(f"📊 Found {users_with_habits.count()} users with active habits")
+    chunks = []
+    users_count = 0
+    for local_date, zones in groups.items():
+        # Пачки отримують лише користувачів, у яких streak справді обірвався
+        user_ids = list(
+            Habit.objects.filter(active=True)
+            .filter(in_timezones(zones))
+            .filter(broken_streak_filter(local_date))
+            .order_by('user_id')
+            .values_list('user_id', flat=True)
+            .distinct()
+        )
+        users_count += len(user_ids)
+        chunks += [
+            (user_ids[i:i + BROKEN_STREAK_CHUNK_SIZE], local_date.isoformat())
+            for i in range(0, len(user_ids), BROKEN_STREAK_CHUNK_SIZE)
+        ]
     
-    for user in users_with_habits:
-        broken_habits = []
-        
-        for habit in user.habits.filter(active=True):
-            # Використовуємо current_streak який враховує пропущені дні
-            # Якщо streak_days > 0, але current_streak = 0 - значить streak обірвався
-            if habit.streak_days > 0 and habit.current_streak == 0:
-                broken_habits.append({
-                    'name': habit.name,
-                    'lost_streak': habit.streak_days
-                })
-                print(f"💔 Found broken streak for {user.username}: {habit.name} (lost {habit.streak_days} days)")
-        
-        if not broken_habits:
-            print(f"✅ {user.username}: all streaks intact (checked {user.habits.filter(active=True).count()} habits)")
-            continue
-        
-        # Формуємо повідомлення про втрачені streak
-        if len(broken_habits) == 1:
-            habit_info = broken_habits[0]
-            message = (
-                f"💔 You lost your {habit_info['lost_streak']}-day streak in '{habit_info['name']}'.\n\n"
-                f"Don't give up! Start a new streak today! 🚀"
-            )
-        else:
-            total_lost = sum(h['lost_streak'] for h in broken_habits)
-            message = (
-                f"💔 You lost streaks in {len(broken_habits)} habits "
-                f"(total {total_lost} days).\n\n"
-                f"It's okay! Every day is a new opportunity. "
-                f"Start fresh today! 💪"
-            )
+    if not chunks:
+        print("ℹ️ No broken streaks found - all users maintained their streaks!")
+        return "Sent 0 notifications"
+    
+    print(f"📊 Dispatching {users_count} users in {len(chunks)} chunks")
+    
+    chord(
+        check_broken_streaks_chunk.s(chunk, local_date) for chunk, local_date in chunks
+    )(summarize_broken_streaks.s(now.isoformat()))
+    
+    return f"Dispatched {len(chunks)} chunks ({users_count} users)"
+
+
+@shared_task
+def check_broken_streaks_chunk(user_ids, today):
+    """Знаходить обірвані streak для пачки користувачів одним запитом та записує повідомлення"""
+    from datetime import date
+    from .models import Habit, Notification
+    from .streaks import broken_streak_filter
+    
+    # streak_days > 0, але пропущено цілий період своєї частоти - streak обірвався
+    broken = (
+        Habit.objects.filter(user_id__in=user_ids, active=True)
+        .filter(broken_streak_filter(date.fromisoformat(today)))
+        .select_related('user', 'user__telegram_profile')
+        .order_by('user_id', 'id')
+    )
+    
+    notifications = []
+    for _, user_habits in groupby(broken, key=lambda h: h.user_id):
+        user_habits = list(user_habits)
+        user = user_habits[0].user
         
-        # Перевіряємо налаштування Telegram
         profile = getattr(user, 'telegram_profile', None)
         send_telegram = bool(profile and profile.connected and 
                         profile.telegram_id and profile.notifications_enabled)
         
-        # Створюємо повідомлення
-        notification = Notification.objects.create(
+        notifications.append(Notification(
             user=user,
-            message=message,
+            message=build_broken_streak_message(user_habits),
             notification_type='streak_reminder',
             send_web=True,
             send_telegram=send_telegram
-        )
-        
-        # Надсилаємо повідомлення
-        try:
-            from .notification import send_web_notification
-            send_web_notification(user, message)
-            notification.web_sent = True
-        except Exception as e:
-            print(f"❌ Failed to send web notification: {e}")
-        
-        if send_telegram:
-            try:
-                send_telegram_notification_task.delay(user.id, message)
-                notification.telegram_sent = True
-            except Exception as e:
-                print(f"❌ Failed to send telegram notification: {e}")
-        
-        notification.save()
-        notifications_sent += 1
-        print(f"✅ Notified {user.username} about {len(broken_habits)} broken streaks")
-        print(f"   📧 Web: {notification.web_sent}, Telegram: {notification.telegram_sent}")
+        ))
+    
+    notification_ids = create_notifications_in_batches(notifications)
+    dispatch_notification_delivery(notification_ids)
+    
+    print(f"💔 Chunk of {len(user_ids)} users: {len(notification_ids)} broken streak notifications")
+    return len(notification_ids)
+
+
+@shared_task
+def summarize_broken_streaks(chunk_results, started_at):
+    """Підсумовує результати обробників пачок"""
+    from datetime import datetime
+    
+    notifications_sent = sum(chunk_results)
+    duration = (timezone.now() - datetime.fromisoformat(started_at)).total_seconds()
     
     if notifications_sent == 0:
         print("ℹ️ No broken streaks found - all users maintained their streaks!")
     
-    print(f"🎉 Sent {notifications_sent} broken streak notifications")
+    print(f"🎉 Sent {notifications_sent} broken streak notifications in {duration:.2f}s")
     return f"Sent {notifications_sent} notifications"
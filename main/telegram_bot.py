@@ -18,7 +18,8 @@ from telegram.ext import (
 )
 from django.contrib.auth.models import User
 from main.models import TelegramProfile, Pending2FA, PendingPasswordReset
-from asgiref.sync import sync_to_async
+from main.notification import publish_2fa_status
+from main.bot_repository import bot_sync_to_async, get_linked_user, get_habits_status, invalidate_status_cache
 from django.conf import settings
 from django.db import IntegrityError
 from django.contrib.auth.hashers import make_password
@@ -39,14 +40,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
     
     # Проверяем, привязан ли уже аккаунт
-    profile = await sync_to_async(lambda: TelegramProfile.objects.filter(
-        telegram_id=telegram_id, 
-        connected=True
-    ).first())()
+    user = await get_linked_user(telegram_id)
     
-    if profile:
+    if user:
         # Користувач вже підключений
-        user = await sync_to_async(lambda: profile.user)()
         await update.message.reply_text(
             f"🎉 <b>Welcome back, {user.username}!</b>\n\n"
             "✅ Your Telegram account is already linked to TaskForge.\n\n"
@@ -79,14 +76,10 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
     
     # Проверяем, привязан ли аккаунт
-    profile = await sync_to_async(lambda: TelegramProfile.objects.filter(
-        telegram_id=telegram_id, 
-        connected=True
-    ).first())()
+    user = await get_linked_user(telegram_id)
     
-    if profile:
+    if user:
         # Користувач підключений - показуємо повний список команд
-        user = await sync_to_async(lambda: profile.user)()
         help_text = f"""
 🤖 <b>TaskForge Bot - Welcome {user.username}!</b>
 
@@ -138,13 +131,13 @@ async def bind(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
     
     # ПЕРЕВІРКА: Забороняємо використання команди якщо обліковий запис вже прив'язаний
-    existing_connection = await sync_to_async(lambda: TelegramProfile.objects.filter(
+    existing_connection = await bot_sync_to_async(lambda: TelegramProfile.objects.filter(
         telegram_id=telegram_id, 
         connected=True
     ).first())()
     
     if existing_connection:
-        user = await sync_to_async(lambda: existing_connection.user)()
+        user = await bot_sync_to_async(lambda: existing_connection.user)()
         await update.message.reply_text(
             f"⚠️ <b>Account Already Linked</b>\n\n"
             f"Your Telegram account is already connected to <b>{user.username}</b>.\n\n"
@@ -171,7 +164,7 @@ async def bind(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     code = context.args[0]
-    profile = await sync_to_async(lambda: TelegramProfile.objects.filter(bind_code=code).first())()
+    profile = await bot_sync_to_async(lambda: TelegramProfile.objects.filter(bind_code=code).first())()
 
     if profile:
         if profile.connected and profile.telegram_id == telegram_id:
@@ -179,7 +172,7 @@ async def bind(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Перевіряємо чи цей telegram_id вже прив'язаний до іншого облікового запису (додаткова перевірка)
-        existing_profile = await sync_to_async(lambda: TelegramProfile.objects.filter(telegram_id=telegram_id).first())()
+        existing_profile = await bot_sync_to_async(lambda: TelegramProfile.objects.filter(telegram_id=telegram_id).first())()
         
         if existing_profile and existing_profile != profile:
             await update.message.reply_text("❌ This Telegram account is already linked to another user!")
@@ -189,9 +182,9 @@ async def bind(update: Update, context: ContextTypes.DEFAULT_TYPE):
             profile.telegram_id = telegram_id
             profile.connected = True
             profile.bind_code = None
-            await sync_to_async(profile.save)()
+            await bot_sync_to_async(profile.save)()
             
-            user = await sync_to_async(lambda: profile.user)()
+            user = await bot_sync_to_async(lambda: profile.user)()
             await update.message.reply_text(
                 f"🎉 <b>Account Successfully Linked!</b>\n\n"
                 f"✅ Your Telegram is now connected to <b>{user.username}</b>\n\n"
@@ -269,14 +262,14 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logging.info(f"Обработка: действие={action}, пользователь={username}, telegram_id={telegram_id}")
         
         # Search user --- IGNORE ---
-        user = await sync_to_async(lambda: User.objects.filter(username=username).first())()
+        user = await bot_sync_to_async(lambda: User.objects.filter(username=username).first())()
         if not user:
             logging.error(f"Пользователь не найден: {username}")
             await query.edit_message_text(f"❌ Пользователь '{username}' не найден.")
             return
 
         # Search for 2FA request - check by user and telegram_id
-        pending = await sync_to_async(
+        pending = await bot_sync_to_async(
             lambda: Pending2FA.objects.filter(user=user, telegram_id=telegram_id).first() or 
                    Pending2FA.objects.filter(user=user).first()
         )()
@@ -298,7 +291,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         time_limit = timezone.now() - datetime.timedelta(minutes=10)
         if pending.created_at < time_limit:
             logging.warning(f"2FA request expired for user {username}")
-            await sync_to_async(pending.delete)()
+            pending_id = pending.id
+            await bot_sync_to_async(pending.delete)()
+            await publish_2fa_status(pending_id, "expired")
             await query.edit_message_text(
                 "⏱️ <b>Request Expired</b>\n\n"
                 "This 2FA request has timed out.\n\n"
@@ -310,7 +305,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Handle approve/decline actions
         if action == "approve":
             pending.confirmed = True
-            await sync_to_async(pending.save)()
+            await bot_sync_to_async(pending.save)()
+            # Вікно входу отримує результат одразу, без опитування
+            await publish_2fa_status(pending.id, pending.status)
             await query.edit_message_text(
                 "✅ <b>Login Approved</b>\n\n"
                 f"User: <code>{username}</code>\n"
@@ -321,7 +318,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:  # decline
             logging.info(f"🚫 Setting declined=True for user: {username}, pending ID: {pending.id}")
             pending.declined = True
-            await sync_to_async(pending.save)()
+            await bot_sync_to_async(pending.save)()
+            await publish_2fa_status(pending.id, pending.status)
             logging.info(f"🚫 Saved declined status for pending ID: {pending.id}")
             await query.edit_message_text(
                 "🚫 <b>Login Request Declined</b>\n\n"
@@ -350,7 +348,7 @@ async def reset_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
     
     # Перевіряємо, що обліковий запис прив'язаний
-    profile = await sync_to_async(lambda: TelegramProfile.objects.select_related('user').filter(
+    profile = await bot_sync_to_async(lambda: TelegramProfile.objects.select_related('user').filter(
         telegram_id=telegram_id, 
         connected=True
     ).first())()
@@ -365,10 +363,10 @@ async def reset_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Отримуємо користувача асинхронно
-    user = await sync_to_async(lambda: profile.user)()
+    user = await bot_sync_to_async(lambda: profile.user)()
     
     # Перевірте, чи немає активного скидання пароля
-    existing_reset = await sync_to_async(lambda: PendingPasswordReset.objects.filter(
+    existing_reset = await bot_sync_to_async(lambda: PendingPasswordReset.objects.filter(
         telegram_id=telegram_id,
         is_confirmed=False,
         expires_at__gt=timezone.now()
@@ -386,7 +384,7 @@ async def reset_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Починаємо процес скидання пароля
     expires_at = timezone.now() + timedelta(minutes=15)
     
-    reset_request = await sync_to_async(PendingPasswordReset.objects.create)(
+    reset_request = await bot_sync_to_async(PendingPasswordReset.objects.create)(
         telegram_id=telegram_id,
         user=user,
         expires_at=expires_at
@@ -409,7 +407,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message_text = update.message.text
     
     # Перевіряємо, чи є активна сесія скидання пароля
-    pending_reset = await sync_to_async(lambda: PendingPasswordReset.objects.select_related('user').filter(
+    pending_reset = await bot_sync_to_async(lambda: PendingPasswordReset.objects.select_related('user').filter(
         telegram_id=telegram_id,
         is_confirmed=False,
         expires_at__gt=timezone.now()
@@ -433,7 +431,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Зберігаємо новий пароль (хешуємо)
         hashed_password = make_password(message_text)
         pending_reset.new_password = hashed_password
-        await sync_to_async(pending_reset.save)()
+        await bot_sync_to_async(pending_reset.save)()
         
         # Видаляємо повідомлення з паролем безпеки
         try:
@@ -470,13 +468,13 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
         
         # Застосовуємо новий пароль
-        user = await sync_to_async(lambda: pending_reset.user)()
+        user = await bot_sync_to_async(lambda: pending_reset.user)()
         user.password = pending_reset.new_password
-        await sync_to_async(user.save)()
+        await bot_sync_to_async(user.save)()
         
         # Позначаємо скидання як завершене
         pending_reset.is_confirmed = True
-        await sync_to_async(pending_reset.save)()
+        await bot_sync_to_async(pending_reset.save)()
         
         await update.message.reply_text(
             "🎉 <b>Password Changed Successfully!</b>\n\n"
@@ -489,7 +487,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # --- Unbind command ---
 async def unbind(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
-    profile = await sync_to_async(lambda: TelegramProfile.objects.filter(telegram_id=telegram_id).first())()
+    profile = await bot_sync_to_async(lambda: TelegramProfile.objects.filter(telegram_id=telegram_id).first())()
     
     if profile:
         try:
@@ -500,7 +498,8 @@ async def unbind(update: Update, context: ContextTypes.DEFAULT_TYPE):
             import random
             import string
             profile.bind_code = ''.join(random.choices(string.digits, k=6))
-            await sync_to_async(profile.save)()
+            await bot_sync_to_async(profile.save)()
+            await invalidate_status_cache(telegram_id)
             await update.message.reply_text("✅ Account unlinked successfully! Use /bind <new_key> if you want to link again.")
         except Exception as e:
             await update.message.reply_text("❌ An error occurred while unlinking your account.")
@@ -513,13 +512,19 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показує статус звичок користувача"""
     telegram_id = str(update.effective_user.id)
     
-    # Перевіряємо, що обліковий запис прив'язаний
-    profile = await sync_to_async(lambda: TelegramProfile.objects.select_related('user').filter(
-        telegram_id=telegram_id, 
-        connected=True
-    ).first())()
+    # Профіль, звички та відмітки за сьогодні - один запит (або кеш чату)
+    try:
+        snapshot = await get_habits_status(telegram_id)
+    except Exception as e:
+        logging.error(f"Error getting habits status: {e}")
+        await update.message.reply_text(
+            "❌ <b>Error</b>\n\n"
+            "Failed to get your habits status. Please try again later.",
+            parse_mode='HTML'
+        )
+        return
     
-    if not profile:
+    if not snapshot:
         await update.message.reply_text(
             "❌ <b>Account Not Linked</b>\n\n"
             "Your Telegram account is not linked to TaskForge.\n"
@@ -528,65 +533,40 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    try:
-        # Отримуємо користувача
-        user = await sync_to_async(lambda: profile.user)()
-        
-        # Отримуємо звички користувача
-        from main.models import Habit, HabitCheckin
-        from django.utils import timezone
-        
-        habits = await sync_to_async(lambda: list(
-            Habit.objects.filter(user=user, active=True)
-        ))()
-        
-        if not habits:
-            await update.message.reply_text(
-                "📊 <b>Habits Status</b>\n\n"
-                "You don't have any active habits yet.\n"
-                "Create some habits in TaskForge to track your progress!",
-                parse_mode='HTML'
-            )
-            return
-        
-        today = timezone.now().date()
-        status_text = "📊 <b>Today's Habits Status</b>\n\n"
-        
-        completed_count = 0
-        total_count = len(habits)
-        
-        for habit in habits:
-            # Перевіряємо виконання звички сьогодні
-            is_completed = await sync_to_async(lambda h=habit: 
-                HabitCheckin.objects.filter(habit=h, date=today, completed=True).exists()
-            )()
-            
-            if is_completed:
-                status_text += f"✅ {habit.name}\n"
-                completed_count += 1
-            else:
-                status_text += f"⭕ {habit.name}\n"
-        
-       # Додаємо загальну статистику
-        percentage = (completed_count / total_count * 100) if total_count > 0 else 0
-        status_text += f"\n📈 <b>Progress: {completed_count}/{total_count} ({percentage:.0f}%)</b>"
-        
-        if completed_count == total_count:
-            status_text += "\n\n🎉 <b>Perfect day! All habits completed!</b>"
-        elif completed_count == 0:
-            status_text += "\n\n💪 <b>Time to start your habits!</b>"
-        else:
-            status_text += f"\n\n🔥 <b>Keep going! {total_count - completed_count} habits left!</b>"
-        
-        await update.message.reply_text(status_text, parse_mode='HTML')
-        
-    except Exception as e:
-        logging.error(f"Error getting habits status: {e}")
+    habits = snapshot['habits']
+    if not habits:
         await update.message.reply_text(
-            "❌ <b>Error</b>\n\n"
-            "Failed to get your habits status. Please try again later.",
+            "📊 <b>Habits Status</b>\n\n"
+            "You don't have any active habits yet.\n"
+            "Create some habits in TaskForge to track your progress!",
             parse_mode='HTML'
         )
+        return
+    
+    status_text = "📊 <b>Today's Habits Status</b>\n\n"
+    
+    completed_count = 0
+    total_count = len(habits)
+    
+    for habit in habits:
+        if habit['completed']:
+            status_text += f"✅ {habit['name']}\n"
+            completed_count += 1
+        else:
+            status_text += f"⭕ {habit['name']}\n"
+    
+    # Додаємо загальну статистику
+    percentage = (completed_count / total_count * 100) if total_count > 0 else 0
+    status_text += f"\n📈 <b>Progress: {completed_count}/{total_count} ({percentage:.0f}%)</b>"
+    
+    if completed_count == total_count:
+        status_text += "\n\n🎉 <b>Perfect day! All habits completed!</b>"
+    elif completed_count == 0:
+        status_text += "\n\n💪 <b>Time to start your habits!</b>"
+    else:
+        status_text += f"\n\n🔥 <b>Keep going! {total_count - completed_count} habits left!</b>"
+    
+    await update.message.reply_text(status_text, parse_mode='HTML')
 
 # --- Bot Commands Setup ---
 async def setup_bot_commands(application):
@@ -607,24 +587,37 @@ async def setup_bot_commands(application):
         logging.error(f"❌ Failed to set bot commands: {e}")
 
 # --- Application setup ---
-application = ApplicationBuilder().token(TOKEN).build()
-
 # Налаштовуємо команди після ініціалізації програми
 async def post_init(application):
     """Функція викликається після ініціалізації програми"""
     await setup_bot_commands(application)
 
-application.post_init = post_init
 
-application.add_handler(CommandHandler("start", start))
-application.add_handler(CommandHandler("help", help_command))
-application.add_handler(CommandHandler("bind", bind))
-application.add_handler(CommandHandler("unbind", unbind))
-application.add_handler(CommandHandler("reset_password", reset_password))
-application.add_handler(CommandHandler("status", status))
-application.add_handler(CommandHandler("notify", notify))
-application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-application.add_handler(CallbackQueryHandler(button_callback))
+def build_application(token=TOKEN, base_url=None, concurrency=None):
+    """Створює Application з усіма обробниками (polling або webhook-режим)"""
+    from main.bot_dispatcher import ChatOrderedUpdateProcessor
+
+    processor = ChatOrderedUpdateProcessor(max_workers=concurrency or settings.TELEGRAM_BOT_CONCURRENCY)
+    builder = ApplicationBuilder().token(token).concurrent_updates(processor)
+    base_url = base_url or getattr(settings, 'TELEGRAM_API_BASE_URL', None)
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("bind", bind))
+    application.add_handler(CommandHandler("unbind", unbind))
+    application.add_handler(CommandHandler("reset_password", reset_password))
+    application.add_handler(CommandHandler("status", status))
+    application.add_handler(CommandHandler("notify", notify))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(CallbackQueryHandler(button_callback))
+    return application
+
+
+application = build_application()
+application.post_init = post_init
 
 # --- Run bot ---
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""
+Спільний клієнт доставки повідомлень у Telegram.
+
+Один екземпляр на процес воркера: власний event loop у фоновому потоці та
+один telegram.Bot з пулом HTTP-з'єднань, які перевикористовуються між
+задачами замість нового Bot + asyncio.run на кожне повідомлення.
+"""
+import asyncio
+import os
+import threading
+
+from django.conf import settings
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_BATCH_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 30
+
+
+class TelegramClient:
+    """Довгоживучий Telegram-клієнт з пулом з'єднань та власним event loop"""
+
+    def __init__(self, token, base_url=None, pool_size=DEFAULT_POOL_SIZE,
+                 batch_concurrency=DEFAULT_BATCH_CONCURRENCY):
+        self.batch_concurrency = batch_concurrency
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='telegram-client',
+            daemon=True
+        )
+        self._thread.start()
+
+        bot_kwargs = {'request': HTTPXRequest(connection_pool_size=pool_size)}
+        if base_url:
+            bot_kwargs['base_url'] = base_url
+        self.bot = Bot(token=token, **bot_kwargs)
+
+    def run(self, coro, timeout=DEFAULT_TIMEOUT):
+        """Виконує корутину в event loop клієнта та чекає результат"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Надсилає одне повідомлення, повертає telegram.Message"""
+        return self.run(self.bot.send_message(chat_id=chat_id, text=text, **kwargs))
+
+    def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        """Редагує існуюче повідомлення"""
+        return self.run(self.bot.edit_message_text(
+            chat_id=chat_id, message_id=message_id, text=text, **kwargs
+        ))
+
+    def send_batch(self, messages, timeout=None):
+        """
+        Надсилає пачку повідомлень паралельно через спільний пул з'єднань
+
+        Args:
+            messages: список dict з параметрами send_message (chat_id, text, ...)
+
+        Returns:
+            список telegram.Message або Exception для кожного повідомлення (у тому ж порядку)
+        """
+        if not messages:
+            return []
+        timeout = timeout or DEFAULT_TIMEOUT + len(messages)
+        return self.run(self._send_batch(messages), timeout=timeout)
+
+    async def _send_batch(self, messages):
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def send_one(params):
+            async with semaphore:
+                return await self.bot.send_message(**params)
+
+        return await asyncio.gather(
+            *(send_one(params) for params in messages),
+            return_exceptions=True
+        )
+
+    def close(self):
+        """Закриває HTTP-клієнт та зупиняє event loop"""
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self.bot.shutdown(), timeout=5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_telegram_client():
+    """Повертає клієнт поточного процесу, створюючи його при першому виклику"""
+    global _client, _client_pid
+
+    # Після fork (prefork-воркери celery) потік event loop не успадковується
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = TelegramClient(
+                    settings.TELEGRAM_BOT_TOKEN,
+                    base_url=getattr(settings, 'TELEGRAM_API_BASE_URL', None),
+                    pool_size=getattr(settings, 'TELEGRAM_CONNECTION_POOL_SIZE', DEFAULT_POOL_SIZE),
+                )
+                _client_pid = os.getpid()
+    return _client
+
+
+def close_telegram_client(**kwargs):
+    """Закриває клієнт процесу (викликається при зупинці воркера)"""
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
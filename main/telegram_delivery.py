@@ -0,0 +1,279 @@
+"""
+Доставка повідомлень у Telegram з урахуванням лімітів Bot API.
+
+Token bucket на весь бот (TELEGRAM_GLOBAL_RATE) та окремий bucket на кожен
+чат (TELEGRAM_PER_CHAT_RATE) розподіляють відправлення в часі замість
+одночасного сплеску. 429 (RetryAfter) блокує глобальний bucket на
+retry_after: короткі паузи чекаємо на місці, довгі повертаємо задачі
+для повторної спроби. Метрики зберігаються в кеші Django.
+"""
+import asyncio
+import threading
+from collections import namedtuple
+from datetime import timedelta
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+from .caching import increment_counter
+from .telegram_client import get_telegram_client
+
+
+SENT = 'sent'
+RETRY = 'retry'
+FAILED = 'failed'
+
+# Паузу до цієї тривалості чекаємо всередині задачі, довшу - через retry задачі
+MAX_INLINE_WAIT = 5
+MAX_INLINE_ATTEMPTS = 3
+MAX_TELEGRAM_ATTEMPTS = 5
+CHAT_BUCKETS_LIMIT = 10000
+
+METRICS_PREFIX = 'telegram_delivery'
+METRIC_COUNTERS = (
+    'sent', 'failed', 'retried', 'throttled',
+    'send_latency_ms_total', 'delivery_delay_ms_total',
+)
+
+DeliveryResult = namedtuple('DeliveryResult', ['status', 'retry_after', 'latency', 'error'])
+
+
+class TokenBucket:
+    """Token bucket з резервуванням: consume() може піти в мінус, wait_time() це враховує"""
+
+    def __init__(self, rate, capacity=1, clock=monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Скільки секунд чекати до наступного токена"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+    def block(self, seconds):
+        """Забороняє відправлення на seconds секунд (після 429)"""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def is_full(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class TelegramRateLimiter:
+    """Глобальний та per-chat token bucket для відправлень бота"""
+
+    def __init__(self, global_rate, per_chat_rate, clock=monotonic):
+        self.per_chat_rate = per_chat_rate
+        self.clock = clock
+        # Сплеск не більше секундного ліміту
+        self.global_bucket = TokenBucket(global_rate, capacity=max(1, global_rate), clock=clock)
+        self.chat_buckets = {}
+        self._lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= CHAT_BUCKETS_LIMIT:
+                self._prune()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, clock=self.clock)
+        return bucket
+
+    def _prune(self):
+        """Видаляє bucket'и чатів, які вже повністю відновились"""
+        self.chat_buckets = {
+            chat_id: bucket for chat_id, bucket in self.chat_buckets.items()
+            if not bucket.is_full()
+        }
+
+    def wait_time(self, chat_id):
+        with self._lock:
+            return max(self.global_bucket.wait_time(), self._chat_bucket(chat_id).wait_time())
+
+    def reserve(self, chat_id, max_wait=None):
+        """
+        Резервує слот для відправлення в чат
+
+        Returns:
+            секунди очікування до відправлення, або None якщо очікування
+            перевищує max_wait (слот не резервується)
+        """
+        with self._lock:
+            chat_bucket = self._chat_bucket(chat_id)
+            wait = max(self.global_bucket.wait_time(), chat_bucket.wait_time())
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.global_bucket.consume()
+            chat_bucket.consume()
+            return wait
+
+    def block(self, seconds):
+        with self._lock:
+            self.global_bucket.block(seconds)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Обмежувач процесу (черга telegram обслуговується одним процесом)"""
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TelegramRateLimiter(
+                    settings.TELEGRAM_GLOBAL_RATE,
+                    settings.TELEGRAM_PER_CHAT_RATE
+                )
+    return _limiter
+
+
+def _seconds(retry_after):
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+async def _deliver_one(bot, limiter, params, semaphore):
+    chat_id = str(params['chat_id'])
+
+    async with semaphore:
+        for attempt in range(MAX_INLINE_ATTEMPTS):
+            wait = limiter.reserve(chat_id, max_wait=MAX_INLINE_WAIT)
+            if wait is None:
+                return DeliveryResult(RETRY, limiter.wait_time(chat_id), None, 'Rate limited')
+            if wait:
+                await asyncio.sleep(wait)
+
+            started = monotonic()
+            try:
+                await bot.send_message(**params)
+            except RetryAfter as e:
+                retry_after = _seconds(e.retry_after)
+                limiter.block(retry_after)
+                increment_metric('throttled')
+                print(f"⏳ Telegram flood control: retry in {retry_after:.0f}s")
+                continue
+            except BadRequest as e:
+                return DeliveryResult(FAILED, None, None, str(e))
+            except NetworkError as e:
+                # Тимчасові мережеві помилки (включно з TimedOut) - повторюємо пізніше
+                return DeliveryResult(RETRY, None, None, str(e))
+            except TelegramError as e:
+                return DeliveryResult(FAILED, None, None, str(e))
+            return DeliveryResult(SENT, None, monotonic() - started, '')
+
+    return DeliveryResult(RETRY, limiter.wait_time(chat_id), None, 'Rate limited')
+
+
+def deliver_messages(messages, client=None, limiter=None):
+    """
+    Надсилає повідомлення з дотриманням лімітів
+
+    Args:
+        messages: список dict з параметрами send_message (chat_id, text, ...)
+
+    Returns:
+        список DeliveryResult у тому ж порядку
+    """
+    if not messages:
+        return []
+    client = client or get_telegram_client()
+    limiter = limiter or get_rate_limiter()
+
+    async def deliver_all():
+        semaphore = asyncio.Semaphore(client.batch_concurrency)
+        return await asyncio.gather(
+            *(_deliver_one(client.bot, limiter, params, semaphore) for params in messages)
+        )
+
+    # Верхня межа: весь пакет з урахуванням ліміту на чат та пауз 429
+    timeout = 60 + len(messages) / limiter.global_bucket.rate + MAX_INLINE_ATTEMPTS * MAX_INLINE_WAIT
+    return client.run(deliver_all(), timeout=timeout)
+
+
+def _metric_key(name):
+    return f'{METRICS_PREFIX}:{name}'
+
+
+def increment_metric(name, delta=1):
+    increment_counter(_metric_key(name), delta)
+
+
+def record_delivery(results, created_ats):
+    """Оновлює лічильники за результатами пакета"""
+    now = timezone.now()
+    sent = [(result, created_at) for result, created_at in zip(results, created_ats) if result.status == SENT]
+
+    for status, metric in ((FAILED, 'failed'), (RETRY, 'retried')):
+        count = sum(1 for result in results if result.status == status)
+        if count:
+            increment_metric(metric, count)
+
+    if sent:
+        increment_metric('sent', len(sent))
+        increment_metric('send_latency_ms_total', int(sum(result.latency for result, _ in sent) * 1000))
+        increment_metric('delivery_delay_ms_total', int(sum(
+            (now - created_at).total_seconds() for _, created_at in sent
+        ) * 1000))
+
+
+def pending_telegram_notifications():
+    """Повідомлення, що ще очікують доставки в Telegram"""
+    from .models import Notification
+
+    return Notification.objects.filter(
+        send_telegram=True,
+        telegram_sent=False,
+        telegram_attempts__lt=MAX_TELEGRAM_ATTEMPTS
+    )
+
+
+def get_broker_queue_depth(queue='telegram'):
+    """Кількість задач у черзі брокера (None якщо брокер недоступний)"""
+    from TaskForge.celery import app
+
+    try:
+        with app.connection_for_write() as connection:
+            return connection.default_channel.queue_declare(queue=queue, passive=True).message_count
+    except Exception:
+        return None
+
+
+def get_delivery_metrics():
+    """Знімок метрик доставки: глибина черги, лічильники та середні затримки"""
+    counters = cache.get_many([_metric_key(name) for name in METRIC_COUNTERS])
+    values = {name: counters.get(_metric_key(name), 0) for name in METRIC_COUNTERS}
+    sent = values['sent']
+
+    return {
+        'queue_depth': pending_telegram_notifications().count(),
+        'broker_queue_depth': get_broker_queue_depth(),
+        'sent': sent,
+        'failed': values['failed'],
+        'retried': values['retried'],
+        'throttled': values['throttled'],
+        'avg_send_latency_ms': round(values['send_latency_ms_total'] / sent, 1) if sent else 0,
+        'avg_delivery_delay_s': round(values['delivery_delay_ms_total'] / sent / 1000, 2) if sent else 0,
+    }
+
+
+def reset_delivery_metrics():
+    cache.delete_many([_metric_key(name) for name in METRIC_COUNTERS])
@@ -0,0 +1,119 @@
+"""
+Локальна заглушка Telegram Bot API для тестів та бенчмарків.
+
+Відповідає на sendMessage/editMessageText/getMe тими ж JSON-структурами,
+що й справжній API, і рахує запити та TCP-з'єднання, щоб можна було
+перевірити повторне використання пулу з'єднань.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, як у справжнього API
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.stub.register_connection(self.client_address)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(body or '{}')
+        else:
+            params = {key: values[0] for key, values in parse_qs(body).items()}
+
+        method = self.path.rsplit('/', 1)[-1]
+        status, payload = self.server.stub.handle(method, params)
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST
+
+
+class StubTelegramServer:
+    """
+    Заглушка Telegram API на 127.0.0.1 у фоновому потоці
+
+    Використання:
+        with StubTelegramServer() as stub:
+            Bot(token, base_url=stub.base_url)
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = []
+        self.connections = set()
+        self.responses = {}
+        self._message_id = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/bot'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def register_connection(self, client_address):
+        with self._lock:
+            self.connections.add(client_address)
+
+    def set_response(self, method, responder):
+        """Підміняє відповідь на метод: responder(params) -> (status, payload)"""
+        self.responses[method] = responder
+
+    def handle(self, method, params):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests.append((method, params))
+            self._message_id += 1
+            message_id = self._message_id
+
+        if method in self.responses:
+            return self.responses[method](params)
+
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'TaskForge', 'username': 'taskforge_bot',
+            }}
+
+        chat_id = int(params.get('chat_id', 0))
+        return 200, {'ok': True, 'result': {
+            'message_id': int(params.get('message_id', message_id)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': params.get('text', ''),
+        }}
@@ -0,0 +1,124 @@
+"""
+Webhook-режим Telegram-бота.
+
+Оновлення приходять POST-запитами в той самий ASGI-процес (Daphne), що
+обслуговує сайт, і передаються в обробники Application з telegram_bot.py.
+Окремий процес з run_polling() та постійне long-poll з'єднання не потрібні.
+Оновлення йдуть через update_processor застосунку (bot_dispatcher), як і
+в polling: різні чати паралельно, не більше TELEGRAM_WEBHOOK_MAX_CONCURRENCY
+одночасно, оновлення одного чату - по черзі. Решта чекає, і Telegram бачить
+повільніші відповіді замість перевантаженого пулу потоків БД.
+
+Обробники бота довіряють update.effective_user.id, тому без секрету
+(TELEGRAM_WEBHOOK_SECRET) webhook не приймає жодного оновлення, а системна
+перевірка check_webhook_secret не дає запустити проєкт з увімкненим
+webhook без секрету.
+"""
+import asyncio
+import hmac
+import json
+import logging
+
+from channels.generic.http import AsyncHttpConsumer
+from django.conf import settings
+from django.core import checks
+from telegram import Update
+
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+
+
+class WebhookDispatcher:
+    """Передає оновлення з webhook в Application через його update_processor"""
+
+    def __init__(self, application):
+        self.application = application
+        self._init_lock = None
+        self._initialized = False
+
+    async def _ensure_initialized(self):
+        # Примітиви asyncio створюються в циклі подій, що обслуговує запити
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        if not self._initialized:
+            async with self._init_lock:
+                if not self._initialized:
+                    await self.application.initialize()
+                    self._initialized = True
+
+    async def process(self, data):
+        """Обробляє одне оновлення (dict з тіла запиту Telegram)"""
+        await self._ensure_initialized()
+        update = Update.de_json(data, self.application.bot)
+        await self.application.update_processor.process_update(
+            update, self.application.process_update(update)
+        )
+
+    async def shutdown(self):
+        if self._initialized:
+            await self.application.shutdown()
+            self._initialized = False
+        self._init_lock = None
+
+
+_dispatcher = None
+
+
+def get_webhook_dispatcher():
+    """Диспетчер процесу; Application бота створюється при першому оновленні"""
+    global _dispatcher
+    if _dispatcher is None:
+        from .telegram_bot import build_application
+        _dispatcher = WebhookDispatcher(
+            build_application(concurrency=settings.TELEGRAM_WEBHOOK_MAX_CONCURRENCY)
+        )
+    return _dispatcher
+
+
+def check_webhook_secret(app_configs, **kwargs):
+    """Системна перевірка: увімкнений webhook потребує TELEGRAM_WEBHOOK_SECRET"""
+    if settings.TELEGRAM_WEBHOOK_ENABLED and not settings.TELEGRAM_WEBHOOK_SECRET:
+        return [checks.Error(
+            'TELEGRAM_WEBHOOK_ENABLED is set without TELEGRAM_WEBHOOK_SECRET',
+            hint='Set TELEGRAM_WEBHOOK_SECRET to a random string; '
+                 'without it every webhook request is rejected.',
+            id='main.E001',
+        )]
+    return []
+
+
+class TelegramWebhookConsumer(AsyncHttpConsumer):
+    """Приймає оновлення Telegram: POST /telegram/webhook/"""
+
+    async def handle(self, body):
+        if not settings.TELEGRAM_WEBHOOK_ENABLED:
+            await self.send_response(404, b'')
+            return
+        if self.scope['method'] != 'POST':
+            await self.send_response(405, b'', headers=[(b'Allow', b'POST')])
+            return
+
+        # Без секрету будь-хто міг би надіслати оновлення від імені будь-якого
+        # користувача Telegram, тож такий запит відхиляється завжди
+        secret = settings.TELEGRAM_WEBHOOK_SECRET
+        received = dict(self.scope['headers']).get(SECRET_HEADER, b'')
+        if not secret or not hmac.compare_digest(received, secret.encode()):
+            await self.send_response(403, b'')
+            return
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            await self.send_response(400, b'')
+            return
+
+        try:
+            await get_webhook_dispatcher().process(data)
+        except Exception:
+            # Помилки обробників ловить Application; сюди потрапляють лише
+            # некоректні оновлення. 200, щоб Telegram не повторював їх безкінечно
+            logger.exception("Failed to process Telegram webhook update")
+
+        await self.send_response(200, b'{"ok": true}', headers=[(b'Content-Type', b'application/json')])
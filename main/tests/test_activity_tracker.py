@@ -0,0 +1,168 @@
+"""
+Тести для трекінгу активності (часовий ряд DailyActivity)
+"""
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from unittest.mock import patch
+
+from main.activity_tracker import (
+    MemoryActivityBuffer, record_activity, track_user_activity, flush_pending_activity,
+    get_monday_of_current_week, get_user_activity_range, get_user_weekly_activity
+)
+from main.models import DailyActivity
+from main.tasks import flush_activity_buffer
+
+
+MONDAY = datetime.date(2025, 1, 6)
+
+
+@override_settings(ACTIVITY_TRACKING_BUFFERED=False)
+class AtomicActivityTest(TestCase):
+    """Тести для інкрементів одним UPDATE"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def test_first_activity_creates_day_row(self):
+        """Тест що перша активність за день створює рядок дня"""
+        track_user_activity(self.user, "login")
+
+        activity = DailyActivity.objects.get(user=self.user)
+        self.assertEqual(activity.count, 1)
+        self.assertEqual(activity.date, timezone.localdate())
+
+    def test_increment_is_single_update(self):
+        """Тест що інкремент існуючого дня - один запит без читання"""
+        track_user_activity(self.user, "login")
+
+        with self.assertNumQueries(1):
+            track_user_activity(self.user, "goal_completed", amount=5)
+
+        self.assertEqual(DailyActivity.objects.get(user=self.user).count, 6)
+
+    def test_history_kept_across_weeks(self):
+        """Тест що новий тиждень не стирає попередній"""
+        record_activity(self.user.id, MONDAY, 3)
+        record_activity(self.user.id, MONDAY + datetime.timedelta(days=8), 2)
+
+        previous = get_user_weekly_activity(self.user, MONDAY)
+        current = get_user_weekly_activity(self.user, MONDAY + datetime.timedelta(days=7))
+
+        self.assertEqual(previous['weekly_data'], [3, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(current['weekly_data'], [0, 2, 0, 0, 0, 0, 0])
+        self.assertEqual(current['total_activities'], 2)
+        self.assertEqual(current['week_start'], '2025-01-13')
+
+
+class ActivityRangeTest(TestCase):
+    """Тести для читання активності за діапазон"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        DailyActivity.objects.bulk_create([
+            DailyActivity(user=self.user, date=MONDAY + datetime.timedelta(days=i), count=i + 1)
+            for i in range(0, 60, 3)
+        ])
+
+    def test_range_is_single_query(self):
+        """Тест що довільний діапазон читається одним запитом"""
+        start = MONDAY + datetime.timedelta(days=2)
+        with self.assertNumQueries(1):
+            data = get_user_activity_range(self.user, start, start + datetime.timedelta(days=5))
+
+        self.assertEqual(data, [0, 4, 0, 0, 7, 0])
+
+    def test_weekly_activity_does_not_write(self):
+        """Тест що читання тижня нічого не записує"""
+        other = User.objects.create_user(username='other', password='testpass123')
+
+        with self.assertNumQueries(1):
+            data = get_user_weekly_activity(other)
+
+        self.assertEqual(data['weekly_data'], [0] * 7)
+        self.assertEqual(data['week_start'], get_monday_of_current_week().strftime('%Y-%m-%d'))
+
+
+@override_settings(ACTIVITY_TRACKING_BUFFERED=True)
+class BufferedActivityTest(TestCase):
+    """Тести для буферизованого режиму"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.buffer = MemoryActivityBuffer()
+        buffer_patch = patch('main.activity_tracker.get_activity_buffer', return_value=self.buffer)
+        buffer_patch.start()
+        self.addCleanup(buffer_patch.stop)
+
+    def test_tracking_does_not_touch_database(self):
+        """Тест що трекінг у буферизованому режимі не виконує запитів"""
+        with self.assertNumQueries(0):
+            track_user_activity(self.user, "login")
+            track_user_activity(self.user, "subgoal_completed")
+            track_user_activity(self.other, "goal_completed", amount=5)
+
+        self.assertFalse(DailyActivity.objects.exists())
+
+    @patch('builtins.print')
+    def test_flush_task_writes_coalesced_increments(self, mock_print):
+        """Тест що задача зливу записує накопичене одним пакетом"""
+        for _ in range(10):
+            track_user_activity(self.user, "login")
+        track_user_activity(self.other, "goal_completed", amount=5)
+
+        self.assertTrue(flush_activity_buffer().startswith("Flushed 2 activity increments (0 updated, 2 created)"))
+
+        self.assertEqual(DailyActivity.objects.get(user=self.user).count, 10)
+        self.assertEqual(DailyActivity.objects.get(user=self.other).count, 5)
+        self.assertEqual(flush_pending_activity(self.buffer).pairs, 0)
+
+    def test_flush_adds_to_existing_days(self):
+        """Тест що злив додає до вже існуючого рядка дня"""
+        record_activity(self.user.id, MONDAY, 2)
+        self.buffer.add(self.user.id, MONDAY, 3)
+        self.buffer.add(self.user.id, MONDAY + datetime.timedelta(days=1), 4)
+
+        flush_pending_activity(self.buffer)
+
+        self.assertEqual(
+            get_user_weekly_activity(self.user, MONDAY)['weekly_data'], [5, 4, 0, 0, 0, 0, 0]
+        )
+
+    def test_flush_is_one_update_per_chunk(self):
+        """Тест що існуючі рядки оновлюються одним UPDATE на частину, а не на рядок"""
+        users = [
+            User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(30)
+        ]
+        for user in users[:20]:
+            record_activity(user.id, MONDAY, 1)
+        for i, user in enumerate(users):
+            self.buffer.add(user.id, MONDAY, i % 3 + 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = flush_pending_activity(self.buffer, chunk_size=10)
+
+        self.assertEqual((result.pairs, result.updated, result.created), (30, 20, 10))
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(DailyActivity.objects.get(user=users[4]).count, 1 + 2)
+        self.assertEqual(DailyActivity.objects.get(user=users[25]).count, 2)
+
+    def test_failed_flush_keeps_increments(self):
+        """Тест що збій під час запису не губить накопичену активність"""
+        track_user_activity(self.user, "login")
+
+        with patch.object(DailyActivity.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_pending_activity(self.buffer)
+
+        track_user_activity(self.user, "login")
+        flush_pending_activity(self.buffer)
+        flush_pending_activity(self.buffer)
+
+        self.assertEqual(DailyActivity.objects.get(user=self.user).count, 2)
@@ -0,0 +1,33 @@
+"""
+Тести для бенчмарку запитів сторінок і задач (бюджети з main/benchmark_budgets.json)
+"""
+from django.test import TestCase
+
+from main.benchmarks import Measurement, check_budgets, load_budgets, run_benchmarks
+
+
+class QueryBudgetTest(TestCase):
+    """Регресійний тест кількості запитів на масштабі "small" """
+
+    def test_scenarios_within_query_budget(self):
+        """Тест що жоден сценарій не перевищує бюджет запитів"""
+        results = run_benchmarks('small')
+
+        violations = check_budgets(results, load_budgets()['small'], metrics=('queries',))
+
+        self.assertEqual(violations, [], '\n'.join(violations))
+
+    def test_check_budgets_reports_violations(self):
+        """Тест звіту про перевищення та відсутній бюджет"""
+        results = {
+            'home': Measurement(queries=15, db_ms=1.0, wall_ms=900.0),
+            'new_page': Measurement(queries=1, db_ms=1.0, wall_ms=1.0),
+        }
+        budgets = {'home': {'queries': 13, 'db_ms': 50, 'wall_ms': 250}}
+
+        self.assertEqual(check_budgets(results, budgets), [
+            'home: queries 15 > budget 13',
+            'home: wall_ms 900.0 > budget 250',
+            'new_page: no budget recorded',
+        ])
+        self.assertEqual(check_budgets(results, budgets, metrics=('db_ms',)), ['new_page: no budget recorded'])
@@ -0,0 +1,98 @@
+"""
+Тести для паралельної обробки оновлень Telegram-бота з порядком у межах чату
+"""
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from telegram import Update
+
+from main.bot_dispatcher import ChatOrderedUpdateProcessor, chat_key, get_bot_metrics
+
+
+def make_update(update_id, chat_id):
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1760000000,
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Test'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': f'message {update_id}',
+        },
+    }, None)
+
+
+class ChatOrderedUpdateProcessorTest(SimpleTestCase):
+    """Тести для ChatOrderedUpdateProcessor"""
+
+    def setUp(self):
+        cache.clear()
+        self.active = 0
+        self.peak = 0
+        self.log = []
+
+    async def handle(self, update, delay=0.05):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.log.append(('start', update.effective_chat.id, update.update_id))
+        await asyncio.sleep(delay)
+        self.log.append(('end', update.effective_chat.id, update.update_id))
+        self.active -= 1
+
+    def run_updates(self, processor, updates, delay=0.05):
+        async def scenario():
+            await asyncio.gather(*[
+                processor.process_update(update, self.handle(update, delay)) for update in updates
+            ])
+
+        async_to_sync(scenario)()
+
+    def test_different_chats_run_in_parallel(self):
+        """Тест що оновлення різних чатів обробляються одночасно"""
+        processor = ChatOrderedUpdateProcessor(max_workers=4)
+        self.run_updates(processor, [make_update(i, chat_id=i) for i in range(4)])
+
+        self.assertEqual(self.peak, 4)
+
+    def test_worker_limit(self):
+        """Тест що одночасно обробляється не більше max_workers оновлень"""
+        processor = ChatOrderedUpdateProcessor(max_workers=2)
+        self.run_updates(processor, [make_update(i, chat_id=i) for i in range(6)])
+
+        self.assertEqual(self.peak, 2)
+
+    def test_same_chat_is_sequential_and_ordered(self):
+        """Тест що оновлення одного чату не перекриваються та йдуть по порядку"""
+        processor = ChatOrderedUpdateProcessor(max_workers=8)
+        updates = [make_update(i, chat_id=1 if i % 2 else 2) for i in range(10)]
+        self.run_updates(processor, updates, delay=0.02)
+
+        for chat_id in (1, 2):
+            events = [(kind, update_id) for kind, chat, update_id in self.log if chat == chat_id]
+            expected_ids = [u.update_id for u in updates if u.effective_chat.id == chat_id]
+            self.assertEqual(
+                events,
+                [event for update_id in expected_ids for event in (('start', update_id), ('end', update_id))]
+            )
+        self.assertEqual(self.peak, 2)
+        self.assertEqual(processor._chats, {})
+
+    def test_metrics_published(self):
+        """Тест лічильників та знімка метрик у кеші"""
+        processor = ChatOrderedUpdateProcessor(max_workers=1)
+        self.run_updates(processor, [make_update(i, chat_id=i) for i in range(3)], delay=0.02)
+        async_to_sync(processor.shutdown)()
+
+        metrics = get_bot_metrics()
+        self.assertEqual(metrics['processed'], 3)
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['queued'], 0)
+        # З одним обробником останнє оновлення чекало два попередні
+        self.assertGreaterEqual(metrics['max_queue_latency_ms'], 30)
+
+    def test_chat_key_fallbacks(self):
+        """Тест ключа впорядкування для оновлень без чату"""
+        self.assertEqual(chat_key(make_update(1, chat_id=42)), 42)
+        self.assertIsNone(chat_key(object()))
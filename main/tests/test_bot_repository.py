@@ -0,0 +1,180 @@
+"""
+Тести для доступу до даних Telegram-бота та кешу /status
+"""
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from main.bot_repository import (
+    get_habits_status, get_linked_user, invalidate_status_cache, load_habits_status, load_linked_user
+)
+from main.models import Habit, HabitCheckin, TelegramProfile
+
+
+TELEGRAM_ID = '555'
+
+
+class BotRepositoryTest(TestCase):
+    """Тести для load_habits_status та load_linked_user (синхронні частини)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        TelegramProfile.objects.create(user=self.user, telegram_id=TELEGRAM_ID, connected=True)
+
+    def add_habits(self, count, checked=0):
+        habits = [Habit.objects.create(user=self.user, name=f'Habit {i}', frequency='daily') for i in range(count)]
+        for habit in habits[:checked]:
+            HabitCheckin.objects.create(habit=habit, date=timezone.localdate(), completed=True)
+        return habits
+
+    def get_status(self):
+        # Async-обгортки виконуються в окремому пулі потоків, який не бачить
+        # транзакції TestCase, тож тут перевіряємо синхронну частину
+        return load_habits_status(TELEGRAM_ID)
+
+    def test_status_is_one_query_regardless_of_habit_count(self):
+        """Тест що статус завантажується одним запитом для 2 та 20 звичок"""
+        self.add_habits(2, checked=1)
+        with self.assertNumQueries(1):
+            small = self.get_status()
+
+        cache.clear()
+        self.add_habits(18, checked=5)
+        with self.assertNumQueries(1):
+            large = self.get_status()
+
+        self.assertEqual(len(small['habits']), 2)
+        self.assertEqual(len(large['habits']), 20)
+        self.assertEqual(sum(h['completed'] for h in large['habits']), 6)
+
+    def test_status_content(self):
+        """Тест що неактивні звички пропускаються, а відмітки - лише за сьогодні"""
+        done, pending = self.add_habits(2, checked=1)
+        HabitCheckin.objects.create(
+            habit=pending, date=timezone.localdate() - timedelta(days=1), completed=True
+        )
+        Habit.objects.create(user=self.user, name='Paused', frequency='daily', active=False)
+
+        status = self.get_status()
+
+        self.assertEqual(status['username'], 'testuser')
+        self.assertEqual(status['habits'], [
+            {'name': done.name, 'completed': True},
+            {'name': pending.name, 'completed': False},
+        ])
+
+    def test_status_uses_profile_timezone(self):
+        """Тест що "сьогодні" статусу - локальна дата поясу профілю"""
+        TelegramProfile.objects.filter(user=self.user).update(timezone='America/New_York')
+        habit, = self.add_habits(1)
+        HabitCheckin.objects.create(habit=habit, date=date(2026, 1, 15), completed=True)
+
+        # 03:00 UTC 16.01: у Нью-Йорку ще 15.01, у Києві вже 16.01
+        moment = datetime(2026, 1, 16, 3, 0, tzinfo=dt_timezone.utc)
+        with patch('main.bot_repository.timezone.now', return_value=moment), self.assertNumQueries(1):
+            status = self.get_status()
+
+        self.assertEqual(status['habits'], [{'name': habit.name, 'completed': True}])
+
+    def test_unlinked_and_empty(self):
+        """Тест відповіді для неприв'язаного акаунта та акаунта без звичок"""
+        self.assertEqual(self.get_status()['habits'], [])
+        self.assertIsNone(load_habits_status('999'))
+        self.assertIsNone(load_linked_user('999'))
+        self.assertEqual(load_linked_user(TELEGRAM_ID), self.user)
+
+    def test_cached_status_skips_database(self):
+        """Тест що повторний /status у межах TTL обслуговується з кешу"""
+        self.add_habits(3)
+        self.get_status()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.get_status()['habits']), 3)
+
+    def test_checkin_invalidates_cached_status(self):
+        """Тест що чекін на сайті одразу оновлює /status"""
+        habit, = self.add_habits(1)
+        self.assertFalse(self.get_status()['habits'][0]['completed'])
+
+        self.client.login(username='testuser', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('habit_checkin'),
+                data=json.dumps({'habit_id': habit.id}),
+                content_type='application/json'
+            )
+
+        self.assertTrue(self.get_status()['habits'][0]['completed'])
+
+    def test_unbind_invalidates_cached_status(self):
+        """Тест що після відв'язки кеш чату не показує статус"""
+        self.get_status()
+        TelegramProfile.objects.filter(user=self.user).update(connected=False, telegram_id=None)
+        cache.delete(f'bot_status:{TELEGRAM_ID}')
+
+        self.assertIsNone(self.get_status())
+
+
+class BotDatabasePoolTest(TransactionTestCase):
+    """Тести для async-обгорток, що виконуються в пулі потоків bot-db"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        TelegramProfile.objects.create(user=self.user, telegram_id=TELEGRAM_ID, connected=True)
+
+    def test_async_wrappers(self):
+        """Тест що обгортки повертають ті самі дані з потоків пулу"""
+        Habit.objects.create(user=self.user, name='Read', frequency='daily')
+
+        self.assertEqual(async_to_sync(get_linked_user)(TELEGRAM_ID), self.user)
+        self.assertEqual(async_to_sync(get_habits_status)(TELEGRAM_ID)['habits'], [{'name': 'Read', 'completed': False}])
+
+        async_to_sync(invalidate_status_cache)(TELEGRAM_ID)
+        self.assertIsNone(cache.get(f'bot_status:{TELEGRAM_ID}'))
+
+    def test_runs_in_bot_db_threads(self):
+        """Тест що запити бота не займають спільний thread-sensitive потік"""
+        import threading
+        from main.bot_repository import bot_sync_to_async
+
+        name = async_to_sync(bot_sync_to_async(lambda: threading.current_thread().name))()
+        self.assertTrue(name.startswith('bot-db'))
+
+
+class StatusCommandTest(TransactionTestCase):
+    """Тести для обробника /status"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        TelegramProfile.objects.create(user=self.user, telegram_id=TELEGRAM_ID, connected=True)
+
+    def run_status(self):
+        from main.telegram_bot import status
+
+        update = MagicMock()
+        update.effective_user.id = int(TELEGRAM_ID)
+        update.message.reply_text = AsyncMock()
+        async_to_sync(status)(update, MagicMock())
+        return update.message.reply_text.call_args.args[0]
+
+    def test_status_reports_progress(self):
+        """Тест тексту прогресу за сьогодні"""
+        read = Habit.objects.create(user=self.user, name='Read', frequency='daily')
+        Habit.objects.create(user=self.user, name='Run', frequency='daily')
+        HabitCheckin.objects.create(habit=read, date=timezone.localdate(), completed=True)
+
+        text = self.run_status()
+
+        self.assertIn('✅ Read', text)
+        self.assertIn('⭕ Run', text)
+        self.assertIn('Progress: 1/2 (50%)', text)
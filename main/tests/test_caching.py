@@ -0,0 +1,93 @@
+"""
+Тести для кешу з просторами імен користувачів
+"""
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+import json
+from main.models import Habit
+from main.caching import (
+    get_user_cache, set_user_cache, get_or_set_user_cache, invalidate_user_cache,
+    get_cache_stats, HABITS_HISTORY_CACHE
+)
+
+
+class UserCacheNamespaceTest(TestCase):
+    """Тести для версійованих просторів імен"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_only_affects_one_user(self):
+        """Тест що інвалідація скидає всі ключі лише одного користувача"""
+        set_user_cache(1, 'a', 'one-a', 60)
+        set_user_cache(1, 'b', 'one-b', 60)
+        set_user_cache(2, 'a', 'two-a', 60)
+
+        invalidate_user_cache(1)
+
+        self.assertIsNone(get_user_cache(1, 'a'))
+        self.assertIsNone(get_user_cache(1, 'b'))
+        self.assertEqual(get_user_cache(2, 'a'), 'two-a')
+
+    def test_falsy_values_are_cache_hits(self):
+        """Тест що порожні значення теж кешуються"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {}
+
+        self.assertEqual(get_or_set_user_cache(1, 'empty', compute, 60), {})
+        self.assertEqual(get_or_set_user_cache(1, 'empty', compute, 60), {})
+        self.assertEqual(len(calls), 1)
+
+    def test_hit_miss_counters(self):
+        """Тест лічильників попадань та промахів"""
+        get_user_cache(1, 'a')
+        set_user_cache(1, 'a', 'value', 60)
+        get_user_cache(1, 'a')
+        get_user_cache(1, 'a')
+
+        stats = get_cache_stats(['a'])['a']
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 66.7)
+
+
+class HabitsHistoryCacheTest(TestCase):
+    """Тести кешування історії виконання звичок"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.habit = Habit.objects.create(user=self.user, name='Read', frequency='daily')
+
+    def get_history(self):
+        return self.client.get(reverse('habits_completion_history')).json()['data']
+
+    def test_history_served_from_cache(self):
+        """Тест що повторний запит історії не звертається до таблиць звичок"""
+        self.get_history()
+
+        with self.assertNumQueries(2):  # сесія та користувач
+            self.get_history()
+
+        self.assertEqual(get_cache_stats([HABITS_HISTORY_CACHE])[HABITS_HISTORY_CACHE]['hits'], 1)
+
+    def test_checkin_invalidates_history(self):
+        """Тест що чекін інвалідовує кеш історії"""
+        before = self.get_history()
+        today = max(before)
+        self.assertEqual(before[today]['completed_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('habit_checkin'),
+                data=json.dumps({'habit_id': self.habit.id}),
+                content_type='application/json'
+            )
+
+        self.assertEqual(self.get_history()[today]['completed_count'], 1)
@@ -0,0 +1,145 @@
+"""
+Тести для бітової історії чекінів (HabitYearBitmap)
+"""
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main.checkin_bitmap import CheckinHistory, check_bitmap_consistency, load_history
+from main.models import Habit, HabitCheckin, HabitYearBitmap
+
+
+class CheckinHistoryTest(TestCase):
+    """Тести для операцій над маскою без бази даних"""
+
+    def setUp(self):
+        # Серії: 29.12-02.01 (через межу року) та 05.01-06.01
+        self.days = [date(2024, 12, 29) + timedelta(days=offset) for offset in (0, 1, 2, 3, 4, 7, 8)]
+        self.history = CheckinHistory.from_dates(self.days, origin=date(2024, 1, 1))
+
+    def test_queries(self):
+        """Тест членства, підрахунку та списку днів за діапазон"""
+        self.assertIn(date(2025, 1, 1), self.history)
+        self.assertNotIn(date(2025, 1, 3), self.history)
+        self.assertNotIn(date(2023, 12, 31), self.history)
+        self.assertEqual(self.history.count(date(2024, 12, 31), date(2025, 1, 6)), 5)
+        self.assertEqual(self.history.days(date(2025, 1, 2), date(2025, 1, 10)), self.days[4:])
+        self.assertEqual(self.history.days(date(2023, 1, 1), date(2026, 1, 1)), self.days)
+
+    def test_runs(self):
+        """Тест поточної та найдовшої серії"""
+        self.assertEqual(self.history.run_ending(date(2025, 1, 2)), 5)
+        self.assertEqual(self.history.run_ending(date(2025, 1, 3)), 0)
+        self.assertEqual(self.history.current_streak(date(2025, 1, 7)), 2)
+        self.assertEqual(self.history.current_streak(date(2025, 1, 8)), 0)
+        self.assertEqual(self.history.longest_run(), 5)
+        self.assertEqual(CheckinHistory(date(2025, 1, 1)).longest_run(), 0)
+
+
+@override_settings(HABIT_CHECKIN_BITMAPS=True)
+class CheckinBitmapSyncTest(TestCase):
+    """Тести для синхронізації масок з HabitCheckin та API календаря звички"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.habit = Habit.objects.create(user=self.user, name='Reading', frequency='daily')
+        self.today = timezone.localdate()
+
+    def day(self, offset):
+        return self.today - timedelta(days=offset)
+
+    def checkin(self, offset, checked=True):
+        self.client.post(
+            reverse('habit_checkin'),
+            data=json.dumps({'habit_id': self.habit.id, 'date': self.day(offset).isoformat(), 'checked': checked}),
+            content_type='application/json'
+        )
+
+    def test_single_and_bulk_checkins_keep_bitmaps_in_sync(self):
+        """Тест що одиночний та пакетний API оновлюють маски"""
+        for offset in (0, 1, 2, 400):
+            self.checkin(offset)
+        self.checkin(1, checked=False)
+        self.client.post(
+            reverse('habit_checkin_bulk'),
+            data=json.dumps({'checkins': [
+                {'habit_id': self.habit.id, 'date': self.day(offset).isoformat(), 'checked': offset % 3 == 0}
+                for offset in range(3, 12)
+            ]}),
+            content_type='application/json'
+        )
+
+        history = load_history(self.habit)
+
+        self.assertEqual(history.days(self.day(500), self.today), [self.day(o) for o in (400, 9, 6, 3, 2, 0)])
+        self.assertEqual(history.current_streak(self.today), 1)
+        self.assertEqual(check_bitmap_consistency(), [])
+
+    def test_consistency_checker_reports_and_fixes(self):
+        """Тест виявлення розбіжностей та команди check_checkin_bitmaps --fix"""
+        self.checkin(0)
+        self.checkin(5)
+        HabitCheckin.objects.create(habit=self.habit, date=self.day(2), completed=True)
+        HabitCheckin.objects.filter(habit=self.habit, date=self.day(5)).update(completed=False)
+
+        [mismatch] = check_bitmap_consistency(Habit.objects.filter(user=self.user))
+        self.assertEqual((mismatch.habit_id, mismatch.missing, mismatch.extra), (self.habit.id, [self.day(2)], [self.day(5)]))
+
+        out = StringIO()
+        call_command('check_checkin_bitmaps', '--fix', stdout=out)
+
+        self.assertIn('Rebuilt bitmaps for 1 habits', out.getvalue())
+        self.assertEqual(check_bitmap_consistency(), [])
+        self.assertEqual(load_history(self.habit).days(self.day(10), self.today), [self.day(2), self.today])
+
+    def test_habit_history_endpoint(self):
+        """Тест календаря звички з однієї маски на рік"""
+        for offset in (0, 1, 2, 5, 6, 7, 8):
+            self.checkin(offset)
+        start = self.day(6).isoformat()
+
+        # сесія, користувач, звичка, маски
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('habit_history', args=[self.habit.id]), {'start': start})
+
+        data = response.json()
+        self.assertEqual(data['checked_days'], [self.day(o).isoformat() for o in (6, 5, 2, 1, 0)])
+        self.assertEqual(data['completed_count'], 5)
+        self.assertEqual(data['completion_percent'], round(5 / 7 * 100, 1))
+        self.assertEqual((data['current_streak'], data['longest_streak']), (3, 4))
+
+        self.assertEqual(self.client.get(reverse('habit_history', args=[self.habit.id + 1])).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('habit_history', args=[self.habit.id]), {'start': '2025-13-01'}).status_code, 400
+        )
+
+    def test_fix_fills_bitmaps_while_disabled(self):
+        """Тест що --fix заповнює маски з вимкненим прапорцем (перед увімкненням)"""
+        with override_settings(HABIT_CHECKIN_BITMAPS=False):
+            self.checkin(0)
+            self.checkin(1)
+            self.assertFalse(HabitYearBitmap.objects.exists())
+
+            out = StringIO()
+            call_command('check_checkin_bitmaps', '--fix', stdout=out)
+
+        years = {self.today.year, self.day(1).year}
+        self.assertIn(f'({len(years)} year rows written)', out.getvalue())
+        self.assertEqual(check_bitmap_consistency(), [])
+        self.assertEqual(load_history(self.habit).current_streak(self.today), 2)
+
+    @override_settings(HABIT_CHECKIN_BITMAPS=False)
+    def test_disabled_bitmaps_read_rows(self):
+        """Тест що без масок історія будується з HabitCheckin"""
+        self.checkin(0)
+        self.checkin(1)
+
+        self.assertFalse(HabitYearBitmap.objects.exists())
+        self.assertEqual(load_history(self.habit).current_streak(self.today), 2)
@@ -0,0 +1,124 @@
+"""
+Тести для пакетного API чекінів звичок
+"""
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main.models import Habit, HabitCheckin, HabitStreakRun
+from main.streaks import rebuild_habit_streak, record_checkin
+
+
+class BulkCheckinAPITest(TestCase):
+    """Тести для /api/habit-checkin/bulk/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.read = Habit.objects.create(user=self.user, name='Read', frequency='daily')
+        self.run = Habit.objects.create(user=self.user, name='Run', frequency='daily')
+        self.today = timezone.localdate()
+
+    def day(self, offset):
+        return (self.today - timedelta(days=offset)).isoformat()
+
+    def post(self, checkins):
+        return self.client.post(
+            reverse('habit_checkin_bulk'),
+            data=json.dumps({'checkins': checkins}),
+            content_type='application/json'
+        )
+
+    def test_backfill_month_in_one_request(self):
+        """Тест заповнення 30 днів для двох звичок одним запитом"""
+        checkins = [
+            {'habit_id': habit.id, 'date': self.day(offset), 'checked': True}
+            for habit in (self.read, self.run) for offset in range(30)
+        ]
+
+        response = self.post(checkins)
+
+        self.assertEqual(response.status_code, 200)
+        habits = {h['habit_id']: h for h in response.json()['habits']}
+        self.assertEqual(habits[self.read.id]['streak_days'], 30)
+        self.assertEqual(habits[self.run.id]['stats']['longest_streak'], 30)
+        self.assertEqual(HabitCheckin.objects.filter(completed=True).count(), 60)
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.read).count(), 1)
+
+    def test_query_count_does_not_grow_with_days(self):
+        """Тест що кількість запитів не залежить від кількості днів"""
+        def queries_for(days, habit):
+            checkins = [{'habit_id': habit.id, 'date': self.day(offset), 'checked': True} for offset in range(days)]
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.post(checkins).status_code, 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(queries_for(10, self.read), queries_for(60, self.run))
+
+    def test_mixed_updates_and_toggle(self):
+        """Тест оновлення наявних чекінів, зняття позначки та перемикання"""
+        for offset in range(3):
+            HabitCheckin.objects.create(habit=self.read, date=self.today - timedelta(days=offset), completed=True)
+        rebuild_habit_streak(self.read)
+
+        response = self.post([
+            {'habit_id': self.read.id, 'date': self.day(1), 'checked': False},
+            {'habit_id': self.read.id, 'date': self.day(0)},  # перемикання: знімає позначку
+            {'habit_id': self.run.id},  # перемикання на сьогодні: ставить
+        ])
+
+        habits = {h['habit_id']: h for h in response.json()['habits']}
+        self.assertEqual(habits[self.read.id]['streak_days'], 1)
+        self.assertEqual(habits[self.read.id]['stats']['longest_streak'], 1)
+        self.assertEqual(habits[self.run.id]['checkins'], [{'date': self.day(0), 'completed': True}])
+        self.assertEqual(
+            list(HabitCheckin.objects.filter(habit=self.read, completed=True).values_list('date', flat=True)),
+            [self.today - timedelta(days=2)]
+        )
+
+    def test_concurrent_checkin_read_under_lock(self):
+        """Тест що рядок паралельного одиночного чекіну враховується перед перемиканням"""
+        bulk_create = HabitCheckin.objects.bulk_create
+
+        def concurrent_checkin_first(objs, **kwargs):
+            # Одиночний чекін встигає між розбором пакета та записом
+            HabitCheckin.objects.create(habit=self.read, date=self.today, completed=True)
+            record_checkin(self.read, self.today, True)
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(HabitCheckin.objects, 'bulk_create', side_effect=concurrent_checkin_first):
+            response = self.post([{'habit_id': self.read.id}])
+
+        self.assertEqual(response.json()['habits'][0]['checkins'], [{'date': self.day(0), 'completed': False}])
+        self.read.refresh_from_db()
+        self.assertEqual((self.read.streak_days, self.read.completed_checkins), (0, 0))
+        self.assertFalse(HabitStreakRun.objects.filter(habit=self.read).exists())
+
+    def test_foreign_habit_rejects_whole_batch(self):
+        """Тест що чужа звичка відхиляє весь пакет без змін"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        foreign = Habit.objects.create(user=other, name='Foreign', frequency='daily')
+
+        response = self.post([
+            {'habit_id': self.read.id, 'checked': True},
+            {'habit_id': foreign.id, 'checked': True},
+        ])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(HabitCheckin.objects.exists())
+
+    def test_invalid_payload(self):
+        """Тест відповіді на некоректні записи"""
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{'habit_id': self.read.id, 'date': '2025-13-40'}]).status_code, 400)
+        self.assertEqual(self.post([{'habit_id': self.read.id, 'checked': 'yes'}]).status_code, 400)
+
+        self.client.logout()
+        self.assertEqual(self.post([{'habit_id': self.read.id}]).status_code, 401)
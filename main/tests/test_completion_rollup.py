@@ -0,0 +1,148 @@
+"""
+Тести для денного зведення виконання звичок (DailyCompletion)
+"""
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main.completion_rollup import get_completion_range
+from main.models import DailyCompletion, Habit, HabitCheckin
+
+
+class CompletionRollupTest(TestCase):
+    """Тести для підтримки зведення при записах та читання календарем"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.read = Habit.objects.create(user=self.user, name='Read', frequency='daily')
+        self.run = Habit.objects.create(user=self.user, name='Run', frequency='daily')
+        self.today = timezone.localdate()
+
+    def day(self, offset):
+        return self.today - timedelta(days=offset)
+
+    def checkin(self, habit, offset=0, checked=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('habit_checkin'),
+                data=json.dumps({'habit_id': habit.id, 'date': self.day(offset).isoformat(), 'checked': checked}),
+                content_type='application/json'
+            )
+
+    def rollup(self, offset=0):
+        row = DailyCompletion.objects.get(user=self.user, date=self.day(offset))
+        return row.completed_count, row.active_count
+
+    def history(self, **params):
+        return self.client.get(reverse('habits_completion_history'), params)
+
+    def test_checkins_maintain_rollup(self):
+        """Тест що чекін та зняття позначки оновлюють рядок дня"""
+        self.checkin(self.read)
+        self.checkin(self.run)
+        self.assertEqual(self.rollup(), (2, 2))
+
+        self.checkin(self.read, checked=False)
+        self.assertEqual(self.rollup(), (1, 2))
+
+    def test_bulk_checkins_maintain_rollup(self):
+        """Тест що пакетний API оновлює зведення для всіх днів"""
+        self.client.post(
+            reverse('habit_checkin_bulk'),
+            data=json.dumps({'checkins': [
+                {'habit_id': habit.id, 'date': self.day(offset).isoformat(), 'checked': True}
+                for habit in (self.read, self.run) for offset in range(5)
+            ]}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(DailyCompletion.objects.filter(user=self.user, completed_count=2).count(), 5)
+
+    def test_history_reads_any_range_with_one_rollup_query(self):
+        """Тест довільного діапазону історії та кількості запитів"""
+        self.checkin(self.read, offset=100)
+        self.checkin(self.run, offset=100)
+        start, end = self.day(120).isoformat(), self.day(90).isoformat()
+
+        # сесія, користувач, кількість активних звичок, діапазон зведення
+        with self.assertNumQueries(4):
+            data = self.history(start=start, end=end).json()['data']
+
+        self.assertEqual(len(data), 31)
+        self.assertEqual(data[self.day(100).isoformat()], {
+            'all_completed': True, 'day_was_complete': True, 'completed_count': 2, 'total_count': 2,
+        })
+        self.assertFalse(data[start]['all_completed'])
+
+    def test_new_habit_keeps_past_days_complete(self):
+        """Тест що нова звичка не робить минулі повні дні невиконаними"""
+        self.checkin(self.read, offset=1)
+        self.checkin(self.run, offset=1)
+        self.checkin(self.read)
+
+        self.client.post(
+            reverse('create_custom_habit'),
+            data=json.dumps({'name': 'Meditate', 'description': '', 'frequency': 'daily'}),
+            content_type='application/json'
+        )
+
+        data = self.history().json()['data']
+        self.assertTrue(data[self.day(1).isoformat()]['all_completed'])
+        self.assertEqual(data[self.today.isoformat()]['total_count'], 3)
+
+    def test_delete_habit_updates_past_counts(self):
+        """Тест що видалення звички перераховує дні з її чекінами"""
+        self.checkin(self.read, offset=3)
+        self.checkin(self.run, offset=3)
+
+        self.client.post(
+            reverse('delete_habit'),
+            data=json.dumps({'habit_id': self.run.id}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(self.rollup(3), (1, 2))
+        self.assertEqual(get_completion_range(self.user.id, self.day(3), self.day(3)), {self.day(3): (1, 2)})
+
+    def test_paused_habit_checkins_not_counted(self):
+        """Тест що чекіни звички на паузі не роблять день повністю виконаним"""
+        self.checkin(self.read, offset=2)
+        self.checkin(self.run, offset=2)
+        self.assertEqual(self.rollup(2), (2, 2))
+
+        self.client.post(
+            reverse('toggle_habit_active'),
+            data=json.dumps({'habit_id': self.run.id}),
+            content_type='application/json'
+        )
+        self.assertEqual(self.rollup(2), (1, 2))
+
+        self.checkin(self.run)
+        self.assertEqual(self.rollup(), (0, 1))
+        self.assertFalse(self.history().json()['data'][self.today.isoformat()]['all_completed'])
+
+    def test_invalid_range(self):
+        """Тест відповіді на некоректний діапазон"""
+        self.assertEqual(self.history(start='2025-02-30').status_code, 400)
+        self.assertEqual(self.history(start=self.today.isoformat(), end=self.day(1).isoformat()).status_code, 400)
+        self.assertEqual(self.history(start=self.day(5000).isoformat()).status_code, 400)
+
+    def test_rebuild_command(self):
+        """Тест команди rebuild_completion_rollup"""
+        HabitCheckin.objects.create(habit=self.read, date=self.day(2), completed=True)
+        HabitCheckin.objects.create(habit=self.run, date=self.day(2), completed=True)
+        out = StringIO()
+
+        call_command('rebuild_completion_rollup', '--user', 'testuser', stdout=out)
+
+        self.assertEqual(self.rollup(2), (2, 2))
+        self.assertIn('1 daily completion rows', out.getvalue())
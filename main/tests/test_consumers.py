@@ -0,0 +1,98 @@
+"""
+Тести для WebSocket consumer сповіщень
+"""
+import json
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import TransactionTestCase
+from unittest.mock import patch
+
+from main.consumers import NotificationConsumer
+from main.models import Notification
+
+
+class NotificationConsumerTest(TransactionTestCase):
+    """Тести для NotificationConsumer (лічильник непрочитаних через WebSocket)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Notification.objects.create(user=self.user, message='Unread 1')
+        Notification.objects.create(user=self.user, message='Unread 2')
+        Notification.objects.create(user=self.user, message='Read', read=True)
+
+    async def connect(self, user=None):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user or self.user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def test_unread_count_on_connect(self):
+        """Тест що при підключенні надсилається кількість непрочитаних"""
+        async def scenario():
+            communicator, connected = await self.connect()
+            self.assertTrue(connected)
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'unread_count', 'count': 2})
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_anonymous_rejected(self):
+        """Тест що анонімний користувач не підключається"""
+        async def scenario():
+            communicator, connected = await self.connect(user=AnonymousUser())
+            self.assertFalse(connected)
+
+        async_to_sync(scenario)()
+
+    def test_new_notification_carries_delta(self):
+        """Тест що нове повідомлення збільшує лічильник на клієнті"""
+        async def scenario():
+            communicator, _ = await self.connect()
+            await communicator.receive_json_from()
+
+            await get_channel_layer().group_send(f'user_{self.user.id}', {
+                'type': 'notification_message',
+                'message': 'Hello',
+                'notification_id': 10,
+            })
+            data = await communicator.receive_json_from()
+            self.assertEqual(data['type'], 'notification')
+            self.assertEqual(data['unread_delta'], 1)
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    @patch('builtins.print')
+    def test_mark_read_pushes_negative_delta(self, mock_print):
+        """Тест що позначення прочитаним надсилає -1 в усі вкладки"""
+        notification = Notification.objects.filter(user=self.user, read=False).first()
+        self.client.login(username='testuser', password='testpass123')
+
+        def mark_read():
+            return self.client.post(
+                '/api/notifications/mark-read/',
+                data=json.dumps({'notification_id': notification.id}),
+                content_type='application/json'
+            )
+
+        async def scenario():
+            communicator, _ = await self.connect()
+            await communicator.receive_json_from()
+
+            response = await database_sync_to_async(mark_read)()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'unread_count', 'delta': -1})
+
+            # Повторне позначення не змінює лічильник
+            await database_sync_to_async(mark_read)()
+            self.assertTrue(await communicator.receive_nothing())
+
+            await communicator.send_json_to({'type': 'get_unread_count'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'unread_count', 'count': 1})
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
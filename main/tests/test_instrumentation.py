@@ -0,0 +1,158 @@
+"""
+Тести для метрик запитів (middleware, Channels consumer, /metrics та команда звіту)
+"""
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from main.consumers import NotificationConsumer
+from main.instrumentation import (
+    QueryRecorder, flush_request_metrics, get_request_metrics, render_prometheus,
+    reset_request_metrics, summarize
+)
+from main.models import Habit, Notification
+
+
+def clear_metrics():
+    flush_request_metrics()
+    reset_request_metrics()
+    cache.clear()
+
+
+def collected():
+    flush_request_metrics()
+    return get_request_metrics()
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN='')
+class RequestMetricsMiddlewareTest(TestCase):
+    """Тести для RequestMetricsMiddleware та /metrics"""
+
+    def setUp(self):
+        clear_metrics()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        for i in range(3):
+            Habit.objects.create(user=self.user, name=f'Habit {i}', frequency='daily')
+
+    def test_records_queries_and_duplicates_per_view(self):
+        """Тест що для view записуються запити, повтори SQL та час"""
+        self.client.get(reverse('habits'))
+        self.client.get(reverse('habits'))
+
+        habits = collected()['habits']
+
+        self.assertEqual(habits['requests'], 2)
+        self.assertEqual(habits['sampled'], 2)
+        self.assertGreater(habits['queries'], 0)
+        # Відмітки за сьогодні анотуються в запиті звичок, тож повторів SQL немає
+        self.assertEqual(habits['duplicate_queries'], 0)
+        self.assertGreater(habits['wall_time_us'], habits['db_time_us'])
+        self.assertEqual(summarize(habits)['avg_queries'], habits['queries'] / 2)
+
+    def test_query_recorder_counts_repeated_sql(self):
+        """Тест що однаковий SQL з різними параметрами рахується як повтор"""
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for habit in Habit.objects.filter(user=self.user):
+                habit.is_checked_today()
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicates, 2)
+
+    def test_json_endpoint_and_unmatched(self):
+        """Тест JSON API та запитів, що не потрапили в жоден маршрут"""
+        self.client.get(reverse('unread_notifications_count'))
+        self.client.get('/no-such-page/')
+
+        metrics = collected()
+
+        self.assertEqual(metrics['unread_notifications_count']['requests'], 1)
+        self.assertEqual(metrics['unmatched']['requests'], 1)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_only_counted(self):
+        """Тест що поза вибіркою рахується лише кількість запитів"""
+        self.client.get(reverse('habits'))
+
+        habits = collected()['habits']
+
+        self.assertEqual(habits['requests'], 1)
+        self.assertEqual(habits['sampled'], 0)
+        self.assertEqual(habits['queries'], 0)
+
+    def test_prometheus_endpoint_requires_staff_or_token(self):
+        """Тест доступу до /metrics та формату відповіді"""
+        self.client.get(reverse('habits'))
+        self.assertEqual(self.client.get(reverse('prometheus_metrics')).status_code, 403)
+
+        with override_settings(METRICS_TOKEN='scrape-token'):
+            self.assertEqual(self.client.get(reverse('prometheus_metrics')).status_code, 403)
+            response = self.client.get(reverse('prometheus_metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE taskforge_requests_total counter', body)
+        self.assertIn('taskforge_requests_total{endpoint="habits"} 1', body)
+        self.assertIn('taskforge_sql_queries_total{endpoint="habits"}', body)
+
+    def test_report_command(self):
+        """Тест команди request_metrics"""
+        self.client.get(reverse('habits'))
+        flush_request_metrics()
+        out = StringIO()
+
+        call_command('request_metrics', '--sort', 'queries', '--reset', stdout=out)
+
+        self.assertIn('habits', out.getvalue())
+        self.assertIn('Request metrics reset', out.getvalue())
+        self.assertEqual(get_request_metrics(), {})
+
+    def test_render_prometheus_escapes_labels(self):
+        """Тест екранування імені endpoint та переведення часу в секунди"""
+        counters = dict.fromkeys(
+            ('requests', 'sampled', 'queries', 'duplicate_queries', 'db_time_us', 'wall_time_us'), 0
+        )
+        counters.update(requests=1, db_time_us=1_500_000)
+
+        body = render_prometheus({'a"b': counters})
+
+        self.assertIn('taskforge_requests_total{endpoint="a\\"b"} 1', body)
+        self.assertIn('taskforge_db_seconds_total{endpoint="a\\"b"} 1.5', body)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+class ConsumerMetricsTest(TransactionTestCase):
+    """Тести для InstrumentedConsumerMixin на NotificationConsumer"""
+
+    def setUp(self):
+        clear_metrics()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Notification.objects.create(user=self.user, message='Unread')
+
+    def test_connect_records_queries_from_db_threads(self):
+        """Тест що SQL з database_sync_to_async потрапляє в метрики події"""
+        async def scenario():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'ping'})
+            await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+        metrics = collected()
+
+        connect = metrics['ws:NotificationConsumer:websocket.connect']
+        self.assertEqual(connect['requests'], 1)
+        self.assertEqual(connect['queries'], 1)
+        self.assertEqual(metrics['ws:NotificationConsumer:websocket.receive']['queries'], 0)
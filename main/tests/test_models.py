@@ -7,7 +7,7 @@ from django.utils import timezone
 from datetime import timedelta, date
 from main.models import (
     TelegramProfile, Habit, HabitCheckin, Goal, SubGoal,
-    Notification, GoalTemplate, HabitTemplate, UserActivity
+    Notification, GoalTemplate, HabitTemplate, DailyActivity
 )
 
 
@@ -87,7 +87,7 @@ class HabitModelTest(TestCase):
     
     def test_is_checked_today_true(self):
         """Тест перевірки виконання звички сьогодні - виконано"""
-        today = timezone.now().date()
+        today = timezone.localdate()
         HabitCheckin.objects.create(
             habit=self.habit,
             date=today,
@@ -95,13 +95,24 @@ class HabitModelTest(TestCase):
         )
         self.assertTrue(self.habit.is_checked_today())
     
+    def test_is_checked_today_uses_annotation(self):
+        """Тест що анотація with_checked_today/with_checked_on замінює запит на звичку"""
+        today = timezone.localdate()
+        HabitCheckin.objects.create(habit=self.habit, date=today - timedelta(days=1), completed=True)
+        
+        habit = Habit.objects.with_checked_today().with_checked_on(today - timedelta(days=1)).get(pk=self.habit.pk)
+        
+        with self.assertNumQueries(0):
+            self.assertFalse(habit.is_checked_today())
+        self.assertTrue(habit.checked_on)
+    
     def test_current_streak_zero_no_checkins(self):
         """Тест поточного streak без чекінів"""
         self.assertEqual(self.habit.current_streak, 0)
     
     def test_current_streak_today(self):
         """Тест поточного streak з чекіном сьогодні"""
-        today = timezone.now().date()
+        today = timezone.localdate()
         self.habit.last_checkin = today
         self.habit.streak_days = 5
         self.habit.save()
@@ -109,7 +120,7 @@ class HabitModelTest(TestCase):
     
     def test_current_streak_yesterday(self):
         """Тест поточного streak з чекіном вчора"""
-        yesterday = timezone.now().date() - timedelta(days=1)
+        yesterday = timezone.localdate() - timedelta(days=1)
         self.habit.last_checkin = yesterday
         self.habit.streak_days = 3
         self.habit.save()
@@ -117,7 +128,7 @@ class HabitModelTest(TestCase):
     
     def test_current_streak_broken(self):
         """Тест обірваного streak (більше дня тому)"""
-        two_days_ago = timezone.now().date() - timedelta(days=2)
+        two_days_ago = timezone.localdate() - timedelta(days=2)
         self.habit.last_checkin = two_days_ago
         self.habit.streak_days = 10
         self.habit.save()
@@ -127,13 +138,13 @@ class HabitModelTest(TestCase):
         """Тест максимального streak"""
         self.habit.max_streak_days = 15
         self.habit.streak_days = 10
-        self.habit.last_checkin = timezone.now().date()
+        self.habit.last_checkin = timezone.localdate()
         self.habit.save()
         self.assertEqual(self.habit.longest_streak, 15)
     
     def test_completion_rate(self):
         """Тест розрахунку відсотка виконання"""
-        today = timezone.now().date()
+        today = timezone.localdate()
         # Створюємо чекіни за останні 10 днів
         for i in range(10):
             date_obj = today - timedelta(days=i)
@@ -148,6 +159,22 @@ class HabitModelTest(TestCase):
         self.assertGreaterEqual(rate, 30)
         self.assertLessEqual(rate, 40)
 
+    def test_completion_rates_without_counters_in_lists(self):
+        """Тест що списки (with_window_completed) та overall рахують чекіни, якщо лічильники не заповнені"""
+        today = timezone.localdate()
+        HabitCheckin.objects.bulk_create([
+            HabitCheckin(habit=self.habit, date=today - timedelta(days=i), completed=True) for i in range(3)
+        ])
+        tracked = Habit.objects.create(user=self.user, name='Tracked', frequency='daily',
+                                       completed_30_days=6, completed_checkins=6, first_checkin=today)
+
+        with self.assertNumQueries(1):
+            rates = {habit.name: habit.completion_rate for habit in Habit.objects.with_window_completed()}
+
+        self.assertEqual(rates, {self.habit.name: 10, tracked.name: 20})
+        # Звичку створено сьогодні, перший чекін - 2 дні тому: 3 з 3 днів
+        self.assertEqual(self.habit.overall_completion_rate(), 100)
+
 
 class HabitCheckinModelTest(TestCase):
     """Тести для моделі HabitCheckin"""
@@ -166,7 +193,7 @@ class HabitCheckinModelTest(TestCase):
     
     def test_create_checkin(self):
         """Тест створення чекіну"""
-        today = timezone.now().date()
+        today = timezone.localdate()
         checkin = HabitCheckin.objects.create(
             habit=self.habit,
             date=today,
@@ -193,7 +220,7 @@ class GoalModelTest(TestCase):
             user=self.user,
             name='Learn Python',
             description='Complete Python course',
-            due_date=timezone.now().date() + timedelta(days=30),
+            due_date=timezone.localdate() + timedelta(days=30),
             category='education'
         )
         self.assertEqual(goal.name, 'Learn Python')
@@ -222,6 +249,45 @@ class GoalModelTest(TestCase):
         self.assertAlmostEqual(goal.progress, 66.67, places=1)
 
 
+class GoalQuerySetTest(TestCase):
+    """Тести для Goal.objects.with_progress()"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+    
+    def test_with_progress_annotations(self):
+        """Тест анотованих лічильників підцілей та відсотка"""
+        goal = Goal.objects.create(user=self.user, name='Test Goal')
+        SubGoal.objects.create(goal=goal, name='Subgoal 1', completed=True)
+        SubGoal.objects.create(goal=goal, name='Subgoal 2', completed=False)
+        SubGoal.objects.create(goal=goal, name='Subgoal 3', completed=True)
+        Goal.objects.create(user=self.user, name='Empty Goal')
+        
+        goals = {g.name: g for g in Goal.objects.with_progress()}
+        
+        self.assertEqual(goals['Test Goal'].total_subgoals, 3)
+        self.assertEqual(goals['Test Goal'].completed_subgoals, 2)
+        self.assertEqual(goals['Test Goal'].progress_percent, 67)
+        self.assertEqual(goals['Empty Goal'].progress_percent, 0)
+    
+    def test_methods_prefer_annotations(self):
+        """Тест що методи моделі використовують анотації без запитів"""
+        goal = Goal.objects.create(user=self.user, name='Test Goal')
+        SubGoal.objects.create(goal=goal, name='Subgoal 1', completed=True)
+        SubGoal.objects.create(goal=goal, name='Subgoal 2', completed=False)
+        
+        annotated = Goal.objects.with_progress().get(pk=goal.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(annotated.get_progress_percent(), 50)
+            self.assertEqual(annotated.get_completed_subgoals_count(), 1)
+            self.assertEqual(annotated.get_total_subgoals_count(), 2)
+        self.assertEqual(goal.get_progress_percent(), 50)
+
+
 class SubGoalModelTest(TestCase):
     """Тести для моделі SubGoal"""
     
@@ -274,8 +340,8 @@ class NotificationModelTest(TestCase):
         self.assertFalse(notification.telegram_sent)
 
 
-class UserActivityModelTest(TestCase):
-    """Тести для моделі UserActivity"""
+class DailyActivityModelTest(TestCase):
+    """Тести для моделі DailyActivity"""
     
     def setUp(self):
         self.user = User.objects.create_user(
@@ -284,41 +350,17 @@ class UserActivityModelTest(TestCase):
             password='testpass123'
         )
     
-    def test_create_user_activity(self):
-        """Тест створення запису активності"""
-        from main.activity_tracker import get_monday_of_current_week
-        
-        activity = UserActivity.objects.create(
-            user=self.user,
-            week_start=get_monday_of_current_week()
-        )
+    def test_create_daily_activity(self):
+        """Тест створення запису активності за день"""
+        activity = DailyActivity.objects.create(user=self.user, date=timezone.localdate())
         self.assertEqual(activity.user, self.user)
-        self.assertEqual(activity.activity_count, 0)
+        self.assertEqual(activity.count, 0)
     
-    def test_increment_activity(self):
-        """Тест збільшення активності"""
-        from main.activity_tracker import get_monday_of_current_week
-        
-        activity = UserActivity.objects.create(
-            user=self.user,
-            week_start=get_monday_of_current_week()
-        )
-        activity.increment()
-        self.assertEqual(activity.activity_count, 1)
-        
-        activity.increment()
-        self.assertEqual(activity.activity_count, 2)
-    
-    def test_reset_week(self):
-        """Тест скидання тижневої активності"""
-        from main.activity_tracker import get_monday_of_current_week
-        
-        activity = UserActivity.objects.create(
-            user=self.user,
-            week_start=get_monday_of_current_week()
-        )
-        activity.activity_count = 50
-        activity.save()
+    def test_one_row_per_day(self):
+        """Тест що на кожен день користувача є лише один рядок"""
+        from django.db import IntegrityError
         
-        activity.reset_week()
-        self.assertEqual(activity.activity_count, 0)
+        today = timezone.localdate()
+        DailyActivity.objects.create(user=self.user, date=today, count=3)
+        with self.assertRaises(IntegrityError):
+            DailyActivity.objects.create(user=self.user, date=today, count=1)
@@ -0,0 +1,262 @@
+"""
+Тести для розкладу нагадувань за часовими поясами (main.reminders)
+"""
+import json
+from datetime import date, datetime, timezone as dt_timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from main.models import Habit, HabitCheckin, Notification, TelegramProfile
+from main.reminders import due_reminder_groups, minutes_to_midnight, zones_at_local_minute
+from main.tasks import (
+    check_and_notify_broken_streaks, generate_habit_notifications, refresh_habit_completion_counts
+)
+from main.user_timezone import load_zone
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class DueReminderGroupsTest(TestCase):
+    """Тести для визначення поясів з позначкою нагадування"""
+
+    def test_minutes_to_midnight(self):
+        """Тест хвилин до півночі з урахуванням секунд запуску"""
+        zone = ZoneInfo('Europe/Kyiv')
+        self.assertEqual(minutes_to_midnight(utc(2026, 1, 15, 20, 0, 40), zone), 120)
+        self.assertEqual(minutes_to_midnight(utc(2026, 1, 15, 21, 55), zone), 5)
+
+    def test_load_zone(self):
+        """Тест перевірки назви поясу без переліку всіх поясів"""
+        self.assertEqual(load_zone('America/New_York'), ZoneInfo('America/New_York'))
+        for name in ('Mars/Olympus', '../etc/passwd', '', None, 5):
+            self.assertIsNone(load_zone(name))
+
+    def test_zones_at_local_minute(self):
+        """Тест поясів, де щойно настав новий день, з їхньою локальною датою"""
+        zones = ['Europe/Kyiv', 'America/New_York', 'Bad/Zone']
+
+        self.assertEqual(zones_at_local_minute(utc(2026, 1, 15, 22, 5), zones, 5), {date(2026, 1, 16): ['Europe/Kyiv']})
+        self.assertEqual(zones_at_local_minute(utc(2026, 1, 16, 5, 5), zones, 5), {date(2026, 1, 16): ['America/New_York']})
+        self.assertEqual(zones_at_local_minute(utc(2026, 1, 15, 22, 6), zones, 5), {})
+
+    def test_groups_by_mark_and_local_date(self):
+        """Тест що в одну хвилину різні пояси отримують різні позначки"""
+        # 21:00 UTC взимку: Київ 23:00, Варшава 22:00, Нью-Йорк 16:00
+        groups = due_reminder_groups(
+            utc(2026, 1, 15, 21, 0), ['Europe/Kyiv', 'Europe/Warsaw', 'America/New_York', 'Bad/Zone']
+        )
+
+        self.assertEqual(
+            [(g.label, g.local_date.isoformat(), g.timezones) for g in groups],
+            [('2 hours', '2026-01-15', ['Europe/Warsaw']), ('1 hour', '2026-01-15', ['Europe/Kyiv'])]
+        )
+
+    def test_same_mark_on_different_local_dates(self):
+        """Тест що пояси з різницею в добу не змішуються в одній групі"""
+        # 09:00 UTC: Кірітіматі (UTC+14) та Гонолулу (UTC-10) обидва о 23:00, але з різницею в добу
+        groups = due_reminder_groups(utc(2026, 1, 15, 9, 0), ['Pacific/Kiritimati', 'Pacific/Honolulu'])
+
+        self.assertEqual(
+            [(g.minutes, g.local_date.isoformat(), g.timezones) for g in groups],
+            [(60, '2026-01-15', ['Pacific/Kiritimati']), (60, '2026-01-14', ['Pacific/Honolulu'])]
+        )
+
+    def test_daylight_saving_shift(self):
+        """Тест що перехід на літній час зсуває нагадування в UTC"""
+        kyiv = ['Europe/Kyiv']
+        self.assertEqual(due_reminder_groups(utc(2026, 1, 15, 20, 0), kyiv)[0].minutes, 120)
+        self.assertEqual(due_reminder_groups(utc(2026, 7, 15, 19, 0), kyiv)[0].minutes, 120)
+        self.assertEqual(due_reminder_groups(utc(2026, 7, 15, 20, 0), kyiv)[0].minutes, 60)
+
+
+@patch('main.tasks.dispatch_notification_delivery')
+class TimezoneRemindersTest(TestCase):
+    """Тести для щохвилинної задачі нагадувань з часовими поясами користувачів"""
+
+    def setUp(self):
+        self.kyiv = self.create_user('kyiv', 'Europe/Kyiv')
+        self.new_york = self.create_user('newyork', 'America/New_York')
+        # Користувач без профілю - часовий пояс сервера
+        self.no_profile = User.objects.create_user(username='noprofile', password='testpass123')
+        Habit.objects.create(user=self.no_profile, name='Walk', frequency='daily')
+
+    def create_user(self, username, zone):
+        user = User.objects.create_user(username=username, password='testpass123')
+        TelegramProfile.objects.create(user=user, timezone=zone)
+        Habit.objects.create(user=user, name='Read', frequency='daily')
+        return user
+
+    def run_at(self, moment):
+        with patch('main.tasks.timezone.now', return_value=moment):
+            return generate_habit_notifications()
+
+    def reminded(self):
+        return set(Notification.objects.values_list('user__username', flat=True))
+
+    def test_only_due_timezone_is_processed(self, mock_dispatch):
+        """Тест що нагадування отримують лише користувачі поясу з позначкою"""
+        # 20:00 UTC: Київ 22:00, Нью-Йорк 15:00
+        self.run_at(utc(2026, 1, 15, 20, 0))
+        self.assertEqual(self.reminded(), {'kyiv', 'noprofile'})
+
+        # 03:00 UTC наступного дня: Нью-Йорк 22:00 попереднього дня
+        Notification.objects.all().delete()
+        self.run_at(utc(2026, 1, 16, 3, 0))
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.new_york)
+        self.assertIn('2 hours', notification.message)
+
+    def test_local_date_decides_completion(self, mock_dispatch):
+        """Тест що виконання перевіряється за локальною датою поясу"""
+        habit = self.new_york.habits.get()
+        HabitCheckin.objects.create(habit=habit, date=datetime(2026, 1, 15).date(), completed=True)
+
+        # 04:55 UTC 16.01 - у Нью-Йорку 23:55 15.01, звичку вже виконано
+        self.run_at(utc(2026, 1, 16, 4, 55))
+
+        self.assertFalse(Notification.objects.exists())
+
+    def test_idle_minute_single_query(self, mock_dispatch):
+        """Тест що хвилина без позначок робить лише запит поясів"""
+        with self.assertNumQueries(1):
+            result = self.run_at(utc(2026, 1, 15, 12, 7))
+
+        self.assertEqual(result, "No reminder scheduled for current time")
+
+
+class SetUserTimezoneViewTest(TestCase):
+    """Тести для API збереження часового поясу"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+
+    def post(self, payload):
+        return self.client.post(
+            reverse('set_user_timezone'), data=json.dumps(payload), content_type='application/json'
+        )
+
+    def test_saves_valid_timezone(self):
+        """Тест збереження поясу (профіль створюється за потреби)"""
+        response = self.post({'timezone': 'America/New_York'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TelegramProfile.objects.get(user=self.user).timezone, 'America/New_York')
+
+    def test_rejects_unknown_timezone(self):
+        """Тест відхилення невідомого поясу"""
+        for payload in ({'timezone': 'Mars/Olympus'}, {'timezone': 5}, {}):
+            self.assertEqual(self.post(payload).status_code, 400)
+        self.assertFalse(TelegramProfile.objects.filter(user=self.user).exists())
+
+
+@patch('main.tasks.dispatch_notification_delivery')
+class UserTimezoneCheckinTest(TestCase):
+    """Тести що чекін з сайту та нагадування рахують дату в одному поясі"""
+
+    # 03:00 UTC 16.01: у Нью-Йорку 22:00 15.01 (позначка "2 hours"), у Києві вже 16.01
+    moment = utc(2026, 1, 16, 3, 0)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='newyork', password='testpass123')
+        self.habit = Habit.objects.create(user=self.user, name='Read', frequency='daily')
+
+    def checkin(self):
+        with patch('django.utils.timezone.now', return_value=self.moment):
+            self.client.post(
+                reverse('habit_checkin'),
+                data=json.dumps({'habit_id': self.habit.id}),
+                content_type='application/json'
+            )
+        return HabitCheckin.objects.get(habit=self.habit)
+
+    def test_checkin_date_in_profile_timezone(self, mock_dispatch):
+        """Тест що чекін без дати записується на локальну дату користувача"""
+        TelegramProfile.objects.create(user=self.user, timezone='America/New_York')
+        self.client.login(username='newyork', password='testpass123')
+
+        self.assertEqual(self.checkin().date.isoformat(), '2026-01-15')
+
+        with patch('main.tasks.timezone.now', return_value=self.moment):
+            generate_habit_notifications()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_set_timezone_applies_to_next_requests(self, mock_dispatch):
+        """Тест що новий пояс діє з наступного запиту без повторного входу"""
+        self.client.login(username='newyork', password='testpass123')
+        self.client.post(
+            reverse('set_user_timezone'),
+            data=json.dumps({'timezone': 'America/New_York'}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(self.checkin().date.isoformat(), '2026-01-15')
+
+
+@patch('main.tasks.dispatch_notification_delivery')
+class NightlyTimezoneTasksTest(TestCase):
+    """Тести що нічні задачі нового дня йдуть за локальною датою поясу користувача"""
+
+    def setUp(self):
+        # Координатор запускає chord - виконуємо його синхронно
+        from TaskForge.celery import app
+        self.addCleanup(setattr, app.conf, 'task_always_eager', app.conf.task_always_eager)
+        app.conf.task_always_eager = True
+
+        self.kyiv = self.create_habit('kyiv', 'Europe/Kyiv')
+        self.new_york = self.create_habit('newyork', 'America/New_York')
+
+    def create_habit(self, username, zone):
+        user = User.objects.create_user(username=username, password='testpass123')
+        TelegramProfile.objects.create(user=user, timezone=zone)
+        habit = Habit.objects.create(
+            user=user, name='Read', frequency='daily', streak_days=3, last_checkin=date(2026, 1, 14)
+        )
+        # Чекін на першому дні 30-денного вікна 15.01 - випадає з вікна 16.01
+        HabitCheckin.objects.create(habit=habit, date=date(2025, 12, 16), completed=True)
+        Habit.objects.filter(pk=habit.pk).update(completed_30_days=1)
+        return habit
+
+    def run_at(self, task, moment):
+        with patch('main.tasks.timezone.now', return_value=moment):
+            return task()
+
+    def counts(self):
+        return {habit.user.username: habit.completed_30_days for habit in Habit.objects.select_related('user')}
+
+    def test_broken_streaks_checked_after_local_midnight(self, mock_dispatch):
+        """Тест що streak вважається обірваним лише з початком нового дня поясу"""
+        # 22:05 UTC 15.01: у Києві 00:05 16.01, у Нью-Йорку ще 17:05 15.01
+        self.run_at(check_and_notify_broken_streaks, utc(2026, 1, 15, 22, 5))
+        self.assertEqual(set(Notification.objects.values_list('user__username', flat=True)), {'kyiv'})
+
+        # 05:05 UTC 16.01: у Нью-Йорку 00:05 16.01
+        Notification.objects.all().delete()
+        self.run_at(check_and_notify_broken_streaks, utc(2026, 1, 16, 5, 5))
+        self.assertEqual(set(Notification.objects.values_list('user__username', flat=True)), {'newyork'})
+
+    def test_completion_counts_shift_with_local_date(self, mock_dispatch):
+        """Тест що вікно лічильників зсувається на локальну дату поясу"""
+        self.run_at(refresh_habit_completion_counts, utc(2026, 1, 15, 22, 10))
+        self.assertEqual(self.counts(), {'kyiv': 0, 'newyork': 1})
+
+        self.run_at(refresh_habit_completion_counts, utc(2026, 1, 16, 5, 10))
+        self.assertEqual(self.counts(), {'kyiv': 0, 'newyork': 0})
+
+    def test_idle_minute(self, mock_dispatch):
+        """Тест що без нового дня в жодному поясі задачі нічого не роблять"""
+        self.assertEqual(
+            self.run_at(check_and_notify_broken_streaks, utc(2026, 1, 15, 12, 7)),
+            "No timezone starts a new day now"
+        )
+        self.assertEqual(
+            self.run_at(refresh_habit_completion_counts, utc(2026, 1, 15, 12, 7)),
+            "No timezone starts a new day now"
+        )
+        self.assertFalse(Notification.objects.exists())
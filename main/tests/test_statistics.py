@@ -0,0 +1,94 @@
+"""
+Тести для сервісу статистики
+"""
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+import json
+from main.models import Habit, HabitCheckin, Goal, SubGoal
+from main.completion_rollup import rebuild_daily_completion
+from main.statistics_service import build_statistics_context
+from main.streaks import rebuild_habit_streak
+
+
+class StatisticsServiceTest(TestCase):
+    """Тести для build_statistics_context"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+
+    def add_data(self, habits, goals, days):
+        for i in range(habits):
+            habit = Habit.objects.create(user=self.user, name=f'Habit {i}', frequency='daily')
+            HabitCheckin.objects.bulk_create([
+                HabitCheckin(habit=habit, date=self.today - timedelta(days=d), completed=True)
+                for d in range(days)
+            ])
+            rebuild_habit_streak(habit)
+        for i in range(goals):
+            goal = Goal.objects.create(user=self.user, name=f'Goal {i}')
+            SubGoal.objects.create(goal=goal, name='Step 1', completed=True)
+            SubGoal.objects.create(goal=goal, name='Step 2')
+        # Чекіни створені напряму, а не через API, тож зведення та лічильники звичок будуємо вручну
+        rebuild_daily_completion([self.user.id])
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            build_statistics_context(self.user, today=self.today)
+        return len(ctx.captured_queries)
+
+    def test_query_count_constant_as_data_grows(self):
+        """Тест що кількість запитів не залежить від обсягу даних"""
+        self.add_data(habits=1, goals=1, days=1)
+        build_statistics_context(self.user, today=self.today)
+        small = self.count_queries()
+
+        self.add_data(habits=10, goals=10, days=60)
+        large = self.count_queries()
+
+        self.assertEqual(small, large)
+
+    def test_average_completion_without_counters(self):
+        """Тест що середнє виконання рахує чекіни звичок з незаповненими лічильниками"""
+        habit = Habit.objects.create(user=self.user, name='Imported', frequency='daily')
+        HabitCheckin.objects.bulk_create([
+            HabitCheckin(habit=habit, date=self.today - timedelta(days=d), completed=True) for d in range(6)
+        ])
+
+        context = build_statistics_context(self.user, today=self.today)
+
+        self.assertEqual(context['avg_habit_completion'], 20.0)
+
+    def test_context_values(self):
+        """Тест значень контексту статистики"""
+        self.add_data(habits=2, goals=1, days=3)
+        Goal.objects.create(user=self.user, name='Done', completed=True)
+        paused = Habit.objects.create(user=self.user, name='Paused', frequency='daily', active=False)
+        HabitCheckin.objects.create(habit=paused, date=self.today, completed=True)
+        rebuild_daily_completion([self.user.id])
+
+        context = build_statistics_context(self.user, today=self.today)
+
+        self.assertEqual(context['total_goals'], 2)
+        self.assertEqual(context['completed_goals'], 1)
+        self.assertEqual(context['active_goals'], 1)
+        self.assertEqual(context['average_goal_progress'], 75.0)
+        self.assertEqual(context['total_habits'], 3)
+        self.assertEqual(context['active_habits'], 2)
+        self.assertEqual(context['completed_today'], 2)
+        self.assertEqual(context['today_completion_percent'], 100.0)
+        self.assertEqual(context['avg_habit_completion'], 10.0)
+        self.assertEqual(context['recent_checkins'], 7)
+
+        chart = json.loads(context['habits_chart_data'])
+        self.assertEqual(len(chart), 30)
+        self.assertEqual(chart[-1]['completed'], 3)
+        self.assertEqual(chart[0]['completed'], 0)
+        self.assertEqual(json.loads(context['goals_chart_data'])[0]['progress'], 50)
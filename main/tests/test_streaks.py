@@ -0,0 +1,328 @@
+"""
+Тести для інкрементального рушія streak
+"""
+import calendar
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest.mock import patch
+from main.models import Habit, HabitCheckin, HabitPeriodRun, HabitStreakRun
+from main.streaks import (
+    record_checkin, record_checkins, rebuild_habit_streak, build_runs, refresh_habit_completion_counts,
+    broken_streak_filter,
+)
+from main.tasks import refresh_habit_completion_counts as refresh_counts_task
+
+
+class StreakEngineTest(TestCase):
+    """Тести для record_checkin та перебудови серій"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.habit = Habit.objects.create(
+            user=self.user,
+            name='Reading',
+            frequency='daily'
+        )
+        self.today = timezone.localdate()
+
+    def day(self, offset):
+        return self.today - timedelta(days=offset)
+
+    def check(self, offset, completed=True):
+        record_checkin(self.habit, self.day(offset), completed)
+        self.habit.refresh_from_db()
+
+    def test_consecutive_days_extend_run(self):
+        """Тест що послідовні дні подовжують одну серію"""
+        for offset in (2, 1, 0):
+            self.check(offset)
+
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.habit).count(), 1)
+        self.assertEqual(self.habit.streak_days, 3)
+        self.assertEqual(self.habit.max_streak_days, 3)
+        self.assertEqual(self.habit.last_checkin, self.today)
+
+    def test_backdated_checkin_merges_runs(self):
+        """Тест що чекін заднім числом зливає дві серії"""
+        for offset in (4, 3, 1, 0):
+            self.check(offset)
+        self.assertEqual(self.habit.streak_days, 2)
+
+        self.check(2)
+
+        runs = HabitStreakRun.objects.filter(habit=self.habit)
+        self.assertEqual(runs.count(), 1)
+        self.assertEqual(runs.first().start_date, self.day(4))
+        self.assertEqual(self.habit.streak_days, 5)
+        self.assertEqual(self.habit.last_checkin, self.today)
+
+    def test_uncheck_middle_splits_run(self):
+        """Тест що скасування дня посередині розбиває серію"""
+        for offset in (4, 3, 2, 1, 0):
+            self.check(offset)
+
+        self.check(2, completed=False)
+
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.habit).count(), 2)
+        self.assertEqual(self.habit.streak_days, 2)
+        self.assertEqual(self.habit.max_streak_days, 2)
+        self.assertEqual(self.habit.last_checkin, self.today)
+
+    def test_uncheck_latest_moves_last_checkin_back(self):
+        """Тест що скасування останнього дня повертає попередню серію"""
+        for offset in (5, 4, 0):
+            self.check(offset)
+
+        self.check(0, completed=False)
+
+        self.assertEqual(self.habit.last_checkin, self.day(4))
+        self.assertEqual(self.habit.streak_days, 2)
+
+        self.check(4, completed=False)
+        self.check(5, completed=False)
+        self.assertIsNone(self.habit.last_checkin)
+        self.assertEqual(self.habit.streak_days, 0)
+
+    def test_repeated_checkin_is_idempotent(self):
+        """Тест що повторний чекін того самого дня нічого не змінює"""
+        self.check(0)
+        self.check(0)
+        self.check(3, completed=False)
+
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.habit).count(), 1)
+        self.assertEqual(self.habit.streak_days, 1)
+
+    def test_rebuild_matches_checkins(self):
+        """Тест перебудови серій з таблиці HabitCheckin"""
+        for offset in (10, 9, 8, 5, 1, 0):
+            HabitCheckin.objects.create(habit=self.habit, date=self.day(offset), completed=True)
+        HabitCheckin.objects.create(habit=self.habit, date=self.day(2), completed=False)
+
+        rebuild_habit_streak(self.habit)
+        self.habit.refresh_from_db()
+
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.habit).count(), 3)
+        self.assertEqual(self.habit.streak_days, 2)
+        self.assertEqual(self.habit.max_streak_days, 3)
+
+    def test_record_checkins_small_and_large_batches(self):
+        """Тест що пакетні зміни дають ті самі серії, що й по одній"""
+        for offset in (5, 4, 3):
+            self.check(offset)
+
+        # Мала партія застосовується інкрементально
+        HabitCheckin.objects.create(habit=self.habit, date=self.day(2), completed=True)
+        record_checkins(self.habit, [(self.day(2), True), (self.day(4), False)])
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.streak_days, 2)
+        self.assertEqual(self.habit.max_streak_days, 2)
+
+        # Велика партія перебудовується з HabitCheckin
+        changes = [(self.day(offset), True) for offset in range(10, 0, -1)]
+        for day, completed in changes:
+            HabitCheckin.objects.update_or_create(habit=self.habit, date=day, defaults={'completed': completed})
+        record_checkins(self.habit, changes)
+        self.habit.refresh_from_db()
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.habit).count(), 1)
+        self.assertEqual(self.habit.streak_days, 10)
+        self.assertEqual(self.habit.last_checkin, self.day(1))
+
+    def test_build_runs(self):
+        """Тест групування дат у відрізки"""
+        dates = [self.day(o) for o in (6, 5, 3, 2, 1)]
+        self.assertEqual(build_runs(dates), [
+            [self.day(6), self.day(5)],
+            [self.day(3), self.day(1)],
+        ])
+
+    def test_rebuild_streaks_command(self):
+        """Тест команди rebuild_streaks"""
+        HabitCheckin.objects.create(habit=self.habit, date=self.today, completed=True)
+        out = StringIO()
+
+        call_command('rebuild_streaks', stdout=out)
+
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.streak_days, 1)
+        self.assertIn('1 habits', out.getvalue())
+
+
+class HabitCountersTest(TestCase):
+    """Тести для лічильників completed_checkins, completed_30_days та first_checkin"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.habit = Habit.objects.create(user=self.user, name='Reading', frequency='daily')
+        self.today = timezone.localdate()
+
+    def day(self, offset):
+        return self.today - timedelta(days=offset)
+
+    def check(self, offset, completed=True):
+        HabitCheckin.objects.update_or_create(habit=self.habit, date=self.day(offset), defaults={'completed': completed})
+        record_checkin(self.habit, self.day(offset), completed)
+
+    def counters(self):
+        self.habit.refresh_from_db()
+        return self.habit.completed_checkins, self.habit.completed_30_days, self.habit.first_checkin
+
+    def test_checkins_maintain_counters(self):
+        """Тест що чекіни в межах та поза 30-денним вікном оновлюють лічильники"""
+        for offset in (0, 1, 30, 31, 45):
+            self.check(offset)
+        self.check(0)
+
+        self.assertEqual(self.counters(), (5, 3, self.day(45)))
+        self.assertEqual(self.habit.completion_rate, 10)
+
+        self.check(45, completed=False)
+        self.check(1, completed=False)
+        self.check(1, completed=False)
+
+        self.assertEqual(self.counters(), (3, 2, self.day(31)))
+
+    def test_batches_match_rebuild(self):
+        """Тест що пакетні зміни дають ті самі лічильники, що й перебудова"""
+        self.check(3)
+        changes = [(self.day(offset), True) for offset in (3, 2, 40)]
+        for day, completed in changes:
+            HabitCheckin.objects.update_or_create(habit=self.habit, date=day, defaults={'completed': completed})
+        record_checkins(self.habit, changes)
+        small = self.counters()
+
+        changes = [(self.day(offset), offset % 2 == 0) for offset in range(10)]
+        for day, completed in changes:
+            HabitCheckin.objects.update_or_create(habit=self.habit, date=day, defaults={'completed': completed})
+        record_checkins(self.habit, changes)
+        large = self.counters()
+
+        rebuild_habit_streak(self.habit)
+
+        self.assertEqual(small, (3, 2, self.day(40)))
+        self.assertEqual(large, self.counters())
+        self.assertEqual(large, (6, 5, self.day(40)))
+
+    def test_nightly_refresh_moves_window(self):
+        """Тест що нічне оновлення зсуває вікно completed_30_days"""
+        for offset in (0, 10, 25):
+            self.check(offset)
+
+        self.assertEqual(refresh_habit_completion_counts(today=self.today + timedelta(days=10)), 1)
+        self.assertEqual(self.counters(), (3, 2, self.day(25)))
+
+        Habit.objects.filter(pk=self.habit.pk).update(completed_30_days=0)
+        # Задача оновлює лише пояси, де зараз 00:10
+        day_start = timezone.make_aware(datetime.combine(self.today, time(0, 10)))
+        with patch('main.tasks.timezone.now', return_value=day_start):
+            refresh_counts_task()
+        self.assertEqual(self.counters()[1], 3)
+
+    def test_checkin_response_reads_counters(self):
+        """Тест що статистика відповіді чекіну рахується з лічильників без count()"""
+        import json
+        from django.urls import reverse
+
+        self.client.login(username='testuser', password='testpass123')
+        self.check(1)
+        response = self.client.post(
+            reverse('habit_checkin'),
+            data=json.dumps({'habit_id': self.habit.id, 'checked': True}),
+            content_type='application/json'
+        )
+
+        # Чекін заднім числом до створення звички розширює період, тож не більше 100%
+        self.assertEqual(response.json()['stats']['completion_rate'], 100)
+        self.assertEqual(self.counters(), (2, 2, self.day(1)))
+
+
+class PeriodStreakTest(TestCase):
+    """Тести для streak weekly та monthly звичок у періодах"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.weekly = Habit.objects.create(user=self.user, name='Gym', frequency='weekly')
+        self.monthly = Habit.objects.create(user=self.user, name='Budget', frequency='monthly')
+        self.today = timezone.localdate()
+        # Понеділок поточного тижня
+        self.monday = self.today - timedelta(days=self.today.weekday())
+
+    def week(self, offset, weekday=0):
+        return self.monday - timedelta(weeks=offset) + timedelta(days=weekday)
+
+    def check(self, habit, day, completed=True):
+        record_checkin(habit, day, completed)
+        habit.refresh_from_db()
+
+    def test_one_checkin_per_week_keeps_streak(self):
+        """Тест що по одному чекіну на тиждень дає streak у тижнях"""
+        for offset, weekday in ((2, 4), (1, 0), (0, 0)):
+            self.check(self.weekly, self.week(offset, weekday))
+
+        self.assertEqual(self.weekly.streak_days, 3)
+        self.assertEqual(self.weekly.current_streak, 3)
+        self.assertEqual(self.weekly.streak_unit, 'week')
+        self.assertEqual(self.weekly.last_checkin, self.week(0))
+        # Серії днів не злиті, лічильник днів окремий від streak
+        self.assertEqual(HabitStreakRun.objects.filter(habit=self.weekly).count(), 3)
+        self.assertEqual(self.weekly.completed_checkins, 3)
+
+    def test_uncheck_keeps_week_with_other_day(self):
+        """Тест що скасування одного з днів тижня не обриває тиждень"""
+        self.check(self.weekly, self.week(1, 1))
+        self.check(self.weekly, self.week(1, 3))
+        self.check(self.weekly, self.week(0))
+
+        self.check(self.weekly, self.week(1, 1), completed=False)
+        self.assertEqual(self.weekly.streak_days, 2)
+
+        self.check(self.weekly, self.week(1, 3), completed=False)
+        self.assertEqual(self.weekly.streak_days, 1)
+        self.assertEqual(HabitPeriodRun.objects.filter(habit=self.weekly).count(), 1)
+
+    def test_backdated_week_merges_runs(self):
+        """Тест що чекін за пропущений тиждень зливає серії тижнів"""
+        self.check(self.weekly, self.week(3, 6))
+        self.check(self.weekly, self.week(1, 2))
+        self.check(self.weekly, self.week(0, 1))
+        self.assertEqual(self.weekly.streak_days, 2)
+
+        self.check(self.weekly, self.week(2, 5))
+
+        run = HabitPeriodRun.objects.get(habit=self.weekly)
+        self.assertEqual((run.start_date, run.end_date, run.length), (self.week(3), self.week(0, 6), 4))
+        self.assertEqual(self.weekly.streak_days, 4)
+        self.assertEqual(self.weekly.max_streak_days, 4)
+
+    def test_monthly_streak_and_rebuild(self):
+        """Тест streak у місяцях та перебудови з HabitCheckin"""
+        first = self.today.replace(day=1)
+        previous = (first - timedelta(days=1)).replace(day=15)
+        for day in (previous, first):
+            HabitCheckin.objects.create(habit=self.monthly, date=day, completed=True)
+
+        rebuild_habit_streak(self.monthly)
+        self.monthly.refresh_from_db()
+
+        self.assertEqual(self.monthly.streak_days, 2)
+        self.assertEqual(self.monthly.current_streak, 2)
+        self.assertEqual(self.monthly.streak_unit, 'month')
+        month_end = self.today.replace(day=calendar.monthrange(self.today.year, self.today.month)[1])
+        self.assertEqual(build_runs([previous, first], 'monthly'), [[previous.replace(day=1), month_end]])
+
+    def test_streak_alive_until_period_missed(self):
+        """Тест що streak живий, поки не пропущено цілий період"""
+        self.check(self.weekly, self.week(1, 0))
+        self.assertEqual(self.weekly.current_streak, 1)
+        self.assertFalse(Habit.objects.filter(pk=self.weekly.pk).filter(broken_streak_filter(self.today)).exists())
+
+        self.check(self.weekly, self.week(1, 0), completed=False)
+        self.check(self.weekly, self.week(2, 6))
+        self.assertEqual(self.weekly.current_streak, 0)
+        self.assertTrue(Habit.objects.filter(pk=self.weekly.pk).filter(broken_streak_filter(self.today)).exists())
@@ -8,13 +8,16 @@ from datetime import timedelta
 from unittest.mock import patch, MagicMock
 from main.models import (
     Habit, HabitCheckin, TelegramProfile, 
-    Notification, UserActivity
+    Notification
 )
 from main.tasks import (
     generate_habit_notifications,
     check_and_notify_broken_streaks,
-    reset_daily_activity,
-    cleanup_expired_password_resets
+    cleanup_expired_password_resets,
+    iter_users_with_incomplete_habits,
+    create_notifications_in_batches,
+    deliver_notifications,
+    check_broken_streaks_chunk
 )
 
 
@@ -43,56 +46,147 @@ class GenerateHabitNotificationsTest(TestCase):
             frequency='daily',
             active=True,
             streak_days=5,
-            last_checkin=timezone.now().date() - timedelta(days=1)
+            last_checkin=timezone.localdate() - timedelta(days=1)
         )
     
+    def at(self, hour, minute=0):
+        """Aware момент 15.01.2026 за київським часом (зима, UTC+2)"""
+        from datetime import datetime
+        from zoneinfo import ZoneInfo
+        return datetime(2026, 1, 15, hour, minute, tzinfo=ZoneInfo('Europe/Kyiv'))
+    
+    @patch('main.tasks.dispatch_notification_delivery')
     @patch('main.tasks.timezone.now')
-    def test_generate_notifications_at_22_00(self, mock_now):
+    def test_generate_notifications_at_22_00(self, mock_now, mock_dispatch):
         """Тест генерації сповіщень о 22:00 (2 години до кінця дня)"""
-        # Встановлюємо час 22:00
-        test_time = timezone.now().replace(hour=22, minute=0, second=0)
-        mock_now.return_value = test_time
+        mock_now.return_value = self.at(22)
         
-        result = generate_habit_notifications()
+        generate_habit_notifications()
         
         # Перевіряємо що сповіщення створено
         notifications = Notification.objects.filter(
             user=self.user,
             notification_type='streak_reminder'
         )
-        self.assertGreater(notifications.count(), 0)
+        self.assertEqual(notifications.count(), 1)
+        self.assertIn('2 hours', notifications.first().message)
     
     @patch('main.tasks.timezone.now')
-    def test_no_notifications_outside_active_period(self, mock_now):
-        """Тест що сповіщення не генеруються поза активним періодом"""
-        # Встановлюємо час 15:00
-        test_time = timezone.now().replace(hour=15, minute=0, second=0)
-        mock_now.return_value = test_time
-        
-        result = generate_habit_notifications()
-        
-        self.assertEqual(result, "Outside active period")
+    def test_no_notifications_outside_reminder_marks(self, mock_now):
+        """Тест що сповіщення не генеруються поза позначками нагадувань"""
+        for moment in (self.at(15), self.at(22, 1), self.at(0, 5)):
+            mock_now.return_value = moment
+            
+            with self.assertNumQueries(1):
+                result = generate_habit_notifications()
+            
+            self.assertEqual(result, "No reminder scheduled for current time")
+        self.assertFalse(Notification.objects.exists())
     
-    def test_no_notifications_for_completed_habits(self):
+    @patch('main.tasks.dispatch_notification_delivery')
+    def test_no_notifications_for_completed_habits(self, mock_dispatch):
         """Тест що сповіщення не надсилаються для виконаних звичок"""
-        # Відмічаємо звичку як виконану сьогодні
-        today = timezone.now().date()
+        # Відмічаємо звичку як виконану в локальний день нагадування
         HabitCheckin.objects.create(
             habit=self.habit,
-            date=today,
+            date=self.at(22).date(),
             completed=True
         )
         
-        with patch('main.tasks.timezone.now') as mock_now:
-            test_time = timezone.now().replace(hour=22, minute=0, second=0)
-            mock_now.return_value = test_time
-            
-            initial_count = Notification.objects.count()
+        with patch('main.tasks.timezone.now', return_value=self.at(22)):
             generate_habit_notifications()
-            final_count = Notification.objects.count()
-            
-            # Сповіщення не має бути створено
-            self.assertEqual(initial_count, final_count)
+        
+        # Сповіщення не має бути створено
+        self.assertFalse(Notification.objects.exists())
+
+
+class BatchedHabitNotificationsTest(TestCase):
+    """Тести для пакетної генерації нагадувань"""
+    
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        # 21:00 UTC взимку = 23:00 за Києвом, тобто нагадування "1 hour"
+        self.now = datetime(2026, 1, 15, 21, 0, tzinfo=dt_timezone.utc)
+        self.today = self.now.date()
+        self.users = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'user{i}', password='testpass123')
+            TelegramProfile.objects.create(
+                user=user,
+                telegram_id=str(1000 + i),
+                connected=True,
+                notifications_enabled=(i != 2)
+            )
+            self.users.append(user)
+    
+    def add_habits(self, user, count, checked=0):
+        for i in range(count):
+            habit = Habit.objects.create(user=user, name=f'Habit {i}', frequency='daily', active=True)
+            if i < checked:
+                HabitCheckin.objects.create(habit=habit, date=self.today, completed=True)
+    
+    def test_incomplete_habits_single_query(self):
+        """Тест що пошук невиконаних звичок робить один запит незалежно від обсягу"""
+        self.add_habits(self.users[0], 2, checked=1)
+        self.add_habits(self.users[1], 2, checked=2)
+        
+        with self.assertNumQueries(1):
+            result = [(u.username, len(h), getattr(u, 'telegram_profile').telegram_id)
+                      for u, h in iter_users_with_incomplete_habits(self.today)]
+        self.assertEqual(result, [('user0', 1, '1000')])
+        
+        self.add_habits(self.users[1], 5)
+        self.add_habits(self.users[2], 5)
+        with self.assertNumQueries(1):
+            result = list(iter_users_with_incomplete_habits(self.today))
+        self.assertEqual(len(result), 3)
+    
+    def test_create_notifications_in_batches(self):
+        """Тест що повідомлення записуються пачками"""
+        notifications = [
+            Notification(user=self.users[0], message=f'Message {i}', notification_type='streak_reminder')
+            for i in range(5)
+        ]
+        with self.assertNumQueries(3):
+            ids = create_notifications_in_batches(notifications, batch_size=2)
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(Notification.objects.filter(id__in=ids).count(), 5)
+    
+    @patch('main.tasks.dispatch_notification_delivery')
+    @patch('main.tasks.timezone.now')
+    def test_generate_creates_one_notification_per_user(self, mock_now, mock_dispatch):
+        """Тест що генерація створює одне повідомлення на користувача та розсилає їх"""
+        mock_now.return_value = self.now
+        for user in self.users:
+            self.add_habits(user, 2)
+        
+        result = generate_habit_notifications()
+        
+        notifications = Notification.objects.filter(notification_type='streak_reminder')
+        self.assertEqual(notifications.count(), 3)
+        self.assertIn('1 hour', notifications.first().message)
+        self.assertEqual(notifications.filter(send_telegram=True).count(), 2)
+        self.assertTrue(result.startswith('Sent 3 notifications'))
+        mock_dispatch.assert_called_once()
+        self.assertEqual(sorted(mock_dispatch.call_args[0][0]), sorted(n.id for n in notifications))
+    
+    @patch('main.tasks.send_telegram_batch.delay')
+    @patch('main.notification.send_web_notification')
+    def test_deliver_notifications(self, mock_web, mock_telegram):
+        """Тест доставки пачки повідомлень"""
+        web_only = Notification.objects.create(user=self.users[0], message='Web', send_telegram=False)
+        both = Notification.objects.create(user=self.users[1], message='Both', send_telegram=True)
+        
+        deliver_notifications([web_only.id, both.id])
+        
+        self.assertEqual(mock_web.call_count, 2)
+        mock_telegram.assert_called_once_with([both.id])
+        web_only.refresh_from_db()
+        both.refresh_from_db()
+        self.assertTrue(web_only.web_sent)
+        self.assertFalse(web_only.telegram_sent)
+        # telegram_sent встановлюється лише після реальної доставки
+        self.assertFalse(both.telegram_sent)
 
 
 class CheckAndNotifyBrokenStreaksTest(TestCase):
@@ -111,6 +205,21 @@ class CheckAndNotifyBrokenStreaksTest(TestCase):
             connected=True,
             notifications_enabled=True
         )
+        
+        # Координатор запускає chord - виконуємо його синхронно без доставки
+        from TaskForge.celery import app
+        self.addCleanup(setattr, app.conf, 'task_always_eager', app.conf.task_always_eager)
+        app.conf.task_always_eager = True
+        patcher = patch('main.tasks.dispatch_notification_delivery')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        # Координатор обробляє пояси, де зараз 00:05: запускаємо на початку поточного дня
+        from datetime import datetime, time
+        day_start = timezone.make_aware(datetime.combine(timezone.localdate(), time(0, 5)))
+        now_patcher = patch('main.tasks.timezone.now', return_value=day_start)
+        now_patcher.start()
+        self.addCleanup(now_patcher.stop)
     
     def test_notify_broken_streak(self):
         """Тест сповіщення про обірваний streak"""
@@ -121,7 +230,7 @@ class CheckAndNotifyBrokenStreaksTest(TestCase):
             frequency='daily',
             active=True,
             streak_days=10,
-            last_checkin=timezone.now().date() - timedelta(days=3)  # 3 дні тому
+            last_checkin=timezone.localdate() - timedelta(days=3)  # 3 дні тому
         )
         
         check_and_notify_broken_streaks()
@@ -145,7 +254,7 @@ class CheckAndNotifyBrokenStreaksTest(TestCase):
             frequency='daily',
             active=True,
             streak_days=5,
-            last_checkin=timezone.now().date()  # Сьогодні
+            last_checkin=timezone.localdate()  # Сьогодні
         )
         
         initial_count = Notification.objects.count()
@@ -155,48 +264,73 @@ class CheckAndNotifyBrokenStreaksTest(TestCase):
         # Сповіщення не має бути створено
         self.assertEqual(initial_count, final_count)
 
+    def test_weekly_streak_broken_only_after_missed_week(self):
+        """Тест що weekly звичка з чекіном минулого тижня не вважається обірваною"""
+        today = timezone.localdate()
+        monday = today - timedelta(days=today.weekday())
+        Habit.objects.create(
+            user=self.user, name='Gym', frequency='weekly',
+            streak_days=3, last_checkin=monday - timedelta(days=7)
+        )
 
-class ResetDailyActivityTest(TestCase):
-    """Тести для задачі скидання щотижневої активності"""
-    
-    def setUp(self):
-        self.user = User.objects.create_user(
-            username='testuser',
-            email='test@example.com',
-            password='testpass123'
+        check_and_notify_broken_streaks()
+        self.assertFalse(Notification.objects.filter(user=self.user).exists())
+
+        Habit.objects.create(
+            user=self.user, name='Swim', frequency='weekly',
+            streak_days=2, last_checkin=monday - timedelta(days=8)
         )
-        
-        from main.activity_tracker import get_monday_of_current_week
-        
-        # Створюємо старий запис активності
-        old_week = get_monday_of_current_week() - timedelta(days=7)
-        self.old_activity = UserActivity.objects.create(
-            user=self.user,
-            week_start=old_week,
-            activity_count=50
+        check_and_notify_broken_streaks()
+
+        notification = Notification.objects.get(user=self.user)
+        self.assertIn('2-week streak', notification.message)
+
+    def test_chunk_single_query_and_grouping(self):
+        """Тест що обробник пачки знаходить обірвані streak одним запитом"""
+        today = timezone.localdate()
+        other = User.objects.create_user(username='other', password='testpass123')
+        for user in (self.user, other):
+            for i in range(3):
+                Habit.objects.create(
+                    user=user,
+                    name=f'Habit {i}',
+                    frequency='daily',
+                    streak_days=4,
+                    last_checkin=today - timedelta(days=3)
+                )
+        Habit.objects.create(
+            user=other, name='Intact', frequency='daily',
+            streak_days=2, last_checkin=today - timedelta(days=1)
         )
-    
-    def test_reset_old_activity(self):
-        """Тест скидання старої активності"""
-        reset_daily_activity()
         
-        self.old_activity.refresh_from_db()
-        self.assertEqual(self.old_activity.activity_count, 0)
-    
-    def test_keep_current_week_activity(self):
-        """Тест що поточний тиждень не скидається"""
-        from main.activity_tracker import get_monday_of_current_week
+        # 1 запит на звички + 1 bulk insert
+        with self.assertNumQueries(2):
+            created = check_broken_streaks_chunk([self.user.id, other.id], today.isoformat())
         
-        current_activity = UserActivity.objects.create(
-            user=self.user,
-            week_start=get_monday_of_current_week(),
-            activity_count=25
-        )
+        self.assertEqual(created, 2)
+        notification = Notification.objects.get(user=other)
+        self.assertIn('3 habits', notification.message)
+        self.assertFalse(notification.send_telegram)
+        self.assertTrue(Notification.objects.get(user=self.user).send_telegram)
+    
+    def test_coordinator_splits_users_into_chunks(self):
+        """Тест що координатор ділить користувачів на пачки"""
+        today = timezone.localdate()
+        for i in range(5):
+            user = User.objects.create_user(username=f'chunk{i}', password='testpass123')
+            Habit.objects.create(
+                user=user, name='Habit', frequency='daily',
+                streak_days=3, last_checkin=today - timedelta(days=5)
+            )
         
-        reset_daily_activity()
+        with patch('main.tasks.BROKEN_STREAK_CHUNK_SIZE', 2), \
+                patch('main.tasks.check_broken_streaks_chunk.run',
+                      wraps=check_broken_streaks_chunk.run) as chunk_run:
+            result = check_and_notify_broken_streaks()
         
-        current_activity.refresh_from_db()
-        self.assertEqual(current_activity.activity_count, 25)
+        self.assertEqual(result, 'Dispatched 3 chunks (5 users)')
+        self.assertEqual(chunk_run.call_count, 3)
+        self.assertEqual(Notification.objects.count(), 5)
 
 
 class CleanupExpiredPasswordResetsTest(TestCase):
@@ -0,0 +1,106 @@
+"""
+Тести для спільного Telegram-клієнта (на локальній заглушці Bot API)
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from unittest.mock import patch
+from main.models import TelegramProfile, Notification
+from main.notification import send_telegram_notification
+from main.tasks import send_telegram_batch
+from main.telegram_client import TelegramClient, get_telegram_client, close_telegram_client
+from main.telegram_stub import StubTelegramServer
+
+
+TOKEN = '123456:test'
+
+
+class TelegramClientTest(TestCase):
+    """Тести для TelegramClient"""
+
+    def setUp(self):
+        self.stub = StubTelegramServer().start()
+        self.addCleanup(self.stub.stop)
+        self.client = TelegramClient(TOKEN, base_url=self.stub.base_url)
+        self.addCleanup(self.client.close)
+
+    def test_send_message(self):
+        """Тест надсилання одного повідомлення"""
+        message = self.client.send_message(chat_id=42, text='Hello')
+
+        self.assertEqual(message.chat.id, 42)
+        self.assertEqual(self.stub.requests, [('sendMessage', {'chat_id': '42', 'text': 'Hello'})])
+
+    def test_connection_reused_between_sends(self):
+        """Тест що послідовні повідомлення йдуть через одне з'єднання"""
+        for i in range(5):
+            self.client.send_message(chat_id=i, text='Hello')
+
+        self.assertEqual(len(self.stub.requests), 5)
+        self.assertEqual(len(self.stub.connections), 1)
+
+    def test_send_batch(self):
+        """Тест пакетного надсилання з помилкою в одному повідомленні"""
+        self.stub.set_response('sendMessage', lambda params: (
+            (400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'})
+            if params['chat_id'] == '3' else
+            (200, {'ok': True, 'result': {
+                'message_id': 1, 'date': 0,
+                'chat': {'id': int(params['chat_id']), 'type': 'private'}, 'text': params['text'],
+            }})
+        ))
+
+        results = self.client.send_batch([{'chat_id': i, 'text': 'Hi'} for i in range(5)])
+
+        self.assertEqual(len(results), 5)
+        self.assertIsInstance(results[3], Exception)
+        self.assertEqual([r.chat.id for i, r in enumerate(results) if i != 3], [0, 1, 2, 4])
+        self.assertLessEqual(len(self.stub.connections), self.client.batch_concurrency)
+
+
+class SharedTelegramClientTest(TestCase):
+    """Тести для клієнта процесу та точок надсилання"""
+
+    def setUp(self):
+        self.stub = StubTelegramServer().start()
+        self.addCleanup(self.stub.stop)
+
+        settings_override = override_settings(TELEGRAM_BOT_TOKEN=TOKEN, TELEGRAM_API_BASE_URL=self.stub.base_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        close_telegram_client()
+        self.addCleanup(close_telegram_client)
+
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        TelegramProfile.objects.create(
+            user=self.user,
+            telegram_id='555',
+            connected=True,
+            notifications_enabled=True
+        )
+
+    def test_client_is_shared(self):
+        """Тест що клієнт створюється один раз на процес"""
+        self.assertIs(get_telegram_client(), get_telegram_client())
+
+    def test_send_telegram_notification_uses_shared_client(self):
+        """Тест що повідомлення йдуть через спільний пул з'єднань"""
+        send_telegram_notification(self.user, 'First')
+        send_telegram_notification(self.user, 'Second')
+
+        self.assertEqual(
+            [params['text'] for method, params in self.stub.requests],
+            ['First', 'Second']
+        )
+        self.assertEqual(len(self.stub.connections), 1)
+
+    @patch('builtins.print')
+    def test_send_telegram_batch_task(self, mock_print):
+        """Тест задачі пакетного надсилання повідомлень"""
+        other = User.objects.create_user(username='nouser', password='testpass123')
+        sent = Notification.objects.create(user=self.user, message='Reminder', send_telegram=True)
+        skipped = Notification.objects.create(user=other, message='No profile', send_telegram=True)
+
+        result = send_telegram_batch([sent.id, skipped.id])
+
+        self.assertEqual(result, 'Sent 1 telegram messages (0 failed, 0 deferred)')
+        self.assertEqual(self.stub.requests, [('sendMessage', {'chat_id': '555', 'text': 'Reminder'})])
@@ -0,0 +1,219 @@
+"""
+Тести для доставки Telegram-повідомлень з обмеженням швидкості
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from unittest.mock import patch
+from main.models import TelegramProfile, Notification
+from main.tasks import send_telegram_batch
+from main.telegram_client import TelegramClient, close_telegram_client
+from main.telegram_delivery import (
+    TokenBucket, TelegramRateLimiter, deliver_messages, get_delivery_metrics,
+    reset_delivery_metrics, SENT, RETRY, FAILED, MAX_TELEGRAM_ATTEMPTS
+)
+from main.telegram_stub import StubTelegramServer
+
+
+TOKEN = '123456:test'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def ok_response(params):
+    return 200, {'ok': True, 'result': {
+        'message_id': 1, 'date': 0,
+        'chat': {'id': int(params['chat_id']), 'type': 'private'}, 'text': params['text'],
+    }}
+
+
+def flood_then_ok(retry_after, failures=1):
+    """Перші failures запитів отримують 429, решта - успіх"""
+    calls = []
+
+    def responder(params):
+        calls.append(params)
+        if len(calls) <= failures:
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': f'Too Many Requests: retry after {retry_after}',
+                'parameters': {'retry_after': retry_after},
+            }
+        return ok_response(params)
+    return responder
+
+
+class RateLimiterTest(TestCase):
+    """Тести для TokenBucket та TelegramRateLimiter"""
+
+    def test_token_bucket_paces_after_burst(self):
+        """Тест що після вичерпання сплеску кожен токен коштує 1/rate секунд"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+
+        waits = []
+        for _ in range(4):
+            waits.append(bucket.wait_time())
+            bucket.consume()
+
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1)
+        self.assertAlmostEqual(waits[3], 0.2)
+
+        clock.now = 1.0
+        self.assertEqual(bucket.wait_time(), 0.0)
+
+    def test_per_chat_rate(self):
+        """Тест що повідомлення в один чат розносяться в часі, а в різні - ні"""
+        limiter = TelegramRateLimiter(global_rate=30, per_chat_rate=1, clock=FakeClock())
+
+        self.assertEqual(limiter.reserve('1'), 0.0)
+        self.assertEqual(limiter.reserve('2'), 0.0)
+        self.assertAlmostEqual(limiter.reserve('1'), 1.0)
+        self.assertAlmostEqual(limiter.reserve('1'), 2.0)
+
+    def test_reserve_respects_max_wait(self):
+        """Тест що занадто довге очікування не резервує слот"""
+        limiter = TelegramRateLimiter(global_rate=30, per_chat_rate=1, clock=FakeClock())
+        limiter.block(60)
+
+        self.assertIsNone(limiter.reserve('1', max_wait=5))
+        self.assertAlmostEqual(limiter.wait_time('1'), 60.0)
+
+
+class DeliverMessagesTest(TestCase):
+    """Тести для deliver_messages на заглушці Bot API"""
+
+    def setUp(self):
+        self.stub = StubTelegramServer().start()
+        self.addCleanup(self.stub.stop)
+        self.client = TelegramClient(TOKEN, base_url=self.stub.base_url)
+        self.addCleanup(self.client.close)
+        self.limiter = TelegramRateLimiter(global_rate=1000, per_chat_rate=1000)
+        reset_delivery_metrics()
+
+    def deliver(self, messages):
+        return deliver_messages(messages, client=self.client, limiter=self.limiter)
+
+    @patch('builtins.print')
+    def test_short_retry_after_is_waited_inline(self, mock_print):
+        """Тест повтору після 429 з коротким retry_after"""
+        self.stub.set_response('sendMessage', flood_then_ok(retry_after=1))
+
+        result, = self.deliver([{'chat_id': 1, 'text': 'Hi'}])
+
+        self.assertEqual(result.status, SENT)
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(get_delivery_metrics()['throttled'], 1)
+
+    @patch('builtins.print')
+    def test_long_retry_after_defers_message(self, mock_print):
+        """Тест що довгий retry_after повертає повідомлення на повтор"""
+        self.stub.set_response('sendMessage', flood_then_ok(retry_after=60))
+        self.client.batch_concurrency = 1
+
+        first, second = self.deliver([{'chat_id': 1, 'text': 'Hi'}, {'chat_id': 2, 'text': 'Hi'}])
+
+        self.assertEqual({first.status, second.status}, {RETRY})
+        self.assertGreater(max(first.retry_after, second.retry_after), 50)
+        # Після 429 решта пакета не надсилається, поки діє блокування
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_bad_request_is_permanent_failure(self):
+        """Тест що BadRequest не повторюється"""
+        self.stub.set_response('sendMessage', lambda params: (
+            400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'}
+        ))
+
+        result, = self.deliver([{'chat_id': 1, 'text': 'Hi'}])
+
+        self.assertEqual(result.status, FAILED)
+        self.assertIn('Chat not found', result.error)
+
+
+@override_settings(TELEGRAM_BOT_TOKEN=TOKEN)
+class SendTelegramBatchTest(TestCase):
+    """Тести для задачі send_telegram_batch"""
+
+    def setUp(self):
+        self.stub = StubTelegramServer().start()
+        self.addCleanup(self.stub.stop)
+
+        settings_override = override_settings(TELEGRAM_API_BASE_URL=self.stub.base_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        close_telegram_client()
+        self.addCleanup(close_telegram_client)
+
+        # Свіжий обмежувач на кожен виклик, щоб блокування 429 не переходило між спробами
+        limiter_patch = patch(
+            'main.telegram_delivery.get_rate_limiter',
+            side_effect=lambda: TelegramRateLimiter(global_rate=1000, per_chat_rate=1000)
+        )
+        limiter_patch.start()
+        self.addCleanup(limiter_patch.stop)
+        print_patch = patch('builtins.print')
+        print_patch.start()
+        self.addCleanup(print_patch.stop)
+        reset_delivery_metrics()
+
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        TelegramProfile.objects.create(
+            user=self.user,
+            telegram_id='555',
+            connected=True,
+            notifications_enabled=True
+        )
+        self.notification = Notification.objects.create(
+            user=self.user, message='Reminder', send_telegram=True
+        )
+
+    def test_sent_only_after_success(self):
+        """Тест що telegram_sent встановлюється після відповіді Telegram"""
+        send_telegram_batch([self.notification.id])
+
+        self.notification.refresh_from_db()
+        self.assertTrue(self.notification.telegram_sent)
+        self.assertEqual(self.notification.telegram_attempts, 1)
+
+        metrics = get_delivery_metrics()
+        self.assertEqual(metrics['sent'], 1)
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    def test_retry_after_flood_control(self):
+        """Тест повтору задачі після 429 з довгим retry_after"""
+        self.stub.set_response('sendMessage', flood_then_ok(retry_after=60))
+
+        send_telegram_batch.apply(args=[[self.notification.id]])
+
+        self.notification.refresh_from_db()
+        self.assertTrue(self.notification.telegram_sent)
+        self.assertEqual(self.notification.telegram_attempts, 2)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_permanent_failure_not_marked_sent(self):
+        """Тест що помилка доставки не позначає повідомлення надісланим"""
+        self.stub.set_response('sendMessage', lambda params: (
+            403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+        ))
+
+        result = send_telegram_batch([self.notification.id])
+
+        self.notification.refresh_from_db()
+        self.assertFalse(self.notification.telegram_sent)
+        self.assertEqual(self.notification.telegram_attempts, MAX_TELEGRAM_ATTEMPTS)
+        self.assertIn('blocked', self.notification.telegram_error)
+        self.assertIn('1 failed', result)
+        self.assertEqual(get_delivery_metrics()['queue_depth'], 0)
+
+    def test_queue_depth_counts_pending(self):
+        """Тест що глибина черги рахує недоставлені повідомлення"""
+        Notification.objects.create(user=self.user, message='Another', send_telegram=True)
+        Notification.objects.create(user=self.user, message='Web only', send_telegram=False)
+
+        self.assertEqual(get_delivery_metrics()['queue_depth'], 2)
@@ -0,0 +1,173 @@
+"""
+Тести для webhook-режиму Telegram-бота (записані оновлення POST-ом у ASGI-застосунок)
+"""
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from channels.testing import HttpCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase, override_settings
+from unittest.mock import patch
+
+from main.bot_dispatcher import ChatOrderedUpdateProcessor
+from main.models import Habit, TelegramProfile
+from main.telegram_stub import StubTelegramServer
+from main.telegram_webhook import WebhookDispatcher, check_webhook_secret
+from TaskForge.asgi import application as asgi_application
+
+
+TOKEN = '123456:test'
+SECRET = 'webhook-secret'
+
+
+def command_update(update_id, text, user_id=555):
+    """Оновлення у форматі, який Telegram надсилає на webhook для команди"""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1760000000,
+            'chat': {'id': user_id, 'type': 'private', 'first_name': 'Test'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}],
+        },
+    }
+
+
+@override_settings(TELEGRAM_WEBHOOK_ENABLED=True, TELEGRAM_WEBHOOK_SECRET=SECRET)
+class TelegramWebhookTest(TransactionTestCase):
+    """Тести для TelegramWebhookConsumer у TaskForge.asgi.application"""
+
+    def setUp(self):
+        cache.clear()
+        self.stub = StubTelegramServer().start()
+        self.addCleanup(self.stub.stop)
+
+        from main.telegram_bot import build_application
+        self.dispatcher = WebhookDispatcher(build_application(TOKEN, base_url=self.stub.base_url, concurrency=4))
+        dispatcher_patch = patch('main.telegram_webhook.get_webhook_dispatcher', return_value=self.dispatcher)
+        dispatcher_patch.start()
+        self.addCleanup(dispatcher_patch.stop)
+
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        TelegramProfile.objects.create(user=self.user, telegram_id='555', connected=True)
+        Habit.objects.create(user=self.user, name='Read', frequency='daily')
+
+    def post(self, payload, secret=SECRET, method='POST'):
+        async def scenario():
+            headers = [(b'content-type', b'application/json')]
+            if secret:
+                headers.append((b'x-telegram-bot-api-secret-token', secret.encode()))
+            communicator = HttpCommunicator(
+                asgi_application, method, '/telegram/webhook/',
+                body=json.dumps(payload).encode(), headers=headers
+            )
+            response = await communicator.get_response(timeout=10)
+            await self.dispatcher.shutdown()
+            return response
+
+        return async_to_sync(scenario)()
+
+    def sent_texts(self):
+        return [params['text'] for method, params in self.stub.requests if method == 'sendMessage']
+
+    def test_recorded_status_update_is_answered(self):
+        """Тест що оновлення /status обробляється тими ж обробниками, що й у polling"""
+        response = self.post(command_update(1, '/status'))
+
+        self.assertEqual(response['status'], 200)
+        texts = self.sent_texts()
+        self.assertEqual(len(texts), 1)
+        self.assertIn('⭕ Read', texts[0])
+        self.assertIn('Progress: 0/1', texts[0])
+
+    def test_wrong_secret_rejected(self):
+        """Тест що запит без секрету Telegram відхиляється"""
+        response = self.post(command_update(2, '/status'), secret='wrong')
+
+        self.assertEqual(response['status'], 403)
+        self.assertEqual(self.stub.requests, [])
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET='')
+    def test_missing_secret_refuses_updates(self):
+        """Тест що без налаштованого секрету жодне оновлення не приймається"""
+        response = self.post(command_update(4, '/reset_password'), secret=None)
+
+        self.assertEqual(response['status'], 403)
+        self.assertEqual(self.stub.requests, [])
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET='')
+    def test_missing_secret_fails_check_and_registration(self):
+        """Тест системної перевірки та команди set без секрету"""
+        self.assertEqual([error.id for error in check_webhook_secret(None)], ['main.E001'])
+        with override_settings(TELEGRAM_WEBHOOK_ENABLED=False):
+            self.assertEqual(check_webhook_secret(None), [])
+
+        with patch('main.management.commands.telegram_webhook.get_telegram_client') as client:
+            with self.assertRaises(CommandError):
+                call_command('telegram_webhook', 'set', '--url', 'https://example.com/telegram/webhook/')
+        client.return_value.run.assert_not_called()
+
+    def test_invalid_body_and_method(self):
+        """Тест відповіді на некоректне тіло та GET"""
+        self.assertEqual(self.post('not an update')['status'], 200)
+        self.assertEqual(self.post({}, method='GET')['status'], 405)
+
+    @override_settings(TELEGRAM_WEBHOOK_ENABLED=False)
+    def test_disabled_webhook_not_found(self):
+        """Тест що без TELEGRAM_WEBHOOK_ENABLED маршрут недоступний"""
+        self.assertEqual(self.post(command_update(3, '/status'))['status'], 404)
+
+    def test_other_paths_served_by_django(self):
+        """Тест що решта HTTP-запитів іде в Django"""
+        async def scenario():
+            communicator = HttpCommunicator(asgi_application, 'GET', '/', headers=[(b'host', b'localhost')])
+            return await communicator.get_response(timeout=10)
+
+        self.assertEqual(async_to_sync(scenario)()['status'], 200)
+
+
+class WebhookDispatcherTest(TransactionTestCase):
+    """Тести для обмеженої паралельності WebhookDispatcher"""
+
+    def test_concurrency_is_bounded(self):
+        """Тест що одночасно обробляється не більше max_workers оновлень процесора"""
+        class SlowApplication:
+            bot = None
+
+            def __init__(self):
+                self.update_processor = ChatOrderedUpdateProcessor(max_workers=2)
+                self.active = 0
+                self.peak = 0
+                self.processed = []
+
+            async def initialize(self):
+                pass
+
+            async def shutdown(self):
+                pass
+
+            async def process_update(self, update):
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                await asyncio.sleep(0.05)
+                self.active -= 1
+                self.processed.append(update.update_id)
+
+        application = SlowApplication()
+        dispatcher = WebhookDispatcher(application)
+
+        async def scenario():
+            await asyncio.gather(*[
+                dispatcher.process(command_update(i, '/status', user_id=i)) for i in range(6)
+            ])
+
+        async_to_sync(scenario)()
+
+        self.assertEqual(application.peak, 2)
+        self.assertEqual(sorted(application.processed), list(range(6)))
@@ -0,0 +1,118 @@
+"""
+Тести для push-доставки результату 2FA (WebSocket та long-poll)
+"""
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
+
+from main import views
+from main.consumers import TwoFactorConsumer
+from main.models import Pending2FA
+from main.notification import publish_2fa_status
+
+
+class TwoFactorPushTest(TransactionTestCase):
+    """Тести для TwoFactorConsumer та wait_2fa_status"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.pending = Pending2FA.objects.create(user=self.user, telegram_id='555')
+
+        session = self.client.session
+        session['pending_2fa_id'] = self.pending.id
+        session.save()
+        self.async_client.cookies = self.client.cookies
+
+    async def connect(self, pending_id):
+        session = SessionStore()
+        if pending_id:
+            session['pending_2fa_id'] = pending_id
+        await database_sync_to_async(session.save)()
+
+        communicator = WebsocketCommunicator(TwoFactorConsumer.as_asgi(), '/ws/2fa/')
+        communicator.scope['session'] = session
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def test_websocket_receives_published_status(self):
+        """Тест що рішення з Telegram приходить у вікно входу через WebSocket"""
+        async def scenario():
+            communicator, connected = await self.connect(self.pending.id)
+            self.assertTrue(connected)
+            self.assertTrue(await communicator.receive_nothing())
+
+            await publish_2fa_status(self.pending.id, 'approved')
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': '2fa_status', 'status': 'approved'}
+            )
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_websocket_sends_status_decided_before_connect(self):
+        """Тест що рішення, прийняте до підключення, не губиться"""
+        Pending2FA.objects.filter(id=self.pending.id).update(declined=True)
+
+        async def scenario():
+            communicator, _ = await self.connect(self.pending.id)
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': '2fa_status', 'status': 'declined'}
+            )
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_websocket_without_pending_login_rejected(self):
+        """Тест що сесія без запиту входу не підключається"""
+        async def scenario():
+            communicator, connected = await self.connect(None)
+            self.assertFalse(connected)
+
+        async_to_sync(scenario)()
+
+    def test_long_poll_returns_published_status(self):
+        """Тест що long-poll повертає результат одразу після публікації"""
+        async def scenario():
+            async def approve_later():
+                await asyncio.sleep(0.2)
+                await publish_2fa_status(self.pending.id, 'approved')
+
+            response, _ = await asyncio.gather(
+                self.async_client.get('/api/wait_2fa_status/'),
+                approve_later()
+            )
+            self.assertEqual(response.json(), {'status': 'approved'})
+
+        async_to_sync(scenario)()
+
+    def test_long_poll_timeout_returns_pending(self):
+        """Тест що після таймауту long-poll повертає pending"""
+        async def scenario():
+            with patch.object(views, 'TWOFA_LONG_POLL_TIMEOUT', 0.1):
+                response = await self.async_client.get('/api/wait_2fa_status/')
+            self.assertEqual(response.json(), {'status': 'pending'})
+
+        async_to_sync(scenario)()
+
+    @patch('builtins.print')
+    def test_status_check_logs_in_with_single_lookup(self, mock_print):
+        """Тест що підтверджений запит завершує вхід одним запитом до Pending2FA"""
+        Pending2FA.objects.filter(id=self.pending.id).update(confirmed=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/check_2fa_status/', {'username': 'testuser'})
+
+        self.assertEqual(response.json()['status'], 'approved')
+        self.assertFalse(Pending2FA.objects.exists())
+        pending_queries = [q for q in ctx.captured_queries if 'SELECT' in q['sql'] and 'main_pending2fa' in q['sql']]
+        self.assertEqual(len(pending_queries), 1)
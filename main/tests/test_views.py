@@ -2,6 +2,8 @@
 Тести для views Django
 """
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
@@ -137,6 +139,23 @@ class HabitViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'pages/habits.html')
     
+    def test_habit_lists_query_count_constant(self):
+        """Тест що списки звичок не роблять запит на кожну звичку"""
+        def count_queries():
+            counts = []
+            for name in ('habits', 'home', 'get_user_habits', 'get_habits_stats', 'daily_habits_status'):
+                with CaptureQueriesContext(connection) as ctx:
+                    self.client.get(reverse(name))
+                counts.append(len(ctx.captured_queries))
+            return counts
+        
+        small = count_queries()
+        for i in range(5):
+            habit = Habit.objects.create(user=self.user, name=f'Habit {i}', frequency='daily')
+            HabitCheckin.objects.create(habit=habit, date=timezone.localdate(), completed=i % 2 == 0)
+        
+        self.assertEqual(count_queries(), small)
+    
     def test_create_habit(self):
         """Тест створення звички"""
         response = self.client.post(reverse('create_habit'), {
@@ -190,7 +209,7 @@ class HabitViewsTest(TestCase):
         self.assertTrue(data['checked'])
         
         # Перевіряємо що чекін створено
-        today = timezone.now().date()
+        today = timezone.localdate()
         self.assertTrue(
             HabitCheckin.objects.filter(
                 habit=self.habit,
@@ -237,7 +256,7 @@ class GoalViewsTest(TestCase):
             'name': 'New Goal',
             'description': 'New description',
             'category': 'education',
-            'due_date': (timezone.now().date() + timedelta(days=30)).isoformat()
+            'due_date': (timezone.localdate() + timedelta(days=30)).isoformat()
         })
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.content)
@@ -394,3 +413,55 @@ class NotificationViewsTest(TestCase):
             is_read=False
         ).count()
         self.assertEqual(unread_count, 0)
+
+
+class GoalProgressQueryCountTest(TestCase):
+    """Тести що сторінки з цілями не роблять запитів на кожну ціль"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+    
+    def add_goals(self, count):
+        for i in range(count):
+            goal = Goal.objects.create(user=self.user, name=f'Goal {i}')
+            SubGoal.objects.create(goal=goal, name='Step 1', completed=True)
+            SubGoal.objects.create(goal=goal, name='Step 2')
+            SubGoal.objects.create(goal=goal, name='Step 3')
+            SubGoal.objects.create(goal=goal, name='Step 4')
+    
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+    
+    def test_goals_page_query_count_constant(self):
+        """Тест що кількість запитів goals_page не залежить від кількості цілей"""
+        self.add_goals(1)
+        small = self.count_queries(reverse('goals'))
+        self.add_goals(49)
+        self.assertEqual(self.count_queries(reverse('goals')), small)
+    
+    def test_home_query_count_constant(self):
+        """Тест що кількість запитів home не залежить від кількості цілей"""
+        self.add_goals(1)
+        small = self.count_queries(reverse('home'))
+        self.add_goals(49)
+        self.assertEqual(self.count_queries(reverse('home')), small)
+    
+    def test_goal_progress(self):
+        """Тест API прогресу цілі"""
+        self.add_goals(1)
+        goal = Goal.objects.get(user=self.user)
+        response = self.client.get(reverse('goal_progress', args=[goal.id]))
+        data = json.loads(response.content)
+        self.assertEqual(data['total_subgoals'], 4)
+        self.assertEqual(data['completed_subgoals'], 1)
+        self.assertEqual(data['progress_percent'], 25)
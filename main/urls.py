@@ -22,11 +22,13 @@ urlpatterns = [
 	
 	# API для управління Telegram
 	path('api/tg_notify_toggle/', views.tg_notify_toggle, name='tg_notify_toggle'),
+	path('api/user-timezone/', views.set_user_timezone, name='set_user_timezone'),
    path('api/check_telegram/', views.check_telegram, name='check_telegram'),
    path('api/check_telegram_status/', views.check_telegram_status, name='check_telegram_status'),
 	path('api/tg_2fa_toggle/', views.tg_2fa_toggle, name='tg_2fa_toggle'),
 	path("api/telegram_2fa_status/", views.telegram_2fa_status, name="telegram_2fa_status"),
 	path("api/check_2fa_status/", views.telegram_2fa_status, name="check_2fa_status"),
+	path("api/wait_2fa_status/", views.wait_2fa_status, name="wait_2fa_status"),
 	path("api/decline_2fa/", views.decline_2fa, name="decline_2fa"),
 	path("api/test_telegram_update/", views.test_telegram_update, name="test_telegram_update"),
 
@@ -51,6 +53,8 @@ urlpatterns = [
    path('api/delete-habit/', views.delete_habit, name='delete_habit'),
    path('api/toggle-habit-active/', views.toggle_habit_active, name='toggle_habit_active'),
    path('api/habit-checkin/', views.habit_checkin, name='habit_checkin'),
+   path('api/habit-checkin/bulk/', views.habit_checkin_bulk, name='habit_checkin_bulk'),
+   path('api/habit-history/<int:habit_id>/', views.habit_history, name='habit_history'),
    path('api/get-habits-stats/', views.get_habits_stats, name='get_habits_stats'),
    path('api/get-user-habits/', views.get_user_habits, name='get_user_habits'),
    path('api/daily-habits-status/', views.daily_habits_status, name='daily_habits_status'),
@@ -65,6 +69,9 @@ urlpatterns = [
    # API для технічної підтримки
    path('api/support/send-message/', views.send_support_message, name='send_support_message'),
    
+   # Метрики запитів для Prometheus
+   path('metrics/', views.prometheus_metrics, name='prometheus_metrics'),
+
    # Тестовый endpoint для WebSocket
    path('api/test-websocket/', views.test_websocket_notification, name='test_websocket_notification'),
 ]
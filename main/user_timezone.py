@@ -0,0 +1,64 @@
+"""
+Часовий пояс користувача для HTTP-запитів.
+
+Пояс з TelegramProfile.timezone (його надсилає браузер через
+set_user_timezone) зберігається в сесії при вході та при зміні, а
+UserTimezoneMiddleware активує його на час запиту. Тож timezone.localdate()
+у views - дата чекіна, "сьогодні" на сторінках, історія - рахується в тому ж
+поясі, що й local_date нагадувань (main.reminders), без запиту на кожен
+запит. Користувачі без профілю лишаються в поясі сервера (TIME_ZONE).
+"""
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.utils import timezone
+
+
+SESSION_KEY = 'user_timezone'
+
+
+def load_zone(name):
+    """ZoneInfo за назвою IANA або None, якщо пояс невідомий"""
+    if not isinstance(name, str) or not name:
+        return None
+    try:
+        # ZoneInfo кешує створені пояси, тож повторна перевірка майже безкоштовна
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def profile_timezone(user):
+    """Пояс з профілю користувача або пояс сервера"""
+    from .models import TelegramProfile
+
+    name = TelegramProfile.objects.filter(user=user).values_list('timezone', flat=True).first()
+    return name or settings.TIME_ZONE
+
+
+def remember_user_timezone(sender, request, user, **kwargs):
+    """Обробник user_logged_in: пояс профілю в сесію"""
+    request.session[SESSION_KEY] = profile_timezone(user)
+
+
+class UserTimezoneMiddleware:
+    """Активує часовий пояс користувача з сесії на час запиту"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        name = request.session.get(SESSION_KEY)
+        if name is None and request.user.is_authenticated:
+            # Сесії, відкриті до появи поясу в сесії: читаємо профіль один раз
+            name = request.session[SESSION_KEY] = profile_timezone(request.user)
+
+        zone = load_zone(name)
+        if zone is None:
+            return self.get_response(request)
+
+        timezone.activate(zone)
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()
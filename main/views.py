@@ -5,10 +5,15 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.conf import settings
 from django.views.decorators.cache import cache_page
-from django.core.cache import cache
 from .models import Notification, TelegramProfile, Pending2FA, SubGoal, Goal, Habit, HabitCheckin
 from .tasks import send_2fa_request
 from .activity_tracker import track_user_activity, get_user_weekly_activity
+from .streaks import record_checkin
+from .checkins import apply_checkins, parse_checkin_entries
+from .completion_rollup import get_completion_range, refresh_active_habit_count, refresh_daily_completion
+from .caching import get_user_cache, set_user_cache, invalidate_user_cache, HABITS_HISTORY_CACHE
+from .statistics_service import build_statistics_context
+from .notification import send_unread_count_delta, twofa_group_name
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_http_methods
@@ -70,17 +75,21 @@ def home(request):
         from .models import Goal, SubGoal, Habit, GoalTemplate, HabitTemplate
         
         # Отримуємо активні цілі з підцілями
-        user_goals = Goal.objects.filter(user=request.user, completed=False).prefetch_related('subgoals')
+        user_goals = list(
+            Goal.objects.filter(user=request.user, completed=False)
+            .with_progress()
+            .prefetch_related('subgoals')
+        )
         
         # Якщо у користувача немає своїх цілей, отримуємо шаблони цілей
-        if not user_goals.exists():
+        if not user_goals:
             template_goals = GoalTemplate.objects.all()[:3] 
         
-        # Отримання активних звичок користувача
-        user_habits = Habit.objects.filter(user=request.user, active=True)
+        # Отримання активних звичок користувача з відміткою за сьогодні
+        user_habits = list(Habit.objects.filter(user=request.user, active=True).with_checked_today())
         
         # Якщо у користувача немає своїх звичок, отримуємо шаблони звичок
-        if not user_habits.exists():
+        if not user_habits:
             template_habits = HabitTemplate.objects.all()[:3]  
     
     return render(request, 'pages/index.html', {
@@ -100,24 +109,26 @@ def goals_page(request):
     """Строрінка керування цілями користувача"""
     from .models import Goal, SubGoal, GoalTemplate
     
-    # Получаемо всі цілі користувача
-    user_goals = Goal.objects.filter(user=request.user).prefetch_related('subgoals').order_by('-created_at')
+    # Получаемо всі цілі користувача з анотованим прогресом
+    user_goals = list(
+        Goal.objects.filter(user=request.user)
+        .with_progress()
+        .prefetch_related('subgoals')
+        .order_by('-created_at')
+    )
 
     # Получаем шаблоны цілей для створення нових
     goal_templates = GoalTemplate.objects.all()
 
     # Статистика цілей
-    total_goals = user_goals.count()
-    completed_goals = user_goals.filter(completed=True).count()
-    active_goals = user_goals.filter(completed=False).count()
+    total_goals = len(user_goals)
+    completed_goals = sum(1 for goal in user_goals if goal.completed)
+    active_goals = total_goals - completed_goals
     
     # Прогресс всіх активних цілей
-    total_progress = 0
-    active_goals_with_subgoals = user_goals.filter(completed=False)
-    if active_goals_with_subgoals.exists():
-        for goal in active_goals_with_subgoals:
-            total_progress += goal.get_progress_percent()
-        average_progress = total_progress / active_goals_with_subgoals.count()
+    active_progress = [goal.progress_percent for goal in user_goals if not goal.completed]
+    if active_progress:
+        average_progress = sum(active_progress) / len(active_progress)
     else:
         average_progress = 0
 
@@ -137,25 +148,26 @@ def habits_page(request):
     from django.utils import timezone
     from datetime import datetime, timedelta
     
-    # Получаемо всі звички користувача
-    user_habits = Habit.objects.filter(user=request.user).order_by('-created_at')
+    # Получаемо всі звички користувача з відміткою за сьогодні (один запит)
+    today = timezone.localdate()
+    user_habits = list(
+        Habit.objects.filter(user=request.user)
+        .with_checked_today(today)
+        .with_window_completed(today)
+        .order_by('-created_at')
+    )
 
     # Отримуємо шаблони звичок для створення нових
     habit_templates = HabitTemplate.objects.all()
 
     # Статистика звичек
-    total_habits = user_habits.count()
-    active_habits = user_habits.filter(active=True).count()
+    active = [habit for habit in user_habits if habit.active]
+    total_habits = len(user_habits)
+    active_habits = len(active)
     
    # Звички, відзначені сьогодні
-    today = timezone.now().date()
-    completed_today = 0
-    current_streak = 0
-    
-    for habit in user_habits.filter(active=True):
-        if habit.is_checked_today():
-            completed_today += 1
-        current_streak = max(current_streak, habit.current_streak)
+    completed_today = sum(1 for habit in active if habit.is_checked_today())
+    current_streak = max((habit.current_streak for habit in active), default=0)
 
     return render(request, 'pages/habits.html', {
         'user_habits': user_habits,
@@ -174,23 +186,17 @@ def get_habits_stats(request):
     """API для отримання оновленої статистики звичок"""
     try:
         from .models import Habit
-        from django.utils import timezone
         
-        user_habits = Habit.objects.filter(user=request.user)
+        user_habits = list(Habit.objects.filter(user=request.user).with_checked_today())
+        active = [habit for habit in user_habits if habit.active]
         
         # Статистика звичок
-        total_habits = user_habits.count()
-        active_habits = user_habits.filter(active=True).count()
+        total_habits = len(user_habits)
+        active_habits = len(active)
         
         # Звички, відзначені сьогодні
-        today = timezone.now().date()
-        completed_today = 0
-        current_streak = 0
-        
-        for habit in user_habits.filter(active=True):
-            if habit.is_checked_today():
-                completed_today += 1
-            current_streak = max(current_streak, habit.current_streak)
+        completed_today = sum(1 for habit in active if habit.is_checked_today())
+        current_streak = max((habit.current_streak for habit in active), default=0)
         
         stats = {
             'total_habits': total_habits,
@@ -216,8 +222,13 @@ def get_user_habits(request):
         from .models import Habit
         from django.utils import timezone
         
-        user_habits = Habit.objects.filter(user=request.user).order_by('-created_at')
-        today = timezone.now().date()
+        today = timezone.localdate()
+        user_habits = (
+            Habit.objects.filter(user=request.user)
+            .with_checked_today(today)
+            .with_window_completed(today)
+            .order_by('-created_at')
+        )
         
         habits_data = []
         for habit in user_habits:
@@ -319,7 +330,10 @@ def login_view(request):
                 Pending2FA.objects.filter(user=user).delete()
                 print(f"🧹 Cleared old 2FA records for user: {user.username}")
                 
-                Pending2FA.objects.create(user=user, telegram_id=profile.telegram_id)
+                pending = Pending2FA.objects.create(user=user, telegram_id=profile.telegram_id)
+                # Сесія браузера прив'язується до цього запиту: через неї вікно входу
+                # підписується на результат (WebSocket або long-poll)
+                request.session['pending_2fa_id'] = pending.id
                 print(f"🎯 Calling send_2fa_request.delay({profile.telegram_id}, {user.username})")
                 
                 # Перевіримо, що завдання справді вирушає
@@ -334,6 +348,9 @@ def login_view(request):
                     send_2fa_request(profile.telegram_id, user.username)
             else:
                 print(f"⏳ 2FA request already pending, not creating new one")
+                request.session['pending_2fa_id'] = Pending2FA.objects.filter(
+                    user=user, confirmed=False, declined=False
+                ).values_list('id', flat=True).first()
             
             messages.info(request, "Please confirm your login via the Telegram message we've just sent.")
             return render(request, "base.html", {
@@ -363,70 +380,106 @@ def login_view(request):
 
 
 def telegram_2fa_status(request):
+    """
+    Перевіряє результат 2FA та завершує вхід після підтвердження
+
+    Браузер викликає його один раз після push-повідомлення (WebSocket / long-poll),
+    тому тут лише один запит до Pending2FA.
+    """
     username = request.GET.get("username")
-    print(f"🔍 2FA status check for username: {username}")
     
     if not username:
         return JsonResponse({"authenticated": False, "confirmed": False, "status": "error"})
 
-    try:
-        user = User.objects.get(username=username)
-        
-        # Покажемо ВСІ записи для цього користувача
-        all_pending = Pending2FA.objects.filter(user=user)
-        print(f"🔍 All Pending2FA records for {username}:")
-        for p in all_pending:
-            print(f"  - ID: {p.id}, confirmed: {p.confirmed}, declined: {p.declined}, created: {p.created_at}")
-        
-        # Перевіряємо підтверджені запити
-        pending_confirmed = Pending2FA.objects.filter(user=user, confirmed=True).first()
-        
-        # Перевіряємо відхилені запити
-        pending_declined = Pending2FA.objects.filter(user=user, declined=True).first()
-        
-        is_confirmed = bool(pending_confirmed)
-        is_declined = bool(pending_declined)
-        
-        print(f"🔍 Confirmed: {is_confirmed}, Declined: {is_declined}")
+    pending_2fa = Pending2FA.objects.filter(user__username=username).select_related('user')
+    pending_id = request.session.get('pending_2fa_id')
+    if pending_id:
+        pending_2fa = pending_2fa.filter(id=pending_id)
+    # Підтверджені мають пріоритет над відхиленими, відхилені - над очікуючими
+    pending = pending_2fa.order_by('-confirmed', '-declined', '-created_at').first()
 
-        # Якщо підтверджено, авторизуємо користувача і видаляємо запис
-        if is_confirmed and pending_confirmed:
-            login(request, user)
-            request.session.save()
-            pending_confirmed.delete()
-            print(f"User {username} automatically logged in via 2FA status check")
-            
-            return JsonResponse({
-                "authenticated": True, 
-                "confirmed": True,
-                "status": "approved"
-            })
-        
-        # Якщо відхилено, повертаємо статус відхилення без видалення
-        if is_declined and pending_declined:
-            print(f"🚫 2FA request was declined for user: {username}")
-            # Не видаляємо запис негайно, дамо фронтенду час на обробку
+    if pending is None:
+        if not User.objects.filter(username=username).exists():
+            print(f"🔍 User not found: {username}")
             return JsonResponse({
                 "authenticated": False, 
                 "confirmed": False,
-                "status": "declined"
+                "status": "error"
             })
-        
-        # Запит в очікуванні
-        print(f"🔍 2FA request still pending for user: {username}")
         return JsonResponse({
             "authenticated": False, 
             "confirmed": False,
             "status": "pending"
         })
+
+    # Якщо підтверджено, авторизуємо користувача і видаляємо запис
+    if pending.confirmed:
+        login(request, pending.user)
+        request.session.pop('pending_2fa_id', None)
+        request.session.save()
+        pending.delete()
+        print(f"User {username} automatically logged in via 2FA status check")
         
-    except User.DoesNotExist:
-        print(f"🔍 User not found: {username}")
+        return JsonResponse({
+            "authenticated": True, 
+            "confirmed": True,
+            "status": "approved"
+        })
+    
+    # Якщо відхилено, повертаємо статус відхилення без видалення
+    if pending.declined:
+        print(f"🚫 2FA request was declined for user: {username}")
+        # Не видаляємо запис негайно, дамо фронтенду час на обробку
         return JsonResponse({
             "authenticated": False, 
             "confirmed": False,
-            "status": "error"
+            "status": "declined"
         })
+    
+    # Запит в очікуванні
+    return JsonResponse({
+        "authenticated": False, 
+        "confirmed": False,
+        "status": "pending"
+    })
+
+
+TWOFA_LONG_POLL_TIMEOUT = 25
+
+
+async def wait_2fa_status(request):
+    """
+    Long-poll запасний варіант для WebSocket 2FA
+
+    Тримає запит відкритим, доки бот не опублікує результат у групу каналу
+    цього входу (або до таймауту), не звертаючись до БД під час очікування.
+    """
+    import asyncio
+    from channels.layers import get_channel_layer
+
+    pending_id = await request.session.aget('pending_2fa_id')
+    if not pending_id:
+        return JsonResponse({"status": "error"}, status=404)
+
+    channel_layer = get_channel_layer()
+    group = twofa_group_name(pending_id)
+    channel_name = await channel_layer.new_channel()
+    await channel_layer.group_add(group, channel_name)
+    try:
+        # Перевірка після підписки: результат міг прийти до початку очікування
+        pending = await Pending2FA.objects.filter(id=pending_id).only('confirmed', 'declined').afirst()
+        if pending is None:
+            return JsonResponse({"status": "expired"})
+        if pending.status != 'pending':
+            return JsonResponse({"status": pending.status})
+
+        try:
+            event = await asyncio.wait_for(channel_layer.receive(channel_name), TWOFA_LONG_POLL_TIMEOUT)
+        except asyncio.TimeoutError:
+            return JsonResponse({"status": "pending"})
+        return JsonResponse({"status": event["status"]})
+    finally:
+        await channel_layer.group_discard(group, channel_name)
 
 
 @csrf_exempt
@@ -587,8 +640,8 @@ def unread_notifications_count(request):
     if not request.user.is_authenticated:
         return JsonResponse({'count': 0})
     
+    # Запасний варіант: основне джерело лічильника - WebSocket (NotificationConsumer)
     count = Notification.objects.filter(user=request.user, read=False).count()
-    print(f"📊 Unread notifications for {request.user.username}: {count}")
     return JsonResponse({'count': count})
 
 @csrf_exempt
@@ -635,7 +688,27 @@ def tg_notify_toggle(request):
         return JsonResponse({"status": "success"})
     except Exception as e:
         return JsonResponse({"status": "error", "msg": str(e)}, status=400)
-    
+
+
+@login_required
+@require_POST
+def set_user_timezone(request):
+    """Зберігає часовий пояс користувача (IANA) для нагадувань перед локальною північчю"""
+    from .user_timezone import SESSION_KEY, load_zone
+
+    try:
+        name = json.loads(request.body).get("timezone")
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({"status": "error", "msg": "Invalid JSON"}, status=400)
+
+    if load_zone(name) is None:
+        return JsonResponse({"status": "error", "msg": "Unknown timezone"}, status=400)
+
+    TelegramProfile.objects.update_or_create(user=request.user, defaults={"timezone": name})
+    # Наступні запити (дата чекіна, "сьогодні") рахуються вже в новому поясі
+    request.session[SESSION_KEY] = name
+    return JsonResponse({"status": "success", "timezone": name})
+
 def check_telegram(request):
     telegram_id = request.GET.get('telegram_id')
     linked = False
@@ -719,6 +792,8 @@ def use_habit_template(request):
             active=True
         )
         new_habit.save()
+        refresh_active_habit_count(request.user.id)
+        invalidate_user_cache(request.user.id)
         
         return JsonResponse({
             "status": "success",
@@ -803,6 +878,8 @@ def create_custom_habit(request):
             active=True
         )
         new_habit.save()
+        refresh_active_habit_count(request.user.id)
+        invalidate_user_cache(request.user.id)
         
         return JsonResponse({
             "status": "ok",
@@ -1016,21 +1093,13 @@ def goal_progress(request, goal_id):
     """API для отримання актуального прогресу цілі"""
     try:
         # Отримуємо ціль та перевіряємо, що вона належить поточному користувачу
-        goal = get_object_or_404(Goal, pk=goal_id, user=request.user)
-        
-        # Отримуємо всі підцілі
-        subgoals = goal.subgoals.all()
-        total_subgoals = subgoals.count()
-        completed_subgoals = subgoals.filter(completed=True).count()
-        
-        # Рахуєм процент
-        progress_percent = round((completed_subgoals / total_subgoals) * 100) if total_subgoals > 0 else 0
+        goal = get_object_or_404(Goal.objects.with_progress(), pk=goal_id, user=request.user)
         
         return JsonResponse({
             "status": "success",
-            "total_subgoals": total_subgoals,
-            "completed_subgoals": completed_subgoals,
-            "progress_percent": progress_percent,
+            "total_subgoals": goal.total_subgoals,
+            "completed_subgoals": goal.completed_subgoals,
+            "progress_percent": goal.progress_percent,
             "goal_completed": goal.completed
         })
         
@@ -1095,7 +1164,11 @@ def delete_habit(request):
         from .models import Habit
         habit = Habit.objects.get(id=habit_id, user=request.user)
         habit_name = habit.name
+        checkin_days = list(habit.checkins.filter(completed=True).values_list('date', flat=True))
         habit.delete()
+        refresh_daily_completion(request.user.id, checkin_days)
+        refresh_active_habit_count(request.user.id)
+        invalidate_user_cache(request.user.id)
         
         return JsonResponse({
             "status": "success", 
@@ -1124,6 +1197,12 @@ def toggle_habit_active(request):
         habit = Habit.objects.get(id=habit_id, user=request.user)
         habit.active = not habit.active
         habit.save()
+        # Зведення рахує чекіни лише активних звичок
+        refresh_daily_completion(
+            request.user.id, habit.checkins.filter(completed=True).values_list('date', flat=True)
+        )
+        refresh_active_habit_count(request.user.id)
+        invalidate_user_cache(request.user.id)
         
         status_text = "activated" if habit.active else "paused"
         return JsonResponse({
@@ -1145,7 +1224,7 @@ def habit_checkin(request):
     if not request.user.is_authenticated:
         return JsonResponse({"status": "error", "message": "Authentication required"}, status=401)
     try:
-        from datetime import date, timedelta
+        from django.utils import timezone
         from .models import Habit, HabitCheckin
         
         data = json.loads(request.body)
@@ -1161,7 +1240,7 @@ def habit_checkin(request):
             from datetime import datetime
             checkin_date = datetime.strptime(checkin_date, '%Y-%m-%d').date()
         else:
-            checkin_date = date.today()
+            checkin_date = timezone.localdate()
         
         habit = Habit.objects.get(id=habit_id, user=request.user)
         
@@ -1208,87 +1287,15 @@ def habit_checkin(request):
         # Отримуємо фінальний стан чекіна
         final_completed = checkin.completed if checkin else False
         
-        # Оновлюємо streak_days та last_checkin
-        if final_completed:
-            # Перевіряємо чи це послідовний день
-            if habit.last_checkin:
-                days_diff = (checkin_date - habit.last_checkin).days
-                if days_diff == 1:
-                    habit.streak_days += 1
-                elif days_diff > 1:
-                    habit.streak_days = 1
-            else:
-                habit.streak_days = 1
-            
-            habit.last_checkin = checkin_date
-            
-            # Оновлюємо максимальний streak
-            if habit.streak_days > habit.max_streak_days:
-                habit.max_streak_days = habit.streak_days
-        else:
-            # Якщо скасували чекін, перерахуємо streak
-            if habit.last_checkin == checkin_date:
-                # Знаходимо попередній completed чекін
-                prev_checkin = HabitCheckin.objects.filter(
-                    habit=habit,
-                    date__lt=checkin_date,
-                    completed=True
-                ).order_by('-date').first()
-                
-                if prev_checkin:
-                    habit.last_checkin = prev_checkin.date
-                    # Перерахуємо streak
-                    consecutive_days = 1
-                    check_date = prev_checkin.date - timedelta(days=1)
-                    while True:
-                        prev_day_checkin = HabitCheckin.objects.filter(
-                            habit=habit,
-                            date=check_date,
-                            completed=True
-                        ).first()
-                        
-                        if prev_day_checkin:
-                            consecutive_days += 1
-                            check_date -= timedelta(days=1)
-                        else:
-                            break
-                    
-                    habit.streak_days = consecutive_days
-                else:
-                    habit.last_checkin = None
-                    habit.streak_days = 0
-        
-        habit.save()
-        
-        # ОЧИЩЕННЯ КЕШУ: Очищаємо кеш історії звичок при зміні
-        cache_key = f'habits_history_{request.user.id}'
-        cache.delete(cache_key)
-        
-       # Розраховуємо статистику звички
-        from datetime import datetime, timedelta
-        total_days = (datetime.now().date() - habit.created_at.date()).days + 1
-        completed_checkins = HabitCheckin.objects.filter(habit=habit, completed=True).count()
-        completion_rate = round((completed_checkins / total_days) * 100) if total_days > 0 else 0
-        
-        # Знаходимо найдовший streak
-        longest_streak = 0
-        current_streak = 0
-        check_date = habit.created_at.date()
-        end_date = datetime.now().date()
-        
-        while check_date <= end_date:
-            checkin = HabitCheckin.objects.filter(habit=habit, date=check_date, completed=True).first()
-            if checkin:
-                current_streak += 1
-                longest_streak = max(longest_streak, current_streak)
-            else:
-                current_streak = 0
-            check_date += timedelta(days=1)
+        # Оновлюємо серії, streak_days та last_checkin інкрементально
+        record_checkin(habit, checkin_date, final_completed)
+        refresh_daily_completion(request.user.id, [checkin_date])
         
+        # Статистика звички з лічильників, оновлених record_checkin
         stats = {
             'current_streak': habit.streak_days,
-            'longest_streak': longest_streak,
-            'completion_rate': completion_rate
+            'longest_streak': habit.max_streak_days,
+            'completion_rate': habit.overall_completion_rate()
         }
         
         message = f"Habit '{habit.name}' marked as {'completed' if final_completed else 'not completed'} for {checkin_date}"
@@ -1307,6 +1314,36 @@ def habit_checkin(request):
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
 
 
+@csrf_exempt
+@require_POST
+def habit_checkin_bulk(request):
+    """
+    API для пакетного чекіну звичок
+
+    Тіло: {"checkins": [{"habit_id": 1, "date": "2025-10-01", "checked": true}, ...]}
+    date за замовчуванням - сьогодні; без checked стан перемикається.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": "error", "message": "Authentication required"}, status=401)
+    try:
+        data = json.loads(request.body)
+        entries = parse_checkin_entries(data.get('checkins') if isinstance(data, dict) else None)
+        habits = apply_checkins(request.user, entries)
+
+        return JsonResponse({
+            "status": "success",
+            "message": f"Updated {len(entries)} checkins for {len(habits)} habits",
+            "habits": habits
+        })
+
+    except (json.JSONDecodeError, ValueError) as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    except Habit.DoesNotExist:
+        return JsonResponse({"status": "error", "message": "Habit not found"}, status=404)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=500)
+
+
 @csrf_exempt
 def daily_habits_status(request):
     """API для перевірки статусу всіх звичок за сьогоднішній день"""
@@ -1314,14 +1351,14 @@ def daily_habits_status(request):
         return JsonResponse({"status": "error", "message": "Authentication required"}, status=401)
     
     try:
-        from datetime import date
+        from django.utils import timezone
         from .models import Habit, HabitCheckin
         
-        today = date.today()
+        today = timezone.localdate()
         
-        # Отримуємо всі активні звички користувача
-        user_habits = Habit.objects.filter(user=request.user, active=True)
-        total_habits = user_habits.count()
+        # Отримуємо всі активні звички користувача з відміткою за сьогодні
+        user_habits = list(Habit.objects.filter(user=request.user, active=True).with_checked_today())
+        total_habits = len(user_habits)
         
         if total_habits == 0:
             return JsonResponse({
@@ -1333,10 +1370,7 @@ def daily_habits_status(request):
             })
         
         # Перевіряємо, скільки звичок виконано сьогодні
-        completed_habits = 0
-        for habit in user_habits:
-            if habit.is_checked_today():
-                completed_habits += 1
+        completed_habits = sum(1 for habit in user_habits if habit.is_checked_today())
         
         all_completed = completed_habits == total_habits
         
@@ -1467,94 +1501,133 @@ def send_support_message(request):
         logger.error(f"Error sending support message: {str(e)}")
         return JsonResponse({"status": "error", "message": "An error occurred while sending the message"}, status=500)
 
+
+HISTORY_MAX_DAYS = 366 * 2
+
+
+def parse_history_range(request):
+    """
+    Діапазон історії з параметрів start, end (YYYY-MM-DD, необов'язкові):
+    за замовчуванням останні 30 днів, не довший за HISTORY_MAX_DAYS
+
+    Raises:
+        ValueError: з повідомленням для відповіді 400
+    """
+    from datetime import datetime, timedelta
+    from django.utils import timezone
+
+    try:
+        end_date = (
+            datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+            if request.GET.get('end') else timezone.localdate()
+        )
+        start_date = (
+            datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+            if request.GET.get('start') else end_date - timedelta(days=30)
+        )
+    except ValueError:
+        raise ValueError("Dates must be YYYY-MM-DD")
+
+    if start_date > end_date or (end_date - start_date).days >= HISTORY_MAX_DAYS:
+        raise ValueError(f"Range must be 1-{HISTORY_MAX_DAYS} days")
+    return start_date, end_date
+
+
 @login_required
 def habits_completion_history(request):
     """
-   API для отримання історії виконання звичок по днях (ОПТИМІЗОВАНО + КЕШУВАННЯ)
+    API для отримання історії виконання звичок по днях із зведення DailyCompletion
+
+    Параметри: start, end (YYYY-MM-DD, необов'язкові) - за замовчуванням
+    останні 30 днів; діапазон не довший за HISTORY_MAX_DAYS.
     """
     try:
-        from django.utils import timezone
-        from datetime import timedelta
-        from django.db.models import Count, Q
-        
-        # Перевіряємо кеш для цього користувача
-        cache_key = f'habits_history_{request.user.id}'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return JsonResponse({
-                "status": "success",
-                "data": cached_data
-            })
-        
-        # Отримуємо звички користувача
-        user_habits = Habit.objects.filter(user=request.user, active=True)
-        
-        if not user_habits.exists():
+        default_range = 'start' not in request.GET and 'end' not in request.GET
+        try:
+            start_date, end_date = parse_history_range(request)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+        # Кешуємо лише типовий діапазон (простір імен інвалідовується при змінах звичок)
+        if default_range:
+            cached_data = get_user_cache(request.user.id, HABITS_HISTORY_CACHE)
+            if cached_data is not None:
+                return JsonResponse({
+                    "status": "success",
+                    "data": cached_data
+                })
+
+        active_count = Habit.objects.filter(user=request.user, active=True).count()
+        if active_count == 0:
             return JsonResponse({
                 "status": "success",
                 "data": {}
             })
-        
-        # Отримуємо дані за останні 30 днів
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        # ОПТИМІЗАЦІЯ: Отримуємо всі check-ins за період одним запитом
-        habit_ids = list(user_habits.values_list('id', flat=True))
-        checkins = HabitCheckin.objects.filter(
-            habit_id__in=habit_ids,
-            date__range=[start_date, end_date],
-            completed=True
-        ).values('date', 'habit_id')
-        
-        # Групуємо checkins щодня для швидкого доступу
-        checkins_by_date = {}
-        for checkin in checkins:
-            date_str = checkin['date'].strftime('%Y-%m-%d')
-            if date_str not in checkins_by_date:
-                checkins_by_date[date_str] = set()
-            checkins_by_date[date_str].add(checkin['habit_id'])
-        
-        total_habits = user_habits.count()
+
         completion_data = {}
-        
-        # ОПТИМІЗАЦІЯ: Обробляємо всі дні за один прохід
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Для сьогоднішнього дня використовуємо актуальний стан
-            if current_date == end_date:
-                completed_habits = sum(1 for habit in user_habits if habit.is_checked_today())
-            else:
-                # Для минулих днів використовуємо завантажені дані
-                completed_habits = len(checkins_by_date.get(date_str, set()))
-            
-            all_completed = (completed_habits == total_habits and total_habits > 0)
-            
-            completion_data[date_str] = {
+        for day, (completed_count, total_count) in get_completion_range(
+            request.user.id, start_date, end_date, active_count
+        ).items():
+            all_completed = total_count > 0 and completed_count >= total_count
+            completion_data[day.strftime('%Y-%m-%d')] = {
                 'all_completed': all_completed,
-                'completed_count': completed_habits,
-                'total_count': total_habits
+                # Кількість активних звичок зафіксована на той день
+                'day_was_complete': all_completed,
+                'completed_count': completed_count,
+                'total_count': total_count
             }
-            
-            current_date += timedelta(days=1)
-        
-       # Кешуємо результат на 5 хвилин (для минулих днів дані рідко змінюються)
-        cache.set(cache_key, completion_data, 300)
-        
+
+        if default_range:
+            set_user_cache(request.user.id, HABITS_HISTORY_CACHE, completion_data, 300)
+
         return JsonResponse({
             "status": "success",
             "data": completion_data
         })
-        
+
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
         logger.error(f"Error getting habits completion history: {str(e)}")
         return JsonResponse({"status": "error", "message": "Failed to load habits history"}, status=500)
 
+@login_required
+def habit_history(request, habit_id):
+    """
+    API для календаря однієї звички з бітової історії чекінів (checkin_bitmap)
+
+    Параметри: start, end як у habits_completion_history.
+    """
+    from django.utils import timezone
+    from .checkin_bitmap import load_history
+
+    try:
+        start_date, end_date = parse_history_range(request)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    habit = Habit.objects.filter(id=habit_id, user=request.user).only('id', 'frequency').first()
+    if habit is None:
+        return JsonResponse({"status": "error", "message": "Habit not found"}, status=404)
+
+    # Уся історія звички - кілька десятків байт на рік, тож серії рахуються без обмеження діапазоном
+    history = load_history(habit)
+    today = timezone.localdate()
+    completed = history.count(start_date, end_date)
+
+    return JsonResponse({
+        "status": "success",
+        "habit_id": habit.id,
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "checked_days": [day.isoformat() for day in history.days(start_date, end_date)],
+        "completed_count": completed,
+        "completion_percent": round(completed / ((end_date - start_date).days + 1) * 100, 1),
+        "current_streak": history.current_streak(today),
+        "longest_streak": history.longest_run(),
+    })
+
+
 @login_required
 @require_POST
 def save_habits_completion(request):
@@ -1589,139 +1662,32 @@ def save_habits_completion(request):
 @auth_required_with_modal
 def statistics_page(request):
     """Сторінка статистики користувача з графіками та анімаціями"""
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models import Count, Avg, Q
-    
-    # Отримуємо цілі користувача
-    user_goals = Goal.objects.filter(user=request.user)
-    total_goals = user_goals.count()
-    completed_goals = user_goals.filter(completed=True).count()
-    active_goals = user_goals.filter(completed=False).count()
-    
-    active_goals_list = user_goals.filter(completed=False).prefetch_related('subgoals')
-    total_progress = 0
-    goal_count_for_progress = 0
-    
-    # Додаємо активні цілі
-    if active_goals_list.exists():
-        for goal in active_goals_list:
-            total_progress += goal.get_progress_percent()
-            goal_count_for_progress += 1
-    
-    # Додаємо завершені цілі як 100%
-    if completed_goals > 0:
-        total_progress += (completed_goals * 100)
-        goal_count_for_progress += completed_goals
-    
-    # Обчислюємо середній прогрес по цілях
-    if goal_count_for_progress > 0:
-        average_goal_progress = round(total_progress / goal_count_for_progress, 1)
-    else:
-        average_goal_progress = 0
-    
-    # Отримуємо звички користувача
-    user_habits = Habit.objects.filter(user=request.user)
-    total_habits = user_habits.count()
-    active_habits = user_habits.filter(active=True).count()
-    
-    # Статистика звичок
-    today = timezone.now().date()
-    completed_today = sum(1 for habit in user_habits.filter(active=True) if habit.is_checked_today())
-    
-    # Відсоток виконання звичок на сьогодні (для кругової діаграми)
-    if active_habits > 0:
-        today_completion_percent = round((completed_today / active_habits) * 100, 1)
-    else:
-        today_completion_percent = 0
-    
-    # Середній відсоток виконання звичок за весь час
-    if active_habits > 0:
-        avg_habit_completion = round(
-            sum(habit.completion_rate for habit in user_habits.filter(active=True)) / active_habits,
-            1
-        )
-    else:
-        avg_habit_completion = 0
-    
-    # Поточний та максимальний streak
-    current_max_streak = 0
-    longest_streak_ever = 0
-    for habit in user_habits.filter(active=True):
-        current_max_streak = max(current_max_streak, habit.current_streak)
-        longest_streak_ever = max(longest_streak_ever, habit.longest_streak)
-    
-    # Активність протягом останніх 7 днів
-    week_ago = today - timedelta(days=7)
-    recent_checkins = HabitCheckin.objects.filter(
-        habit__user=request.user,
-        date__gte=week_ago,
-        completed=True
-    ).count()
-    
-    # Активність користувача
-    activity_data_raw = get_user_weekly_activity(request.user)
-    total_activity_points = activity_data_raw.get('total_activities', 0)
-    
-    # Підготовка даних для графіків 
-    # Графік виконання навичок за останні 30 днів
-    habits_chart_data = []
-    for i in range(30):
-        check_date = today - timedelta(days=29-i)
-        completed = HabitCheckin.objects.filter(
-            habit__user=request.user,
-            date=check_date,
-            completed=True
-        ).count()
-        habits_chart_data.append({
-            'date': check_date.strftime('%d.%m'),
-            'completed': completed
-        })
-    
-    # Графік прогресу цілей (топ-5 активних)
-    goals_chart_data = []
-    for goal in active_goals_list[:5]:
-        goals_chart_data.append({
-            'id': goal.id,
-            'name': goal.name[:20] + ('...' if len(goal.name) > 20 else ''),
-            'progress': goal.get_progress_percent()
-        })
-    
-    # Підготовка даних активності для графіка
-    activity_chart_data = []
-    if 'weekly_data' in activity_data_raw and 'labels' in activity_data_raw:
-        for day_label, count in zip(activity_data_raw['labels'], activity_data_raw['weekly_data']):
-            activity_chart_data.append({
-                'day': day_label,
-                'count': count
-            })
-    
-    context = {
-        # Загальна статистика
-        'total_goals': total_goals,
-        'completed_goals': completed_goals,
-        'active_goals': active_goals,
-        'average_goal_progress': average_goal_progress,
-        
-        'total_habits': total_habits,
-        'active_habits': active_habits,
-        'completed_today': completed_today,
-        'today_completion_percent': today_completion_percent,
-        'avg_habit_completion': avg_habit_completion,
-        'current_max_streak': current_max_streak,
-        'longest_streak_ever': longest_streak_ever,
-        
-        'recent_checkins': recent_checkins,
-        'total_activity_points': total_activity_points,
-        
-        # Данные для графиков (будем передавать как JSON)
-        'habits_chart_data': json.dumps(habits_chart_data),
-        'goals_chart_data': json.dumps(goals_chart_data),
-        'activity_chart_data': json.dumps(activity_chart_data),
-    }
+    context = build_statistics_context(request.user)
     
     return render(request, 'pages/statistics.html', context)
 
+@require_http_methods(["GET"])
+def prometheus_metrics(request):
+    """Метрики запитів за endpoint у текстовому форматі Prometheus"""
+    import hmac
+    from django.http import HttpResponse
+    from .instrumentation import flush_request_metrics, get_request_metrics, render_prometheus
+
+    token = settings.METRICS_TOKEN
+    if token:
+        received = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(received.encode(), f'Bearer {token}'.encode()):
+            return HttpResponse(status=403)
+    elif not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    flush_request_metrics()
+    return HttpResponse(
+        render_prometheus(get_request_metrics()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
 @login_required
 def test_websocket_notification(request):
     """Надсилає тестове повідомлення поточному користувачеві через WebSocket"""
@@ -1751,7 +1717,8 @@ def test_websocket_notification(request):
                     'message': notification.message,
                     'notification_id': notification.id,
                     'created_at': notification.created_at.isoformat(),
-                    'notification_type': notification.notification_type
+                    'notification_type': notification.notification_type,
+                    'unread_delta': 1
                 }
             )
             return JsonResponse({
@@ -1783,11 +1750,16 @@ def mark_notification_read(request):
         # Позначаємо як прочитанеё
         updated = Notification.objects.filter(
             id=notification_id,
-            user=request.user
+            user=request.user,
+            read=False
         ).update(read=True)
         
         if updated:
             print(f"✅ Notification {notification_id} marked as read")
+            send_unread_count_delta(request.user.id, -updated)
+            return JsonResponse({'status': 'success', 'message': 'Marked as read'})
+        elif Notification.objects.filter(id=notification_id, user=request.user).exists():
+            # Вже прочитане - лічильник не змінюється
             return JsonResponse({'status': 'success', 'message': 'Marked as read'})
         else:
             print(f"⚠️ Notification {notification_id} not found or not owned by user")